@@ -0,0 +1,96 @@
+"""
+Cold-start benchmark: the time each entry point spends importing its dependencies,
+measured with `python -X importtime` in a fresh interpreter (best of --repeat), and
+the heavy packages it loads. bench_pipeline records the same numbers, so they are
+compared with its baseline.
+
+    python -m benchmarks.bench_import_time
+    python -m benchmarks.bench_import_time --targets main src.segmentation --top 15
+"""
+import argparse
+import ast
+import os
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List
+
+ROOT = Path(__file__).resolve().parent.parent
+# Processes that should start fast: the pipeline entry point (stage modules load on
+# demand), the dashboard and the job runner. For a script (main.py, dashboard.py)
+# only its top-level imports are run, not its body.
+TARGETS = ["main", "dashboard", "src.job_runner"]
+HEAVY = ["sklearn", "lifetimes", "matplotlib", "seaborn", "scipy", "autograd"]
+MARKER = "-- bench_import_time --"
+
+
+def import_statements(target: str) -> str:
+    """Code importing `target`: a script's top-level import statements, else `import target`."""
+    script = ROOT / f"{target}.py"
+    if not script.exists():
+        return f"import {target}"
+    tree = ast.parse(script.read_text())
+    return "\n".join(ast.unparse(node) for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom)))
+
+
+def _parse(stderr: str) -> List[Dict]:
+    """-X importtime lines after the marker as {"module", "depth", "self_us", "cumulative_us"}."""
+    rows = []
+    for line in stderr.split(MARKER, 1)[-1].splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append({"module": name.strip(), "depth": (len(name) - len(name.lstrip()) - 1) // 2,
+                     "self_us": int(self_us), "cumulative_us": int(cumulative_us)})
+    return rows
+
+
+def measure(target: str) -> Dict:
+    """
+    One fresh-interpreter import of `target` (interpreter startup excluded): seconds
+    spent, its direct imports by cost, and the HEAVY packages that ended up loaded.
+    """
+    code = "\n".join([
+        f"import sys; sys.stderr.write({MARKER!r} + '\\n'); sys.stderr.flush()",
+        import_statements(target),
+        f"print(' '.join(m for m in {HEAVY!r} if m in sys.modules))",
+    ])
+    env = {**os.environ, "MPLBACKEND": "Agg", "PYTHONWARNINGS": "ignore"}
+    done = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=ROOT, env=env,
+                          capture_output=True, text=True, check=True)
+    direct = [r for r in _parse(done.stderr) if r["depth"] == 0]
+    return {
+        "target": target,
+        "import_seconds": sum(r["cumulative_us"] for r in direct) / 1e6,
+        "heavy": done.stdout.split(),
+        "children": sorted(direct, key=lambda r: -r["cumulative_us"]),
+    }
+
+
+def import_records(targets: List[str] = TARGETS, repeat: int = 3) -> List[Dict]:
+    """Best-of-`repeat` import times as bench_pipeline records (rows 0, stage "import <target>")."""
+    records = []
+    for target in targets:
+        best = min((measure(target) for _ in range(repeat)), key=lambda m: m["import_seconds"])
+        records.append({"stage": f"import {target}", "rows": 0, "status": "ok",
+                        "wall_seconds": best["import_seconds"], "heavy": best["heavy"]})
+        print(f"import {target:<28} {best['import_seconds']:9.3f}s  heavy: {', '.join(best['heavy']) or '-'}")
+    return records
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--targets", nargs="+", default=TARGETS)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--top", type=int, default=8, help="direct imports listed per target")
+    args = parser.parse_args()
+
+    for target in args.targets:
+        best = min((measure(target) for _ in range(args.repeat)), key=lambda m: m["import_seconds"])
+        print(f"{target}: {best['import_seconds']:.3f}s importing; heavy packages: {', '.join(best['heavy']) or 'none'}")
+        for child in best["children"][:args.top]:
+            print(f"    {child['cumulative_us'] / 1e3:9.1f} ms  {child['module']}")
+
+
+if __name__ == "__main__":
+    main()
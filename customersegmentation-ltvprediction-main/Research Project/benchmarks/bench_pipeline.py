@@ -0,0 +1,228 @@
+"""
+Pipeline benchmark: every stage on synthetic order lines (src.synthetic_data) at
+increasing sizes, timed and memory-profiled with src.instrumentation, plus the
+cold-start import time of the entry points (benchmarks.bench_import_time). Results are
+written to benchmarks/results/<timestamp>.json and compared with a baseline; the
+exit status is 1 when a stage got slower (or its heap peak grew) beyond the
+threshold.
+
+    python -m benchmarks.bench_pipeline --rows 1000 10000 100000 --save-baseline
+    python -m benchmarks.bench_pipeline --rows 1000 10000 100000 --threshold 0.25
+
+Stages write their usual files under a temporary directory, never into output/.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import traceback
+import tracemalloc
+from pathlib import Path
+from typing import Dict, List
+
+import pandas as pd
+import yaml
+
+from benchmarks.bench_import_time import import_records
+from src import instrumentation
+from src.churn import label_churn, predict_churn, train_churn_model
+from src.data_preprocessing import calculate_rfm, clean_raw_data
+from src.forecasting import forecast_panel
+from src.instrumentation import profile_stage
+from src.ltv_prediction import fit_ltv_models, predict_ltv
+from src.nbo import run_nbo_recommendations
+from src.segmentation import perform_auto_gmm_segmentation, perform_clustering
+from src.synthetic_data import generate_transactions
+from src.uplift import run_uplift_modeling
+
+ROOT = Path(__file__).resolve().parent.parent
+RESULTS_DIR = ROOT / "benchmarks" / "results"
+BASELINE = RESULTS_DIR / "baseline.json"
+METRICS = {"wall_seconds": "min_seconds", "tracemalloc_peak_mb": "min_mb"}  # compared metric -> its noise floor
+
+
+# ---- stages: each reads and extends `ctx`, returns its output (for rows_out) ----
+
+def _clean(ctx, config):
+    ctx["transactions"] = clean_raw_data(ctx["raw"])
+    return ctx["transactions"]
+
+
+def _rfm(ctx, config):
+    ctx["rfm"] = calculate_rfm(ctx["transactions"])
+    return ctx["rfm"]
+
+
+def _segmentation(ctx, config):
+    ai, rfm = config.get("ai", {}), ctx["rfm"].copy()
+    if ai.get("use_auto_gmm_segmentation", False):
+        rfm["cluster"] = perform_auto_gmm_segmentation(rfm, ai.get("max_gmm_components", 7)).astype(int)
+    else:
+        rfm["cluster"] = perform_clustering(rfm, config["clustering"]["n_clusters"]).astype(int)
+    ctx["rfm"] = rfm
+    return rfm
+
+
+def _ltv(ctx, config):
+    models = fit_ltv_models(ctx["rfm"], config["ltv"])
+    ctx["rfm"] = predict_ltv(ctx["rfm"].copy(), config["ltv"], models=models)
+    return ctx["rfm"]
+
+
+def _churn(ctx, config):
+    labels = label_churn(ctx["transactions"], horizon_days=90)
+    clf, _ = train_churn_model(ctx["rfm"], labels)
+    ctx["rfm"] = predict_churn(ctx["rfm"].copy(), clf)
+    ctx["scores"] = ctx["rfm"].reset_index().rename(columns={"index": "customer_id"})
+    return ctx["rfm"]
+
+
+def _uplift(ctx, config):
+    return run_uplift_modeling(ctx["scores"], config.get("uplift", {}))
+
+
+def _nbo(ctx, config):
+    return run_nbo_recommendations(ctx["scores"], config.get("nbo", {}))
+
+
+def _forecast(ctx, config):
+    start = pd.to_datetime(ctx["transactions"]["Order Date"]).max() + pd.Timedelta(days=1)
+    return forecast_panel(ctx["scores"], days=config.get("forecasting", {}).get("days", 30), base_date=start)
+
+
+STAGES = [
+    ("clean", _clean), ("rfm", _rfm), ("segmentation", _segmentation), ("ltv", _ltv),
+    ("churn", _churn), ("uplift", _uplift), ("nbo", _nbo), ("forecast", _forecast),
+]
+
+
+def run_size(rows: int, config: Dict, seed: int = 0, verbose: bool = False) -> List[Dict]:
+    """
+    Generate `rows` order lines and run every stage on them; one record per stage.
+    The heap peak is counted above the memory already traced when the stage starts
+    (the ctx built by earlier stages), so it is the stage's own allocation.
+    """
+    ctx = {"raw": generate_transactions(rows, seed=seed)}
+    customers = int(ctx["raw"]["City"].nunique())
+    records = []
+    for name, fn in STAGES:
+        quiet = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+        live_at_start = tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else 0
+        record = {"stage": name, "status": "failed", "rows_in": None, "rows_out": None, "wall_seconds": 0.0}
+        try:
+            with quiet, profile_stage(name, rows_in=ctx.get("transactions", ctx["raw"])) as record:
+                record["rows_out"] = fn(ctx, config)
+        except Exception as exc:
+            # later stages missing this stage's output fail the same way and are recorded too
+            record.update(status="failed", error=f"{type(exc).__name__}: {exc}")
+            if verbose:
+                traceback.print_exc()
+        if record.get("tracemalloc_peak_mb") is not None:
+            record["tracemalloc_peak_mb"] -= live_at_start / 1e6
+        record.update(rows=rows, customers=customers)
+        records.append(record)
+        status = "ok" if record["status"] == "ok" else record["error"]
+        print(f"{rows:>10,} rows  {name:<13} {record['wall_seconds']:9.3f}s  "
+              f"heap peak {record.get('tracemalloc_peak_mb') or 0:9.1f} MB  {status}")
+    return records
+
+
+# ---- baseline comparison ----
+
+def compare(results: List[Dict], baseline: List[Dict], threshold: float = 0.25, memory_threshold: float = 0.25,
+            min_seconds: float = 0.05, min_mb: float = 1.0) -> List[str]:
+    """
+    Regressions of `results` against `baseline` (records matched on rows and stage):
+    a metric above baseline * (1 + threshold) and more than its noise floor above
+    the baseline, or a stage that passed in the baseline and fails now.
+    """
+    floors = {"min_seconds": min_seconds, "min_mb": min_mb}
+    limits = {"wall_seconds": threshold, "tracemalloc_peak_mb": memory_threshold}
+    before = {(r["rows"], r["stage"]): r for r in baseline}
+    regressions = []
+    for record in results:
+        old = before.get((record["rows"], record["stage"]))
+        if old is None or old["status"] != "ok":
+            continue
+        label = f"{record['stage']} @ {record['rows']:,} rows" if record["rows"] else record["stage"]
+        if record["status"] != "ok":
+            regressions.append(f"{label}: failed ({record.get('error')})")
+            continue
+        for metric, floor in METRICS.items():
+            new_value, old_value = record.get(metric), old.get(metric)
+            if new_value is None or old_value is None:
+                continue
+            if new_value > old_value * (1 + limits[metric]) and new_value - old_value > floors[floor]:
+                regressions.append(f"{label}: {metric} {old_value:.3f} -> {new_value:.3f} "
+                                   f"(+{(new_value / old_value - 1) * 100 if old_value else float('inf'):.0f}%)")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=float, nargs="+", default=[1e3, 1e4, 1e5],
+                        help="order-line counts, e.g. 1e3 1e5 1e7")
+    parser.add_argument("--config", type=Path, default=ROOT / "config" / "config.yaml")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--baseline", type=Path, default=BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the baseline")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed relative slowdown")
+    parser.add_argument("--memory-threshold", type=float, default=0.25, help="allowed relative heap peak growth")
+    parser.add_argument("--min-seconds", type=float, default=0.05, help="slowdowns below this are noise")
+    parser.add_argument("--no-tracemalloc", action="store_true", help="skip heap peaks (faster, timing only)")
+    parser.add_argument("--no-imports", action="store_true", help="skip the import-time measurements")
+    parser.add_argument("--verbose", action="store_true", help="show the stages' own output")
+    args = parser.parse_args()
+
+    config = yaml.safe_load(args.config.read_text())
+    # At lifetimes' default tolerance BFGS often stops with "precision loss" at the
+    # optimum on small synthetic samples, which lifetimes reports as a ConvergenceError
+    config["ltv"]["fit_tol"] = max(config["ltv"].get("fit_tol", 1e-7), 1e-5)
+    instrumentation.configure({"tracemalloc": not args.no_tracemalloc})
+    records = [] if args.no_imports else import_records()
+    with tempfile.TemporaryDirectory(prefix="bench_pipeline_") as workdir:
+        cwd = os.getcwd()
+        os.chdir(workdir)
+        try:
+            for rows in args.rows:
+                records += run_size(int(rows), config, seed=args.seed, verbose=args.verbose)
+        finally:
+            os.chdir(cwd)
+
+    run = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "seed": args.seed,
+        "tracemalloc": not args.no_tracemalloc,
+        "results": records,
+    }
+    RESULTS_DIR.mkdir(parents=True, exist_ok=True)
+    path = RESULTS_DIR / f"{time.strftime('%Y%m%dT%H%M%S')}.json"
+    path.write_text(json.dumps(run, indent=2, default=str))
+    print(f"Results: {path}")
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps(run, indent=2, default=str))
+        print(f"Baseline saved: {args.baseline}")
+        return
+    if not args.baseline.exists():
+        print("No baseline to compare with; rerun with --save-baseline to create one.")
+        return
+    baseline = json.loads(args.baseline.read_text())
+    regressions = compare(records, baseline["results"], args.threshold, args.memory_threshold, args.min_seconds)
+    if baseline.get("tracemalloc") != run["tracemalloc"]:
+        print("Note: heap peaks were measured differently in the baseline; only times are comparable.")
+        regressions = [r for r in regressions if "tracemalloc_peak_mb" not in r]
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    print(f"{len(regressions)} regression(s) against {args.baseline} ({baseline['created']}).")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
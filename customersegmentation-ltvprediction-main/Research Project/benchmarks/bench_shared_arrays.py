@@ -0,0 +1,85 @@
+"""
+Serialization benchmark: what handing a feature matrix and target to process-pool
+workers costs when every task receives a pickled copy, against publishing them once
+with src.shared_arrays (shared memory or memory-mapped files). Each task only sums
+one column, so the time left is moving the data. The pool is started and warmed
+before timing.
+
+    python -m benchmarks.bench_shared_arrays --rows 100000 1000000 5000000 --tasks 16
+"""
+import argparse
+import pickle
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+import numpy as np
+
+from src.shared_arrays import published, run_attached
+
+
+def _column_sum(X, y, task):
+    return float(X[:, task % X.shape[1]].sum()) + float(y.sum())
+
+
+def _pickled_task(arrays, task):
+    return _column_sum(*arrays, task)
+
+
+def _shared_task(views, task):
+    return _column_sum(views["X"], views["y"], task)
+
+
+def _best_of(repeat_count, func):
+    best = float("inf")
+    for _ in range(repeat_count):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def bench(rows: int, features: int, tasks: int, pool, repeat_count: int = 3):
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(rows, features))
+    y = (rng.random(rows) < 0.3).astype(np.int8)
+    expected = [_column_sum(X, y, task) for task in range(tasks)]
+    records = []
+
+    seconds, result = _best_of(repeat_count, lambda: list(pool.map(_pickled_task, repeat((X, y)), range(tasks))))
+    assert np.allclose(result, expected)
+    records.append(("pickled per task", seconds, len(pickle.dumps((X, y), protocol=pickle.HIGHEST_PROTOCOL))))
+
+    for backend in ("shared_memory", "memmap"):
+        def shared():
+            with published({"X": X, "y": y}, backend=backend) as specs:
+                return list(pool.map(run_attached, repeat(_shared_task), repeat(specs), range(tasks)))
+        seconds, result = _best_of(repeat_count, shared)
+        assert np.allclose(result, expected)
+        with published({"X": X, "y": y}, backend=backend) as specs:
+            spec_bytes = len(pickle.dumps(specs, protocol=pickle.HIGHEST_PROTOCOL))
+        records.append((f"{backend} (publish included)", seconds, spec_bytes))
+
+    print(f"{rows:,} rows x {features} features ({X.nbytes / 1e6:,.0f} MB), {tasks} tasks:")
+    for label, seconds, sent in records:
+        print(f"    {label:<32} {seconds:8.3f}s  {records[0][1] / seconds:6.1f}x  "
+              f"{sent / 1e3:12,.1f} kB sent per task")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=float, nargs="+", default=[1e5, 1e6])
+    parser.add_argument("--features", type=int, default=8)
+    parser.add_argument("--tasks", type=int, default=16, help="tasks mapped over the pool (e.g. folds x arms)")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        list(pool.map(abs, range(args.workers * 4)))  # start every worker before timing
+        for rows in args.rows:
+            bench(int(rows), args.features, args.tasks, pool, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
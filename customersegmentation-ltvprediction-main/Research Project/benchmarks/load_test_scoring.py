@@ -0,0 +1,143 @@
+"""
+Load test of the scoring service (src.scoring_service) on localhost: concurrent
+keep-alive clients POST synthetic customers (src.synthetic_data RFM rows) and the
+client-side latency percentiles and throughput are printed next to the service's
+own /metrics. Needs a published registry version (run main.py first) unless --url
+points at a running service.
+
+    python -m benchmarks.load_test_scoring --concurrency 16 --requests 5000
+    python -m benchmarks.load_test_scoring --batch 20 --hot 0 --compare-unbatched
+    python -m benchmarks.load_test_scoring --url http://127.0.0.1:8502
+"""
+import argparse
+import http.client
+import json
+import threading
+import time
+from typing import Dict, List
+from urllib.parse import urlsplit
+
+import numpy as np
+
+from src import model_registry, scoring_service
+from src.data_preprocessing import calculate_rfm, clean_raw_data
+from src.synthetic_data import generate_transactions
+
+
+def customer_pool(customers: int, seed: int = 0) -> List[Dict]:
+    """RFM records (with customer_id) of `customers` synthetic customers."""
+    rfm = calculate_rfm(clean_raw_data(generate_transactions(customers * 8, customers=customers, seed=seed)))
+    return rfm.rename_axis("customer_id").reset_index().to_dict("records")
+
+
+def run_load(url: str, pool: List[Dict], requests: int, concurrency: int, batch: int,
+             hot: float, seed: int = 0) -> Dict:
+    """
+    Send `requests` POST /score requests of `batch` customers from `concurrency` threads.
+    A `hot` share of the customers come from the 1% most requested ones (cache hits).
+    Returns client-side {"requests", "errors", "seconds", "latency_ms", "requests_per_second", ...}.
+    """
+    parts = urlsplit(url)
+    rng = np.random.default_rng(seed)
+    hot_size = max(1, len(pool) // 100)
+    picks = np.where(rng.random((requests, batch)) < hot, rng.integers(0, hot_size, (requests, batch)),
+                     rng.integers(0, len(pool), (requests, batch)))
+    bodies = [json.dumps({"customers": [pool[i] for i in row]}).encode() for row in picks]
+    latencies = np.zeros(requests)
+    errors = [0]
+    next_request = iter(range(requests))
+    lock = threading.Lock()
+
+    def client():
+        connection = http.client.HTTPConnection(parts.hostname, parts.port, timeout=60)
+        while True:
+            with lock:
+                i = next(next_request, None)
+            if i is None:
+                break
+            start = time.perf_counter()
+            connection.request("POST", "/score", bodies[i], {"Content-Type": "application/json"})
+            response = connection.getresponse()
+            response.read()
+            latencies[i] = time.perf_counter() - start
+            if response.status != 200:
+                with lock:
+                    errors[0] += 1
+        connection.close()
+
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    seconds = time.perf_counter() - start
+    p50, p90, p99 = np.percentile(latencies * 1000, [50, 90, 99])
+    return {"requests": requests, "errors": errors[0], "seconds": round(seconds, 3),
+            "latency_ms": {"p50": round(p50, 3), "p90": round(p90, 3), "p99": round(p99, 3)},
+            "requests_per_second": round(requests / seconds, 1),
+            "customers_per_second": round(requests * batch / seconds, 1)}
+
+
+def _get_json(url: str, path: str) -> Dict:
+    parts = urlsplit(url)
+    connection = http.client.HTTPConnection(parts.hostname, parts.port, timeout=10)
+    connection.request("GET", path)
+    body = json.loads(connection.getresponse().read())
+    connection.close()
+    return body
+
+
+def _report(label: str, client: Dict, server: Dict) -> None:
+    latency = client["latency_ms"]
+    print(f"{label}: {client['requests']:,} requests in {client['seconds']:.2f}s, "
+          f"{client['requests_per_second']:,.0f} req/s, {client['customers_per_second']:,.0f} customers/s, "
+          f"{client['errors']} errors")
+    print(f"    client latency ms  p50 {latency['p50']:.2f}  p90 {latency['p90']:.2f}  p99 {latency['p99']:.2f}")
+    if server.get("latency_ms"):
+        latency = server["latency_ms"]
+        print(f"    server latency ms  p50 {latency['p50']:.2f}  p90 {latency['p90']:.2f}  p99 {latency['p99']:.2f}; "
+              f"mean batch {server['mean_batch_size']} customers over {server['batches']:,} model calls; "
+              f"cache hit rate {server['cache_hit_rate']:.1%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default=None, help="running service; default: start one in-process")
+    parser.add_argument("--version", default=None, help="registry version (in-process service)")
+    parser.add_argument("--registry-dir", default=None)
+    parser.add_argument("--customers", type=int, default=5000, help="synthetic customer pool size")
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--batch", type=int, default=1, help="customers per request")
+    parser.add_argument("--hot", type=float, default=0.5, help="share of customers drawn from the hottest 1%%")
+    parser.add_argument("--max-batch", type=int, default=scoring_service.DEFAULTS["max_batch"])
+    parser.add_argument("--max-wait-ms", type=float, default=scoring_service.DEFAULTS["max_wait_ms"])
+    parser.add_argument("--cache-entries", type=int, default=scoring_service.DEFAULTS["cache_entries"])
+    parser.add_argument("--compare-unbatched", action="store_true",
+                        help="also run with one customer per model call and no cache (in-process only)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    pool = customer_pool(args.customers, args.seed)
+    if args.url:
+        _report("service", run_load(args.url, pool, args.requests, args.concurrency, args.batch, args.hot, args.seed),
+                _get_json(args.url, "/metrics"))
+        return
+    if args.registry_dir:
+        model_registry.configure({"dir": args.registry_dir})
+    runs = [("micro-batched + cache", {"max_batch": args.max_batch, "max_wait_ms": args.max_wait_ms,
+                                        "cache_entries": args.cache_entries})]
+    if args.compare_unbatched:
+        runs.append(("unbatched, no cache", {"max_batch": 1, "max_wait_ms": 0.0, "cache_entries": 0}))
+    for label, settings in runs:
+        server, url = scoring_service.start(version=args.version, settings=settings)
+        try:
+            client = run_load(url, pool, args.requests, args.concurrency, args.batch, args.hot, args.seed)
+            _report(f"{label} (models {server.version})", client, _get_json(url, "/metrics"))
+        finally:
+            scoring_service.stop(server)
+
+
+if __name__ == "__main__":
+    main()
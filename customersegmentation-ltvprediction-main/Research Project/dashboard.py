@@ -1,18 +1,45 @@
 # dashboard.py
 from datetime import datetime
+from pathlib import Path
+
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 import streamlit as st
-
+import yaml
+
+from src.dashboard_cubes import (
+    ALL,
+    CUBES,
+    build_cubes,
+    customers_at_threshold,
+    leading_cluster,
+    view_histogram,
+    view_stats,
+    view_top,
+)
 from src.dashboard_utils import (
     FIGURES_DIR,
-    RESULTS_DIR,
-    compute_summary_metrics,
     format_currency,
     load_csv,
+    load_json,
     load_pipeline_history,
+    result_version,
+)
+from src.data_views import (
+    EXPORT_DIR,
+    PAGE_SIZE,
+    SCATTER_POINTS,
+    export_selection,
+    page_count,
+    query_page,
+    scatter_points,
+    selection_filters,
 )
+from src.forecasting import load_forecast_results
+from src.job_runner import job_status, latest_job, running_job, start_job
+from src.local_insights import answer_query, latency_stats, load_insight_index, stream_insight
+from src.ltv_trajectory import load_ltv_trajectories, trajectory_day_grid
 
 
 # ====================== PAGE CONFIG ======================
@@ -52,60 +79,185 @@ CLUSTER_COLORS = px.colors.qualitative.Prism if is_dark else px.colors.qualitati
 
 
 # ====================== DATA LOADING ======================
-@st.cache_data(show_spinner=False)
-def load_clv_data() -> pd.DataFrame:
-    return load_csv("clv_predictions.csv")
+# Every loader is keyed on result_version (file mtime/size of what it reads), so a
+# finished run only reloads the results that changed; max_entries drops old versions.
+@st.cache_data(show_spinner=False, max_entries=2)
+def load_cubes(version: str):
+    # Pre-aggregated by the pipeline; built here once for runs older than the cubes
+    cubes = {name: load_csv(f"{name}.csv") for name in CUBES}
+    if any(cube.empty for name, cube in cubes.items() if name != "cube_histograms"):
+        cubes = build_cubes(load_csv("clv_predictions.csv"))
+    return cubes
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def load_segment_points(version: str, view: str, budget: int):
+    # Per-customer scatter input for one view, downsampled to the point budget (tails kept)
+    return scatter_points(
+        "clv_predictions",
+        ["customer_id", "recency", "frequency", "monetary_value", "cluster", "CLV", "prob_alive"],
+        budget=budget,
+        outlier_columns=["recency", "monetary_value", "CLV"],
+        filters=selection_filters(cluster=None if view == ALL else int(view)),
+    )
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def load_page(version: str, name: str, page: int, page_size: int, sort_by, columns, filters):
+    return query_page(name, page=page, page_size=page_size, sort_by=sort_by, columns=columns, filters=filters)
 
 @st.cache_data(show_spinner=False)
-def load_segment_data() -> pd.DataFrame:
+def load_dashboard_config() -> dict:
+    config_path = Path(__file__).resolve().parent / "config" / "config.yaml"
+    try:
+        return yaml.safe_load(config_path.read_text()).get("dashboard") or {}
+    except (FileNotFoundError, AttributeError):
+        return {}
+
+
+def paged_table(key: str, name: str, sort_by: str, columns, filters=None) -> int:
+    """
+    One sorted page of a results-store table (the rest stays on the server), a page
+    selector and an export of the full selection. Returns the matching row count.
+    """
+    page_size = int(DASHBOARD_CONFIG.get("page_size", PAGE_SIZE))
+    version = result_version(f"{name}.csv")
+    page = st.session_state.get(f"{key}_page", 1)
+    frame, total = load_page(version, name, page - 1, page_size, sort_by, columns, filters)
+    pages = page_count(total, page_size)
+    if page > pages:  # the selection shrank
+        page = st.session_state[f"{key}_page"] = 1
+        frame, total = load_page(version, name, 0, page_size, sort_by, columns, filters)
+    st.dataframe(frame, use_container_width=True, hide_index=True)
+
+    c1, c2, c3 = st.columns([1, 1, 2])
+    c1.number_input(f"Page (of {pages})", min_value=1, max_value=pages, step=1, key=f"{key}_page")
+    fmt = c2.radio("Format", ["csv", "parquet"], horizontal=True, key=f"{key}_format")
+    file_key = f"{key}_export"
+    if c3.button(f"Export all {total:,} rows", key=f"{key}_export_button"):
+        path = export_selection(name, fmt, sort_by=sort_by, columns=columns, filters=filters,
+                                export_dir=DASHBOARD_CONFIG.get("export_dir", EXPORT_DIR))
+        st.session_state[file_key] = str(path) if path else None
+    export_file = st.session_state.get(file_key)
+    if export_file and Path(export_file).exists():
+        c3.caption(f"Saved on the server: {export_file}")
+        # Sent to the browser once, on request; dropped again after the download
+        c3.download_button("Download export", data=Path(export_file).read_bytes(),
+                           file_name=Path(export_file).name, key=f"{key}_download",
+                           on_click=lambda: st.session_state.pop(file_key, None))
+    return total
+
+@st.cache_data(show_spinner=False, max_entries=2)
+def load_insights(version: str) -> dict:
+    return load_insight_index()
+
+@st.cache_data(show_spinner=False, max_entries=2)
+def load_segment_data(version: str) -> pd.DataFrame:
     return load_csv("segment_analysis.csv")
 
-@st.cache_data(show_spinner=False)
-def load_top_customers() -> pd.DataFrame:
+@st.cache_data(show_spinner=False, max_entries=2)
+def load_top_customers(version: str) -> pd.DataFrame:
     return load_csv("top_customers.csv")
 
-@st.cache_data(show_spinner=False)
-def load_churn_risk() -> pd.DataFrame:
+@st.cache_data(show_spinner=False, max_entries=2)
+def load_churn_risk(version: str) -> pd.DataFrame:
     return load_csv("top_churn_risk.csv")
 
 # --- NEW: NBO, UPLIFT, FORECAST ---
-@st.cache_data(show_spinner=False)
-def load_nbo_data() -> pd.DataFrame:
-    path = RESULTS_DIR / "nbo_recommendations.csv"
-    return pd.read_csv(path) if path.exists() else pd.DataFrame()
+@st.cache_data(show_spinner=False, max_entries=2)
+def load_uplift_data(version: str) -> pd.DataFrame:
+    return load_csv("uplift_results.csv")
+
+@st.cache_data(show_spinner=False, max_entries=2)
+def load_uplift_evaluation(version: str):
+    return load_csv("uplift_curves.csv"), load_csv("uplift_deciles.csv"), load_json("uplift_metrics.json")
+
+@st.cache_data(show_spinner=False, max_entries=2)
+def load_forecast_data(version: str) -> pd.DataFrame:
+    return load_forecast_results()
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+def load_trajectories(version: str):
+    # Memory-mapped: each chart reads only the selected customer's slice
+    trajectories, meta = load_ltv_trajectories()
+    positions = {cid: i for i, cid in enumerate(meta.get("customer_ids", []))}
+    return trajectories, meta, positions
+
+@st.cache_data(show_spinner=False, max_entries=2)
+def load_sales_forecast(version: str):
+    return load_csv("sales_forecast.csv"), load_csv("sales_forecast_fits.csv")
+
+
+DASHBOARD_CONFIG = load_dashboard_config()
+SCATTER_BUDGET = int(DASHBOARD_CONFIG.get("scatter_points", SCATTER_POINTS))
+clv_version = result_version("clv_predictions.csv")
+if load_segment_points(clv_version, ALL, SCATTER_BUDGET)[1] == 0:
+    st.warning("No analytics generated yet. Run the pipeline to populate the dashboard.")
+    st.stop()
 
-@st.cache_data(show_spinner=False)
-def load_uplift_data() -> pd.DataFrame:
-    path = RESULTS_DIR / "uplift_results.csv"
-    return pd.read_csv(path) if path.exists() else pd.DataFrame()
 
-@st.cache_data(show_spinner=False)
-def load_forecast_data() -> pd.DataFrame:
-    path = RESULTS_DIR / "forecast_results.csv"
-    return pd.read_csv(path) if path.exists() else pd.DataFrame()
+# ====================== RUN PIPELINE BUTTON ======================
+# The run happens in a background job (src.job_runner); the panel below polls its
+# progress file and reruns the page once, when the job finishes.
+if st.sidebar.button("Run Analytics Pipeline", disabled=running_job() is not None):
+    try:
+        st.session_state.pipeline_job = start_job()["job_id"]
+    except RuntimeError as e:
+        st.sidebar.warning(str(e))
+
+
+@st.fragment(run_every=2)
+def pipeline_job_panel():
+    job = latest_job()
+    if job is None:
+        return
+    job = job_status(job["job_id"])
+    if job["state"] in ("starting", "running"):
+        done, total = job["stages_done"], max(job["stages_total"], 1)
+        st.progress(min(done / total, 1.0), text=f"Pipeline running: {done}/{job['stages_total']} stages "
+                                                 f"({job['elapsed_seconds']:.0f}s)")
+        if job["running"]:
+            st.caption("Running: " + ", ".join(job["running"]))
+        st.session_state.pipeline_job = job["job_id"]
+    elif st.session_state.get("pipeline_job") == job["job_id"]:
+        # The job this session was following just finished: reload the changed results
+        st.session_state.pipeline_job = None
+        st.rerun(scope="app")
+    elif job["state"] == "succeeded":
+        st.caption(f"Last run finished {job['finished'][:16].replace('T', ' ')} UTC "
+                   f"in {job['elapsed_seconds']:.0f}s.")
+    else:
+        st.error(f"Last pipeline run failed (job {job['job_id']}); see output/jobs/{job['job_id']}.log.")
 
 
-clv_df = load_clv_data()
-if clv_df.empty:
-    st.warning("No analytics generated yet. Run the pipeline to populate the dashboard.")
-    st.stop()
+with st.sidebar:
+    pipeline_job_panel()
 
 
-# ====================== RUN PIPELINE BUTTON ======================
-if st.sidebar.button("Run Analytics Pipeline"):
-    import subprocess, sys
-    st.sidebar.info("Executing main.py… check terminal for progress.")
-    subprocess.run([sys.executable, "main.py"], check=False)
-    st.cache_data.clear()
-    st.rerun()
+# ====================== ASK THE DATA ======================
+# Answered from the run's insight index (src.local_insights), streamed word by word
+with st.sidebar:
+    st.markdown("### Ask the Data")
+    question = st.text_input("Question", placeholder="e.g. top 5 in cluster 2", key="insight_query")
+    if question:
+        insight_index = load_insights(result_version("insight_index.json"))
+        result = answer_query(question, insight_index)
+        st.write_stream(stream_insight(result["answer"]))
+        latency = latency_stats()
+        st.caption(f"{result['intent']} · {result['latency_ms']:.2f} ms "
+                   f"(p95 {latency['p95_ms']:.2f} ms over {latency['count']} queries)")
 
 
 # ====================== CLUSTER FILTER ======================
-if "cluster" in clv_df.columns:
-    cluster_options = ["All"] + sorted(clv_df["cluster"].astype(int).unique().tolist())
+# Everything below reads the pre-aggregated cubes for the selected view (see
+# src.dashboard_cubes), so widget changes cost the same whatever the customer count.
+cubes = load_cubes(result_version(*(f"{name}.csv" for name in CUBES), "clv_predictions.csv"))
+cluster_views = [v for v in cubes["cube_cluster_stats"]["view"] if v != ALL]
+view = ALL
+if cluster_views:
+    cluster_options = ["All"] + sorted(int(v) for v in cluster_views)
     cluster_filter = st.sidebar.selectbox("Focus on Cluster", cluster_options)
     if cluster_filter != "All":
-        clv_df = clv_df[clv_df["cluster"].astype(int) == cluster_filter]
+        view = str(cluster_filter)
+stats = view_stats(cubes, view)
 
 
 # ====================== HEADER ======================
@@ -130,13 +282,12 @@ st.markdown(
 
 
 # ====================== METRICS ======================
-metrics = compute_summary_metrics(clv_df)
 col1, col2, col3, col4 = st.columns(4)
-col1.metric("Cities Analysed", f"{metrics['total_cities']:,}")
-col2.metric("Average CLV", format_currency(metrics["avg_clv"]))
-col3.metric("Total Revenue", format_currency(metrics["total_revenue"]))
-if metrics["avg_churn_probability"] is not None:
-    col4.metric("Avg Churn Probability", f"{metrics['avg_churn_probability']*100:,.1f}%")
+col1.metric("Cities Analysed", f"{int(stats.get('customers', 0)):,}")
+col2.metric("Average CLV", format_currency(stats.get("avg_clv", float("nan"))))
+col3.metric("Total Revenue", format_currency(stats.get("total_revenue", 0.0)))
+if "avg_churn_probability" in stats:
+    col4.metric("Avg Churn Probability", f"{stats['avg_churn_probability']*100:,.1f}%")
 else:
     col4.metric("Avg Churn Probability", "N/A")
 
@@ -152,7 +303,12 @@ tab_overview, tab_segments, tab_clv, tab_churn, tab_nbo, tab_uplift, tab_forecas
 # ====================== TAB: OVERVIEW ======================
 with tab_overview:
     st.subheader("Momentum Snapshot")
-    history = load_pipeline_history()
+    timeline_windows = {"All runs": None, "Last 7 days": 7, "Last 30 days": 30, "Last 90 days": 90}
+    window = st.selectbox("Timeline window", list(timeline_windows), key="timeline_window")
+    window_days = timeline_windows[window]
+    history = load_pipeline_history(
+        start=(datetime.utcnow() - pd.Timedelta(days=window_days)).isoformat() if window_days else None
+    )
     if history:
         history_df = pd.DataFrame(history)
         history_df["run_timestamp"] = pd.to_datetime(history_df["run_timestamp"])
@@ -187,30 +343,29 @@ with tab_overview:
 
     st.markdown("### Highlights")
     c1, c2, c3 = st.columns(3)
-    if "cluster" in clv_df.columns:
-        top_cluster = clv_df.groupby("cluster")["CLV"].mean().sort_values(ascending=False).head(1)
-        if not top_cluster.empty:
-            c1.success(f"Cluster {int(top_cluster.index[0])} leads with avg CLV {format_currency(top_cluster.iloc[0])}.")
-    top_city = clv_df.sort_values("CLV", ascending=False).head(1)
+    top_cluster = leading_cluster(cubes, cluster_views if view == ALL else [view])
+    if top_cluster is not None:
+        c1.success(f"Cluster {top_cluster['view']} leads with avg CLV {format_currency(top_cluster['avg_clv'])}.")
+    top_city = view_top(cubes, "clv", view).head(1)
     if not top_city.empty:
         city = top_city.iloc[0]
         c2.info(f"{city['customer_id']} is top city with CLV {format_currency(city['CLV'])}.")
-    if "churn_probability" in clv_df.columns:
-        high_risk = (clv_df["churn_probability"] > 0.6).mean()
-        c3.warning(f"{high_risk*100:,.1f}% of cities flagged as high churn risk (>60%).")
+    if "high_risk_share" in stats:
+        c3.warning(f"{stats['high_risk_share']*100:,.1f}% of cities flagged as high churn risk (>60%).")
 
 
 # ====================== TAB: SEGMENTS ======================
 with tab_segments:
     st.subheader("Segment Explorer")
-    seg_df = load_segment_data()
+    seg_df = load_segment_data(result_version("segment_analysis.csv"))
     if not seg_df.empty:
         st.dataframe(seg_df, use_container_width=True, height=280)
     else:
         st.info("Segment analysis not available.")
 
-    if {"recency", "monetary_value", "CLV"}.issubset(clv_df.columns):
-        src = clv_df.copy()
+    points, total_points = load_segment_points(clv_version, view, SCATTER_BUDGET)
+    if {"recency", "monetary_value", "CLV"}.issubset(points.columns):
+        src = points.copy()
         src["CLV_size"] = src["CLV"].fillna(0).astype(float)
         scatter_fig = px.scatter(
             src,
@@ -230,11 +385,17 @@ with tab_segments:
             font_color=TEXT_COLOR if is_dark else "#2a2a2a"
         )
         st.plotly_chart(scatter_fig, use_container_width=True)
+        if len(points) < total_points:
+            st.caption(f"Showing {len(points):,} of {total_points:,} customers: a per-cluster sample "
+                       f"plus the most extreme points.")
 
-    if "cluster" in clv_df.columns:
+    if cluster_views:
+        mix = cubes["cube_cluster_stats"]
+        mix = mix[mix["view"].isin(cluster_views if view == ALL else [view])]
         pie_fig = px.pie(
-            clv_df,
-            names=clv_df["cluster"].astype(str),
+            mix,
+            names="view",
+            values="customers",
             title="Cluster Mix",
             hole=0.45,
             template=PLOT_TEMPLATE,
@@ -247,29 +408,40 @@ with tab_segments:
 # ====================== TAB: CLV INSIGHTS ======================
 with tab_clv:
     st.subheader("Value Trajectory")
-    if "CLV" in clv_df.columns:
-        hist_fig = px.histogram(
-            clv_df,
+    clv_bins = view_histogram(cubes, "CLV", view, by_cluster=True)
+    if not clv_bins.empty:
+        clv_bins = clv_bins.assign(
+            CLV=(clv_bins["bin_left"] + clv_bins["bin_right"]) / 2,
+            width=clv_bins["bin_right"] - clv_bins["bin_left"],
+            cluster=clv_bins["cluster"].astype(str),
+        )
+        hist_fig = px.bar(
+            clv_bins,
             x="CLV",
-            nbins=40,
-            color=clv_df["cluster"].astype(str) if "cluster" in clv_df.columns else None,
-            marginal="rug",
+            y="count",
+            color="cluster" if cluster_views else None,
             opacity=0.75,
             title="CLV Distribution",
             template=PLOT_TEMPLATE,
             color_discrete_sequence=CLUSTER_COLORS,
         )
+        hist_fig.update_traces(width=clv_bins["width"].iloc[0])
         hist_fig.update_layout(
+            bargap=0,
             plot_bgcolor='rgba(0,0,0,0)',
             paper_bgcolor='rgba(0,0,0,0)',
             font_color=TEXT_COLOR if is_dark else "#2a2a2a"
         )
         st.plotly_chart(hist_fig, use_container_width=True)
 
-    if {"CLV", "CLV_ML"}.issubset(clv_df.columns):
+    if "clv_ml_median" in stats and "clv_median" in stats:
         box_fig = go.Figure()
-        box_fig.add_trace(go.Box(y=clv_df["CLV"], name="Probabilistic CLV", marker_color="#1f77b4"))
-        box_fig.add_trace(go.Box(y=clv_df["CLV_ML"], name="ML CLV", marker_color="#ff7f0e"))
+        for prefix, label, color in (("clv", "Probabilistic CLV", "#1f77b4"), ("clv_ml", "ML CLV", "#ff7f0e")):
+            box_fig.add_trace(go.Box(
+                name=label, marker_color=color, x=[label],
+                **{part: [stats[f"{prefix}_{part}"]]
+                   for part in ("q1", "median", "q3", "mean", "lowerfence", "upperfence")},
+            ))
         box_fig.update_layout(
             title="CLV Model Comparison",
             template=PLOT_TEMPLATE,
@@ -278,28 +450,31 @@ with tab_clv:
             font_color=TEXT_COLOR if is_dark else "#2a2a2a"
         )
         st.plotly_chart(box_fig, use_container_width=True)
-        diff = (clv_df["CLV_ML"] - clv_df["CLV"]).mean()
-        st.caption(f"Average ML lift vs probabilistic: {diff:,.1f}")
+        st.caption(f"Average ML lift vs probabilistic: {stats['avg_ml_lift']:,.1f}")
 
 
 # ====================== TAB: CHURN RISK ======================
 with tab_churn:
     st.subheader("Churn Radar")
-    churn_df = load_churn_risk()
+    churn_df = load_churn_risk(result_version("top_churn_risk.csv"))
     if not churn_df.empty:
         st.dataframe(churn_df, use_container_width=True, height=280)
 
-    if "churn_probability" in clv_df.columns:
-        churn_hist = px.histogram(
-            clv_df,
+    churn_bins = view_histogram(cubes, "churn_probability", view)
+    if not churn_bins.empty:
+        churn_bins = churn_bins.assign(churn_probability=(churn_bins["bin_left"] + churn_bins["bin_right"]) / 2)
+        churn_hist = px.bar(
+            churn_bins,
             x="churn_probability",
-            nbins=30,
+            y="count",
             color_discrete_sequence=[PRIMARY_COLOR],
             title="Churn Probability Spread",
             template=PLOT_TEMPLATE,
         )
         churn_hist.update_xaxes(title="Churn Probability", tickformat=".0%")
+        churn_hist.update_traces(width=(churn_bins["bin_right"] - churn_bins["bin_left"]).iloc[0])
         churn_hist.update_layout(
+            bargap=0,
             plot_bgcolor='rgba(0,0,0,0)',
             paper_bgcolor='rgba(0,0,0,0)',
             font_color=TEXT_COLOR if is_dark else "#2a2a2a"
@@ -307,9 +482,13 @@ with tab_churn:
         st.plotly_chart(churn_hist, use_container_width=True)
 
         threshold = st.slider("Alert threshold", 0.0, 1.0, 0.6, 0.05)
-        flagged = clv_df[clv_df["churn_probability"] >= threshold]
-        st.write(f"Cities above threshold ({len(flagged)}):")
-        st.dataframe(flagged[["customer_id", "cluster", "CLV", "churn_probability"]], use_container_width=True)
+        st.write(f"Cities above threshold ({customers_at_threshold(cubes, threshold, view)}):")
+        paged_table(
+            "churn_flagged", "clv_predictions", sort_by="churn_probability",
+            columns=["customer_id", "cluster", "CLV", "churn_probability"],
+            filters=selection_filters(churn_probability=(">=", threshold),
+                                      cluster=None if view == ALL else int(view)),
+        )
     else:
         st.info("Churn model disabled in the last run.")
 
@@ -317,18 +496,16 @@ with tab_churn:
 # ====================== TAB: NEXT-BEST-OFFER ======================
 with tab_nbo:
     st.subheader("Next-Best-Offer Engine")
-    nbo_df = load_nbo_data()
-    if not nbo_df.empty:
-        nbo_df = nbo_df.copy()
-        nbo_df["CLV"] = pd.to_numeric(nbo_df["CLV"], errors='coerce').fillna(0)
-        nbo_df["offer_score"] = pd.to_numeric(nbo_df["offer_score"], errors='coerce').fillna(0)
-        nbo_df = nbo_df[nbo_df["offer_score"] > 0]
-
-        if nbo_df.empty:
+    nbo_version = result_version("nbo_recommendations.csv")
+    if nbo_version != "-":
+        nbo_columns = None  # every column; only one page is sent
+        nbo_filters = selection_filters(offer_score=(">", 0))
+        top10, n_offers = load_page(nbo_version, "nbo_recommendations", 0, 10, "offer_score", nbo_columns, nbo_filters)
+
+        if n_offers == 0:
             st.warning("No valid offer data.")
         else:
-            st.dataframe(nbo_df.head(20), use_container_width=True)
-            top10 = nbo_df.head(10)
+            paged_table("nbo", "nbo_recommendations", sort_by="offer_score", columns=nbo_columns, filters=nbo_filters)
             fig = px.bar(
                 top10,
                 x="customer_id",
@@ -346,7 +523,7 @@ with tab_nbo:
 # ====================== TAB: UPLIFT ======================
 with tab_uplift:
     st.subheader("Campaign Uplift Modeling")
-    uplift_df = load_uplift_data()
+    uplift_df = load_uplift_data(result_version("uplift_results.csv"))
     if not uplift_df.empty:
         uplift_df = uplift_df.copy()
         uplift_df["CLV"] = pd.to_numeric(uplift_df["CLV"], errors='coerce').fillna(0)
@@ -375,6 +552,60 @@ with tab_uplift:
                 font_color=TEXT_COLOR if is_dark else "#2a2a2a"
             )
             st.plotly_chart(fig, use_container_width=True)
+
+        curves_df, deciles_df, uplift_metrics = load_uplift_evaluation(
+            result_version("uplift_curves.csv", "uplift_deciles.csv", "uplift_metrics.json"))
+        if uplift_metrics:
+            band = f"{uplift_metrics['confidence']*100:.0f}% CI"
+            u1, u2 = st.columns(2)
+            u1.metric(
+                "AUUC", f"{uplift_metrics['auuc']:.4f}",
+                help=f"{band}: {uplift_metrics['auuc_lower']:.4f} – {uplift_metrics['auuc_upper']:.4f}",
+            )
+            u2.metric(
+                "Qini Coefficient", f"{uplift_metrics['qini_coefficient']:.4f}",
+                help=f"{band}: {uplift_metrics['qini_coefficient_lower']:.4f} – "
+                     f"{uplift_metrics['qini_coefficient_upper']:.4f}",
+            )
+        if not curves_df.empty:
+            qini_fig = go.Figure()
+            qini_fig.add_trace(go.Scatter(
+                x=curves_df["fraction_targeted"], y=curves_df["qini_upper"],
+                line=dict(width=0), showlegend=False, hoverinfo="skip"
+            ))
+            qini_fig.add_trace(go.Scatter(
+                x=curves_df["fraction_targeted"], y=curves_df["qini_lower"],
+                fill="tonexty", fillcolor="rgba(195,55,100,0.2)", line=dict(width=0),
+                name="Bootstrap band"
+            ))
+            qini_fig.add_trace(go.Scatter(
+                x=curves_df["fraction_targeted"], y=curves_df["qini"],
+                name="Model", line=dict(color=PRIMARY_COLOR)
+            ))
+            qini_fig.add_trace(go.Scatter(
+                x=curves_df["fraction_targeted"], y=curves_df["qini_random"],
+                name="Random", line=dict(dash="dot", color="gray")
+            ))
+            qini_fig.update_xaxes(title="Fraction Targeted", tickformat=".0%")
+            qini_fig.update_yaxes(title="Incremental Responders per Customer")
+            qini_fig.update_layout(
+                title="Qini Curve",
+                template=PLOT_TEMPLATE,
+                plot_bgcolor='rgba(0,0,0,0)',
+                paper_bgcolor='rgba(0,0,0,0)',
+                font_color=TEXT_COLOR if is_dark else "#2a2a2a"
+            )
+            st.plotly_chart(qini_fig, use_container_width=True)
+        if not deciles_df.empty:
+            decile_fig = px.bar(
+                deciles_df,
+                x="decile",
+                y="uplift",
+                title="Observed Uplift by Score Decile",
+                template=PLOT_TEMPLATE,
+                color_discrete_sequence=[PRIMARY_COLOR],
+            )
+            st.plotly_chart(decile_fig, use_container_width=True)
     else:
         st.info("Enable uplift in config.yaml and rerun pipeline.")
 
@@ -382,8 +613,29 @@ with tab_uplift:
 # ====================== TAB: FORECAST ======================
 with tab_forecast:
     st.subheader("30-Day CLV Forecast")
-    forecast_df = load_forecast_data()
-    if not forecast_df.empty:
+    forecast_df = load_forecast_data(result_version("forecast_results.csv", "forecast_results_wide.csv"))
+    if not forecast_df.empty and "expected_revenue" in forecast_df.columns:
+        city = st.selectbox("Select City", forecast_df["customer_id"].unique(), key="forecast_city")
+        city_data = forecast_df[forecast_df["customer_id"] == city]
+
+        fig = go.Figure()
+        fig.add_trace(go.Scatter(
+            x=city_data["date"], y=city_data["expected_revenue"],
+            name="Expected Revenue (cumulative)", line=dict(color=PRIMARY_COLOR)
+        ))
+        fig.add_trace(go.Scatter(
+            x=city_data["date"], y=city_data["prob_alive"],
+            name="P(alive)", yaxis="y2", line=dict(dash="dot", color="gray")
+        ))
+        fig.update_layout(
+            title=f"BG/NBD Forecast: {city}",
+            template=PLOT_TEMPLATE,
+            font_color=TEXT_COLOR if is_dark else "#2a2a2a",
+            yaxis2=dict(overlaying="y", side="right", range=[0, 1], tickformat=".0%"),
+        )
+        st.plotly_chart(fig, use_container_width=True)
+        st.write("**Next 30 Days:**", format_currency(city_data["expected_revenue"].iloc[-1]))
+    elif not forecast_df.empty:
         # Clean forecast data
         forecast_df["historical_clv"] = pd.to_numeric(forecast_df["historical_clv"], errors='coerce').fillna(0)
         forecast_df["forecast_clv"] = pd.to_numeric(forecast_df["forecast_clv"], errors='coerce').fillna(0)
@@ -410,6 +662,80 @@ with tab_forecast:
     else:
         st.info("Run forecasting module in pipeline.")
 
+    trajectories, trajectory_meta, trajectory_rows = load_trajectories(
+        result_version("ltv_trajectories.npy", "ltv_trajectories.json"))
+    if trajectories is not None:
+        st.subheader("Lifetime Trajectory")
+        traj_city = st.selectbox("Select City", list(trajectory_rows), key="trajectory_city")
+        horizon = st.slider("Horizon (days)", min_value=trajectory_meta["step"], max_value=trajectory_meta["days"],
+                            value=trajectory_meta["days"], step=trajectory_meta["step"])
+        grid = trajectory_day_grid(trajectory_meta)
+        n_points = int((grid <= horizon).sum())
+        purchases, alive, revenue = trajectories[:, trajectory_rows[traj_city], :n_points]
+        days_axis = (pd.Timestamp(trajectory_meta["observation_end"]) + pd.to_timedelta(grid[:n_points], unit="D")
+                     if trajectory_meta.get("observation_end") else grid[:n_points])
+
+        t1, t2, t3 = st.columns(3)
+        t1.metric("Expected Purchases", f"{purchases[-1]:.2f}")
+        t2.metric("Expected Revenue", format_currency(float(revenue[-1])))
+        t3.metric("P(alive) if no purchase", f"{alive[-1]:.1%}")
+
+        traj_fig = go.Figure()
+        traj_fig.add_trace(go.Scatter(
+            x=days_axis, y=revenue, name="Expected Revenue (cumulative)", line=dict(color=PRIMARY_COLOR)
+        ))
+        traj_fig.add_trace(go.Scatter(
+            x=days_axis, y=alive, name="P(alive)", yaxis="y2", line=dict(dash="dot", color="gray")
+        ))
+        traj_fig.update_layout(
+            title=f"{horizon}-Day Trajectory: {traj_city}",
+            template=PLOT_TEMPLATE,
+            font_color=TEXT_COLOR if is_dark else "#2a2a2a",
+            yaxis2=dict(overlaying="y", side="right", range=[0, 1], tickformat=".0%"),
+        )
+        st.plotly_chart(traj_fig, use_container_width=True)
+
+    st.subheader("Sales Forecast")
+    sales_df, fits_df = load_sales_forecast(result_version("sales_forecast.csv", "sales_forecast_fits.csv"))
+    if not sales_df.empty:
+        sales_city = st.selectbox("Select City", sales_df["customer_id"].unique(), key="sales_forecast_city")
+        city_sales = sales_df[sales_df["customer_id"] == sales_city]
+        future = city_sales.dropna(subset=["forecast_sales"])
+
+        sales_fig = go.Figure()
+        sales_fig.add_trace(go.Scatter(
+            x=city_sales["date"], y=city_sales["actual_sales"],
+            name="Actual", line=dict(color="gray")
+        ))
+        sales_fig.add_trace(go.Scatter(
+            x=future["date"], y=future["upper"],
+            line=dict(width=0), showlegend=False, hoverinfo="skip"
+        ))
+        sales_fig.add_trace(go.Scatter(
+            x=future["date"], y=future["lower"],
+            fill="tonexty", fillcolor="rgba(195,55,100,0.2)", line=dict(width=0),
+            name="Prediction interval"
+        ))
+        sales_fig.add_trace(go.Scatter(
+            x=future["date"], y=future["forecast_sales"],
+            name="Forecast", line=dict(dash="dot", color=PRIMARY_COLOR)
+        ))
+        sales_fig.update_layout(
+            title=f"Sales Forecast: {sales_city}",
+            template=PLOT_TEMPLATE,
+            font_color=TEXT_COLOR if is_dark else "#2a2a2a"
+        )
+        st.plotly_chart(sales_fig, use_container_width=True)
+        st.write("**Forecast Horizon Total:**", format_currency(future["forecast_sales"].sum()))
+
+        if not fits_df.empty:
+            fit_row = fits_df[fits_df["customer_id"] == sales_city]
+            st.dataframe(fit_row, use_container_width=True, hide_index=True)
+            st.caption(f"{len(fits_df):,} series fitted; mean fit time "
+                       f"{fits_df['fit_seconds'].mean() * 1e3:.3f} ms per series.")
+    else:
+        st.info("Run forecasting module in pipeline.")
+
 
 # ====================== TAB: DIAGNOSTICS ======================
 with tab_diagnostics:
@@ -417,12 +743,46 @@ with tab_diagnostics:
     history = load_pipeline_history()
     if history:
         hist_df = pd.DataFrame(history)
-        st.dataframe(hist_df.sort_values("run_timestamp", ascending=False), use_container_width=True)
+        st.dataframe(hist_df.drop(columns=["stages"], errors="ignore").sort_values("run_timestamp", ascending=False),
+                     use_container_width=True)
+
+        st.markdown("### Stage Profile")
+        profiled = [run for run in history if run.get("stages")]
+        if profiled:
+            latest_stages = pd.DataFrame(profiled[-1]["stages"])
+            st.caption(f"Latest profiled run: {profiled[-1].get('run_id') or profiled[-1]['run_timestamp']}")
+            if profiled[-1].get("critical_path"):
+                st.caption(f"Critical path ({profiled[-1]['critical_path_seconds']:.2f}s of "
+                           f"{profiled[-1]['total_wall_seconds']:.2f}s wall): "
+                           + " → ".join(profiled[-1]["critical_path"]))
+            stage_fig = px.bar(
+                latest_stages,
+                x="wall_seconds",
+                y="stage",
+                orientation="h",
+                color="status",
+                hover_data=[c for c in ("cpu_seconds", "peak_rss_mb", "rows_in", "rows_out") if c in latest_stages],
+                title="Wall Time per Stage (latest run)",
+                template=PLOT_TEMPLATE,
+            )
+            stage_fig.update_layout(yaxis={"categoryorder": "total ascending"})
+            st.plotly_chart(stage_fig, use_container_width=True)
+            st.dataframe(latest_stages, use_container_width=True)
+
+            trend_df = pd.DataFrame([
+                {"run_timestamp": run["run_timestamp"], "stage": s["stage"], "wall_seconds": s["wall_seconds"]}
+                for run in profiled for s in run["stages"]
+            ])
+            trend_df["run_timestamp"] = pd.to_datetime(trend_df["run_timestamp"])
+            trend_fig = px.line(trend_df, x="run_timestamp", y="wall_seconds", color="stage", markers=True,
+                                title="Stage Wall Time Across Runs", template=PLOT_TEMPLATE)
+            st.plotly_chart(trend_fig, use_container_width=True)
+        else:
+            st.info("No stage measurements recorded yet; they are added by the next pipeline run.")
     else:
         st.info("No run history found yet.")
 
     st.markdown("### Configuration Snapshot")
-    from pathlib import Path
     config_path = Path("config/config.yaml")
     if config_path.exists():
         st.code(config_path.read_text(), language="yaml")
\ No newline at end of file
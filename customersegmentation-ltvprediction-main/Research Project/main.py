@@ -1,141 +1,383 @@
 # main.py
+import logging
+import os
+from pathlib import Path
+
 import yaml
 import pandas as pd
-from src.data_preprocessing import load_and_clean_data, calculate_rfm
-from src.segmentation import perform_clustering, perform_auto_gmm_segmentation
-from src.ltv_prediction import predict_ltv
-from src.visualization import plot_rfm, plot_elbow, plot_clusters, plot_clv, plot_clv_by_cluster
-from src.logging_setup import logger
-from src.ml_clv import train_clv_model, predict_clv_ml
-from src.churn import label_churn, train_churn_model, predict_churn
-from src.dashboard_utils import build_history_entry, save_pipeline_history
+from src.ltv_trajectory import TRAJECTORY_FILE, TRAJECTORY_META_FILE
+from src.logging_setup import setup_logging
+from src.dashboard_utils import RESULTS_DIR, build_history_entry, save_pipeline_history
+from src import results_store
+from src import stage_cache
+from src import model_registry
+from src.job_runner import progress_reporter
+from src import instrumentation
+from src.instrumentation import profile_stage
+from src.pipeline_dag import run_dag, stage
+from src.uplift_evaluation import METRICS_FILE as UPLIFT_METRICS_FILE
 
-# --- NEW: NBO, UPLIFT, FORECASTING ---
-from src.nbo import run_nbo_recommendations
-from src.uplift import run_uplift_modeling
-from src.forecasting import run_city_forecast
+# Stage modules (and their sklearn, lifetimes, matplotlib, ... dependencies) are
+# imported inside the stage that runs them: a stage disabled in config.yaml or
+# served from the stage cache never loads them. Cache keys name those modules
+# as strings, which stage_cache versions without importing them.
+logger = logging.getLogger(__name__)
 
+CONFIG_PATH = Path(__file__).resolve().parent / "config" / "config.yaml"
+DATA_PATH = 'data/raw/INDIA_RETAIL_DATA.xlsx'
 
-def main():
-    # Load configuration
-    try:
-        with open(r"E:\Chosen\customersegmentation-ltvprediction-main\Research Project\config\config.yaml", 'r') as file:
-            config = yaml.safe_load(file)
-        logger.info("Configuration loaded successfully.")
-    except FileNotFoundError as e:
-        logger.error(f"Configuration file not found: {e}")
-        raise
 
-    # Create output directories
-    import os
-    os.makedirs('output/figures', exist_ok=True)
-    os.makedirs('output/results', exist_ok=True)
-    logger.info("Output directories created.")
+def build_stages(config):
+    """
+    The pipeline as a DAG of stages (see src.pipeline_dag). Once LTV exists, the figures,
+    ML CLV and churn run side by side; NBO, uplift and forecasting wait for the
+    combined score table. Optional stages fail in isolation, as before. Deterministic
+    stages declare what their result depends on, for the stage cache.
+    """
+    ai = config.get('ai', {})
 
     # Data preprocessing
-    transaction_data = load_and_clean_data('data/raw/INDIA_RETAIL_DATA.xlsx')
-    rfm = calculate_rfm(transaction_data)
+    def ingest():
+        from src.data_preprocessing import load_and_clean_data
+        return load_and_clean_data(DATA_PATH)
+
+    def rfm_stage(transaction_data):
+        from src.data_preprocessing import calculate_rfm
+        rfm = calculate_rfm(transaction_data)
 
-    # Compute actual correlation
-    actual_city_stats = transaction_data.groupby('City').agg(
-        frequency=('Sales', 'count'),
-        monetary_value=('Sales', 'mean')
-    ).reset_index()
-    actual_corr = actual_city_stats[['frequency', 'monetary_value']].corr().iloc[0, 1]
-    logger.info(f"RFM data calculated for {len(rfm)} cities.")
+        # Compute actual correlation
+        actual_city_stats = transaction_data.groupby('City').agg(
+            frequency=('Sales', 'count'),
+            monetary_value=('Sales', 'mean')
+        ).reset_index()
+        actual_corr = actual_city_stats[['frequency', 'monetary_value']].corr().iloc[0, 1]
+        logger.info(f"RFM data calculated for {len(rfm)} cities.")
+        return rfm, actual_corr
 
     # Segmentation
-    if config.get('ai', {}).get('use_auto_gmm_segmentation', False):
-        rfm['cluster'] = perform_auto_gmm_segmentation(rfm, config.get('ai', {}).get('max_gmm_components', 7)).astype(int)
-    else:
-        rfm['cluster'] = perform_clustering(rfm, config['clustering']['n_clusters']).astype(int)
-    logger.info("Clustering completed.")
+    def segmentation(rfm_base):
+        from src.segmentation import assign_segments, fit_auto_gmm_segmentation, fit_clustering
+        rfm = rfm_base.copy()  # stage outputs are never modified downstream (cache hashes)
+        if ai.get('use_auto_gmm_segmentation', False):
+            scaler, model = fit_auto_gmm_segmentation(rfm, ai.get('max_gmm_components', 7),
+                                                      n_jobs=config['clustering'].get('n_jobs', 1))
+            rfm['cluster'] = assign_segments(rfm, scaler, model).astype(int)
+        else:
+            scaler, model = fit_clustering(rfm, config['clustering']['n_clusters'])
+            rfm['cluster'] = model.labels_.astype(int)
+        logger.info("Clustering completed.")
+        return rfm, (scaler, model)
 
     # LTV prediction
-    rfm = predict_ltv(rfm, config['ltv'])
-    logger.info("LTV prediction completed.")
-    ml_metrics = None
-    churn_metrics = None
-
-    # Optional: ML-based CLV
-    if config.get('ai', {}).get('use_ml_clv', False):
-        model, ml_metrics = train_clv_model(rfm)
-        rfm = predict_clv_ml(rfm, model)
+    def ltv(rfm_clustered):
+        from src.ltv_prediction import fit_ltv_models, predict_ltv
+        ltv_models = fit_ltv_models(rfm_clustered, config['ltv'])
+        rfm_ltv = predict_ltv(rfm_clustered.copy(), config['ltv'], models=ltv_models)
+        logger.info("LTV prediction completed.")
+        return rfm_ltv, ltv_models
+
+    def ltv_trajectories(rfm_ltv, ltv_models, transaction_data):
+        from src.ltv_trajectory import run_ltv_trajectories
+        _, meta = run_ltv_trajectories(rfm_ltv, ltv_models[0], config['ltv'],
+                                       observation_end=pd.to_datetime(transaction_data['Order Date']).max())
+        logger.info("LTV trajectories saved.")
+        return meta
+
+    # Optional: ML-based CLV (on a copy; churn reads the same table concurrently)
+    def ml_clv(rfm_ltv):
+        from src.ml_clv import predict_clv_ml, train_clv_model
+        model, ml_metrics = train_clv_model(rfm_ltv)
+        clv_ml = predict_clv_ml(rfm_ltv.copy(), model)['CLV_ML']
         logger.info(f"ML CLV trained. R2={ml_metrics['r2']:.3f}, MAE={ml_metrics['mae']:.2f}")
+        return clv_ml, ml_metrics, model
 
     # Optional: Churn propensity
-    if config.get('ai', {}).get('use_churn', False):
+    def churn(rfm_ltv, transaction_data):
+        from src.churn import label_churn, predict_churn, train_churn_model
         churn_labels = label_churn(transaction_data, horizon_days=90)
-        clf, churn_metrics = train_churn_model(rfm, churn_labels)
-        rfm = predict_churn(rfm, clf)
+        clf, churn_metrics = train_churn_model(rfm_ltv, churn_labels)
+        churn_probability = predict_churn(rfm_ltv.copy(), clf)['churn_probability']
         logger.info(f"Churn model trained. AUC={churn_metrics['auc']:.3f}")
+        return churn_probability, churn_metrics, clf
 
-    # Visualizations
-    plot_rfm(rfm, 'output/figures/rfm_distributions.png')
-    plot_elbow(rfm, 'output/figures/elbow_plot.png')
-    plot_clusters(rfm, 'output/figures/cluster_scatter.png')
-    plot_clv(rfm, 'output/figures/clv_distribution.png')
-    plot_clv_by_cluster(rfm, 'output/figures/clv_by_cluster.png')
-    logger.info("Visualizations generated.")
-
-    # --- FIX: Save customer_id as COLUMN ---
-    rfm_with_id = rfm.reset_index().rename(columns={'index': 'customer_id'})
+    def scores(rfm_ltv, clv_ml, churn_probability):
+        rfm = rfm_ltv.copy()
+        if clv_ml is not None:
+            rfm['CLV_ML'] = clv_ml
+        if churn_probability is not None:
+            rfm['churn_probability'] = churn_probability
+        # --- FIX: Save customer_id as COLUMN ---
+        rfm_with_id = rfm.reset_index().rename(columns={'index': 'customer_id'})
+        return rfm, rfm_with_id
 
     # Save core results
-    rfm_with_id.to_csv('output/results/clv_predictions.csv', index=False)
-    rfm.groupby('cluster')[['recency', 'frequency', 'monetary_value']].mean().to_csv('output/results/segment_analysis.csv')
+    def persist_results(rfm, rfm_with_id):
+        results_store.write_artifact('clv_predictions', rfm_with_id)
+        segment_analysis = rfm.groupby('cluster')[['recency', 'frequency', 'monetary_value']].mean().reset_index()
+        results_store.write_artifact('segment_analysis', segment_analysis)
 
-    # Top 10 customers
-    top_10 = rfm.sort_values('CLV', ascending=False).head(10).reset_index().rename(columns={'index': 'customer_id'})
-    top_10.to_csv('output/results/top_customers.csv', index=False)
+        # Top 10 customers
+        top_10 = rfm.sort_values('CLV', ascending=False).head(10).reset_index().rename(columns={'index': 'customer_id'})
+        results_store.write_artifact('top_customers', top_10)
 
-    # Top churn risk
-    if 'churn_probability' in rfm.columns:
-        top_churn = rfm.sort_values('churn_probability', ascending=False).head(20).reset_index().rename(columns={'index': 'customer_id'})
-        top_churn.to_csv('output/results/top_churn_risk.csv', index=False)
+        # Top churn risk
+        if 'churn_probability' in rfm.columns:
+            top_churn = rfm.sort_values('churn_probability', ascending=False).head(20).reset_index().rename(columns={'index': 'customer_id'})
+            results_store.write_artifact('top_churn_risk', top_churn)
 
-    logger.info("Core results saved to CSV files.")
+        logger.info("Core results saved to the results store.")
+        return segment_analysis, top_10
+
+    # Pre-aggregated tables the dashboard renders from (src.dashboard_cubes)
+    def cubes(rfm_with_id):
+        from src.dashboard_cubes import build_cubes
+        for name, cube in build_cubes(rfm_with_id, config.get('cubes', {})).items():
+            results_store.write_artifact(name, cube)
+        logger.info("Dashboard cubes saved to the results store.")
+
+    # Visualizations (process pool; figures whose input is unchanged are not redrawn).
+    # A single figure or n_jobs 1 draws in this thread, hence the matplotlib lock.
+    def figures(rfm_ltv):
+        from src.visualization import render_figures
+        status = render_figures(rfm_ltv, 'output/figures', config.get('visualization', {}))
+        rendered = [name for name, state in status.items() if state == 'rendered']
+        logger.info(f"Visualizations generated: {len(rendered)} rendered, {len(status) - len(rendered)} unchanged.")
 
     # ------------------- NBO -------------------
-    if config.get("ai", {}).get("use_nbo", False):
-        try:
-            run_nbo_recommendations(rfm_with_id)
-            logger.info("NBO recommendations generated.")
-        except Exception as e:
-            logger.error(f"NBO failed: {e}")
+    def nbo(rfm_with_id):
+        from src.nbo import run_nbo_recommendations
+        recommendations = run_nbo_recommendations(rfm_with_id, config.get("nbo", {}))
+        logger.info("NBO recommendations generated.")
+        return recommendations
 
     # ------------------- UPLIFT MODELING -------------------
-    if config.get("ai", {}).get("use_uplift", False):
-        try:
-            run_uplift_modeling(rfm_with_id)
-            logger.info("Uplift modeling completed.")
-        except Exception as e:
-            logger.error(f"Uplift modeling failed: {e}")
+    def uplift(rfm, rfm_with_id, transaction_data):
+        from src.campaign_exposure import build_treatment_response, load_exposure_log
+        from src.uplift import fit_uplift_arms, run_uplift_modeling, uplift_features
+        uplift_config = config.get("uplift", {})
+        assignment = None
+        if uplift_config.get("exposure_log"):
+            assignment = build_treatment_response(
+                load_exposure_log(uplift_config["exposure_log"]),
+                transaction_data,
+                customers=rfm.index,
+                response_window_days=uplift_config.get("response_window_days", 30),
+            )
+            logger.info(f"Treatment/response derived from exposure log for {len(assignment)} customers.")
+        uplift_df = run_uplift_modeling(rfm_with_id, uplift_config, assignment=assignment)
+        logger.info("Uplift modeling completed.")
+        # The scores above are out-of-fold; scoring new customers needs arms fitted on everyone
+        uplift_models = None
+        if "uplift" in uplift_df.columns:
+            uplift_models = fit_uplift_arms(uplift_features(uplift_df), uplift_df["response"],
+                                            uplift_df["treatment_group"] == "Treatment")
+        return uplift_df, uplift_models
+
+    # ------------------- CAMPAIGN TARGETING -------------------
+    def targeting(uplift_df):
+        if uplift_df is None or "uplift" not in uplift_df.columns:
+            logger.warning("Campaign targeting skipped: no uplift scores available.")
+            return None
+        from src.targeting import run_campaign_targeting
+        selected, _ = run_campaign_targeting(uplift_df, config.get("targeting", {}))
+        logger.info("Campaign targeting completed.")
+        return selected
 
     # ------------------- FORECASTING -------------------
-    if config.get("ai", {}).get("use_forecasting", False):
-        try:
-            run_city_forecast(rfm_with_id)
-            logger.info("30-day CLV forecasting completed.")
-        except Exception as e:
-            logger.error(f"Forecasting failed: {e}")
-
-    # Persist pipeline history
-    history_entry = build_history_entry(rfm, ml_metrics=ml_metrics, churn_metrics=churn_metrics)
+    def forecast(rfm_with_id, transaction_data, trajectory_meta):
+        from src.forecasting import run_city_forecast
+        from src.ltv_trajectory import load_ltv_trajectories
+        forecast_start = pd.to_datetime(transaction_data['Order Date']).max() + pd.Timedelta(days=1)
+        # Without this run's trajectories, use the CLV drift panel rather than a stale file
+        trajectories = load_ltv_trajectories() if trajectory_meta is not None else None
+        panel = run_city_forecast(rfm_with_id, config=config.get("forecasting", {}),
+                                  base_date=forecast_start, trajectories=trajectories)
+        logger.info("30-day CLV forecasting completed.")
+        return panel
+
+    def sales_forecast(transaction_data):
+        from src.sales_forecast import run_sales_forecast
+        sales = run_sales_forecast(transaction_data, config.get("forecasting", {}))
+        logger.info("Per-city sales forecasting completed.")
+        return sales[0] if sales else None
+
+    # Facts the dashboard's Q&A answers from (src.local_insights)
+    def insights(rfm_with_id, forecast_panel):
+        from src.forecasting import wide_to_long
+        from src.local_insights import build_insight_index, save_insight_index
+        if forecast_panel is not None and "date" not in forecast_panel.columns:
+            forecast_panel = wide_to_long(forecast_panel)
+        path = save_insight_index(build_insight_index(rfm_with_id, forecast_panel))
+        logger.info(f"Insight index saved: {path}")
+
+    segmentation_config = {key: ai.get(key) for key in ('use_auto_gmm_segmentation', 'max_gmm_components')}
+
+    # Fitted models of this run, for scoring without refitting (src.model_registry, src.score)
+    def register_models(rfm_ltv, segment_models, ltv_models, clv_model, ml_metrics, churn_model, churn_metrics,
+                        uplift_models, uplift_df):
+        from src.segmentation import SEGMENT_FEATURES
+        version = results_store.current_run_id()
+        save = model_registry.save_model
+        segment_config = {**segmentation_config, **config['clustering']}
+        scaler, clusterer = segment_models
+        save("segment_scaler", scaler, version, SEGMENT_FEATURES, segment_config, rfm_ltv[SEGMENT_FEATURES])
+        save("segment_model", clusterer, version, SEGMENT_FEATURES, segment_config, rfm_ltv[SEGMENT_FEATURES])
+        bgf, ggf = ltv_models
+        bgf_features = ['frequency', 'recency', 'T']
+        save("bgnbd", bgf, version, bgf_features, config['ltv'], rfm_ltv[bgf_features],
+             {name: float(value) for name, value in bgf.params_.items()})
+        if ggf is not None:
+            save("gamma_gamma", ggf, version, ['frequency', 'monetary_value'], config['ltv'],
+                 rfm_ltv[['frequency', 'monetary_value']], {name: float(value) for name, value in ggf.params_.items()})
+        for name, model, metrics in (("clv_gbm", clv_model, ml_metrics), ("churn_gbm", churn_model, churn_metrics)):
+            if model is not None:
+                features = list(model.feature_names_in_)
+                save(name, model, version, features, None, rfm_ltv[features], metrics)
+        if uplift_models is not None:
+            from src.uplift import uplift_features
+            X = uplift_features(uplift_df)
+            save("uplift_arms", uplift_models, version, list(X.columns), config.get("uplift", {}), X)
+        logger.info(f"Models saved to registry version {version}.")
+        return version
+
+    stages = [
+        stage("ingest", ingest, outputs=["transaction_data"],
+              cache={"sources": [DATA_PATH], "code": ["src.data_preprocessing"]}),
+        stage("rfm", rfm_stage, inputs=["transaction_data"], outputs=["rfm_base", "actual_corr"],
+              cache={"code": ["src.data_preprocessing"]}),
+        stage("segmentation", segmentation, inputs=["rfm_base"], outputs=["rfm_clustered", "segment_models"],
+              cache={"config": {**segmentation_config, **config['clustering']}, "code": ["src.segmentation"]}),
+        stage("ltv", ltv, inputs=["rfm_clustered"], outputs=["rfm_ltv", "ltv_models"],
+              cache={"config": config['ltv'], "code": ["src.ltv_prediction"]}),
+        stage("ltv_trajectories", ltv_trajectories, inputs=["rfm_ltv", "ltv_models", "transaction_data"],
+              outputs=["trajectory_meta"], isolated=True,
+              cache={"config": config['ltv'], "code": ["src.ltv_trajectory"],
+                     "files": [RESULTS_DIR / TRAJECTORY_FILE, RESULTS_DIR / TRAJECTORY_META_FILE]}),
+    ]
+    if ai.get('use_ml_clv', False):
+        stages.append(stage("ml_clv", ml_clv, inputs=["rfm_ltv"], outputs=["clv_ml", "ml_metrics", "clv_model"],
+                            cache={"code": ["src.ml_clv"]}))
+    if ai.get('use_churn', False):
+        stages.append(stage("churn", churn, inputs=["rfm_ltv", "transaction_data"],
+                            outputs=["churn_probability", "churn_metrics", "churn_model"], cache={"code": ["src.churn"]}))
+    stages.append(stage("figures", figures, inputs=["rfm_ltv"], resources=["matplotlib"]))
+    stages += [
+        stage("scores", scores, inputs=["rfm_ltv"], optional=["clv_ml", "churn_probability"],
+              outputs=["rfm", "rfm_with_id"]),
+        stage("persist_results", persist_results, inputs=["rfm", "rfm_with_id"],
+              outputs=["segment_analysis", "top_10"]),
+        stage("cubes", cubes, inputs=["rfm_with_id"], cache={"config": config.get('cubes', {}), "code": ["src.dashboard_cubes"]}),
+    ]
+    if ai.get("use_nbo", False):
+        stages.append(stage("nbo", nbo, inputs=["rfm_with_id"], outputs=["nbo_recommendations"], isolated=True,
+                            cache={"config": config.get("nbo", {}), "code": ["src.nbo"],
+                                   "files": [RESULTS_DIR / "nbo_allocation.json"]}))
+    if ai.get("use_uplift", False):
+        uplift_config = config.get("uplift", {})
+        uplift_figures = Path(uplift_config.get("figure_dir", "output/figures"))
+        # its pyplot figures share global state with the figures stage, hence the lock
+        stages.append(stage("uplift", uplift, inputs=["rfm", "rfm_with_id", "transaction_data"],
+                            outputs=["uplift_df", "uplift_models"], isolated=True, resources=["matplotlib"],
+                            cache={"config": uplift_config,
+                                   "code": ["src.uplift", "src.uplift_evaluation", "src.campaign_exposure"],
+                                   "sources": [uplift_config["exposure_log"]] if uplift_config.get("exposure_log") else [],
+                                   "files": [RESULTS_DIR / UPLIFT_METRICS_FILE,
+                                             uplift_figures / "uplift_top20.png",
+                                             uplift_figures / "uplift_feature_importance.png"]}))
+    if ai.get("use_targeting", False):
+        stages.append(stage("targeting", targeting, optional=["uplift_df"], outputs=["campaign_targets"],
+                            isolated=True, cache={"config": config.get("targeting", {}),
+                                                  "code": ["src.targeting"]}))
+    if ai.get("use_forecasting", False):
+        stages += [
+            # Not cached: it reads the trajectory file, which is not a DAG value
+            stage("forecast", forecast, inputs=["rfm_with_id", "transaction_data"], optional=["trajectory_meta"],
+                  outputs=["forecast_panel"], isolated=True),
+            stage("sales_forecast", sales_forecast, inputs=["transaction_data"], outputs=["sales_forecast"],
+                  isolated=True, cache={"config": config.get("forecasting", {}), "code": ["src.sales_forecast"]}),
+        ]
+    stages.append(stage("insights", insights, inputs=["rfm_with_id"], optional=["forecast_panel"], isolated=True))
+    if model_registry.enabled():
+        stages.append(stage("register_models", register_models, inputs=["rfm_ltv", "segment_models", "ltv_models"],
+                            optional=["clv_model", "ml_metrics", "churn_model", "churn_metrics", "uplift_models",
+                                      "uplift_df"],
+                            outputs=["model_version"], isolated=True))
+    return stages
+
+
+def main():
+    setup_logging()
+    # Load configuration
+    try:
+        with open(CONFIG_PATH, 'r') as file:
+            config = yaml.safe_load(file)
+        logger.info("Configuration loaded successfully.")
+    except FileNotFoundError as e:
+        logger.error(f"Configuration file not found: {e}")
+        raise
+
+    # Create output directories
+    os.makedirs('output/figures', exist_ok=True)
+    os.makedirs('output/results', exist_ok=True)
+    logger.info("Output directories created.")
+    results_store.configure(config.get("results", {}))
+    run_id = results_store.start_run()
+    logger.info(f"Results store run: {run_id}")
+    instrumentation.configure(config.get("instrumentation", {}))
+    instrumentation.reset()
+    stage_cache.configure(config.get("cache", {}))
+    model_registry.configure(config.get("registry", {}))
+
+    progress = progress_reporter()  # set when started from the dashboard's job runner
+    run = run_dag(build_stages(config), max_workers=config.get("pipeline", {}).get("max_workers", 4),
+                  run_id=run_id, on_event=progress)
+    outputs = run["outputs"]
+    rfm = outputs["rfm"]
+    logger.info(f"Critical path ({run['critical_path_seconds']:.2f}s of {run['wall_seconds']:.2f}s wall): "
+                + " -> ".join(run["critical_path"]))
+
+    # Make this run's results the default for readers, then drop old runs
+    with profile_stage("publish", run_id=run_id):
+        results_store.publish_run(run_id)
+        keep_runs = config.get("results", {}).get("keep_runs")
+        if keep_runs:
+            results_store.prune_runs(keep_runs)
+    logger.info(f"Results store run {run_id} published.")
+    if outputs.get("model_version"):
+        model_registry.publish(outputs["model_version"])
+        model_registry.prune()
+        logger.info(f"Model registry version {outputs['model_version']} published.")
+    if progress:
+        progress({"event": "run_published", "run_id": run_id})
+    if stage_cache.enabled():
+        evicted = stage_cache.evict()
+        cached = [name for name, state in run["status"].items() if state == "cached"]
+        logger.info(f"Stage cache: {len(cached)} stages reused" + (f", {len(evicted)} entries evicted." if evicted else "."))
+
+    # Persist pipeline history, with the stage measurements of this run
+    stages = instrumentation.stage_records()
+    logger.info("Stage timings:\n" + instrumentation.format_stage_table(stages))
+    history_entry = build_history_entry(rfm, ml_metrics=outputs.get("ml_metrics"),
+                                        churn_metrics=outputs.get("churn_metrics"))
+    history_entry["run_id"] = run_id
+    history_entry["stages"] = stages
+    history_entry["total_wall_seconds"] = run["wall_seconds"]
+    history_entry["critical_path"] = run["critical_path"]
+    history_entry["critical_path_seconds"] = run["critical_path_seconds"]
     save_pipeline_history(history_entry)
     logger.info("Run metrics appended to pipeline history.")
 
     # Print summary
-    print("Segment Analysis:\n", pd.read_csv('output/results/segment_analysis.csv'))
-    print("\nTop 10 Cities by CLV:\n", pd.read_csv('output/results/top_customers.csv'))
+    print("Segment Analysis:\n", outputs["segment_analysis"])
+    print("\nTop 10 Cities by CLV:\n", outputs["top_10"])
     print("\nCorrelation between frequency and monetary_value (RFM):",
           rfm[['frequency', 'monetary_value']].corr().iloc[0, 1])
     print("Correlation between frequency and monetary_value (Actual transactions):",
-          actual_corr)
+          outputs["actual_corr"])
     if 'profit_adjusted' in rfm.columns:
         print("\nAverage Profit Adjusted by Cluster:\n", rfm.groupby('cluster')['profit_adjusted'].mean())
     logger.info("Summary printed to console.")
 
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
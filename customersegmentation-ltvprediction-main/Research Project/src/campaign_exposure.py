@@ -0,0 +1,106 @@
+# src/campaign_exposure.py
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+
+def load_exposure_log(file_path) -> pd.DataFrame:
+    """
+    Load a campaign exposure log with at least `customer_id` and `exposure_date`
+    columns (CSV, Parquet or Excel, chosen by file extension).
+    """
+    path = Path(file_path)
+    if not path.exists():
+        raise FileNotFoundError(f"Exposure log not found at {file_path}.")
+    if path.suffix == ".parquet":
+        log = pd.read_parquet(path, columns=["customer_id", "exposure_date"])
+    elif path.suffix in (".xlsx", ".xls"):
+        log = pd.read_excel(path, usecols=["customer_id", "exposure_date"])
+    else:
+        log = pd.read_csv(path, usecols=["customer_id", "exposure_date"])
+    log["exposure_date"] = pd.to_datetime(log["exposure_date"], errors="coerce")
+    return log.dropna(subset=["customer_id", "exposure_date"])
+
+
+def _day_ordinals(dates: pd.Series) -> np.ndarray:
+    return pd.to_datetime(dates).to_numpy().astype("datetime64[D]").astype(np.int64)
+
+
+def build_treatment_response(exposures: pd.DataFrame, transaction_data: pd.DataFrame,
+                             customers: pd.Index, response_window_days: int = 30,
+                             campaign_start: Optional[pd.Timestamp] = None) -> pd.DataFrame:
+    """
+    Derive the uplift stage's treatment and response columns from real exposures.
+
+    Each exposure opens a response window of `response_window_days` starting on the
+    exposure day; an order inside it counts as a response. A window is cut short by
+    the same customer's next exposure, so every order is attributed to at most one
+    exposure (last touch). Customers in `customers` that were never exposed form the
+    control group, observed over one window from `campaign_start` (default: the
+    first exposure day).
+
+    The join is done on int codes: customers are factorised once, dates become day
+    ordinals, and transactions are sorted by the composite key `code * span + day`.
+    Window bounds are then located with two `np.searchsorted` calls over all events,
+    and revenue inside a window is a difference of cumulative sums.
+    `transaction_data` has the pipeline's City, Order Date and Sales columns.
+    Returns a frame indexed like `customers` with treatment_group, response,
+    response_revenue and exposures.
+    """
+    customers = pd.Index(customers)
+    tx = transaction_data[["City", "Order Date", "Sales"]].copy()
+    tx.columns = ["customer_id", "date", "revenues"]
+
+    exp_code = customers.get_indexer(exposures["customer_id"])
+    tx_code = customers.get_indexer(tx["customer_id"])
+    exp_keep, tx_keep = exp_code >= 0, tx_code >= 0
+    exp_code, exp_day = exp_code[exp_keep], _day_ordinals(exposures["exposure_date"])[exp_keep]
+    tx_code, tx_day = tx_code[tx_keep], _day_ordinals(tx["date"])[tx_keep]
+    tx_rev = pd.to_numeric(tx["revenues"], errors="coerce").fillna(0).to_numpy(dtype=np.float64)[tx_keep]
+
+    window = int(response_window_days)
+    if campaign_start is not None:
+        start_day = int(_day_ordinals(pd.Series([campaign_start]))[0])
+    elif len(exp_day):
+        start_day = int(exp_day.min())
+    else:
+        raise ValueError("Exposure log has no exposures for the given customers.")
+
+    # Events: one per exposure plus one control window per never-exposed customer
+    exposed = np.zeros(len(customers), dtype=bool)
+    exposed[exp_code] = True
+    ctrl_code = np.flatnonzero(~exposed)
+    ev_code = np.concatenate([exp_code, ctrl_code])
+    ev_day = np.concatenate([exp_day, np.full(len(ctrl_code), start_day, dtype=np.int64)])
+    order = np.lexsort((ev_day, ev_code))
+    ev_code, ev_day = ev_code[order], ev_day[order]
+
+    # Window end: exposure day + window, clipped at the customer's next exposure
+    ev_end = ev_day + window
+    same_next = ev_code[1:] == ev_code[:-1]
+    ev_end[:-1][same_next] = np.minimum(ev_end[:-1][same_next], ev_day[1:][same_next])
+
+    day_min = min(int(tx_day.min()) if len(tx_day) else start_day, int(ev_day.min()))
+    span = max(int(tx_day.max()) if len(tx_day) else 0, int(ev_end.max())) - day_min + 1
+    tx_key = tx_code * span + (tx_day - day_min)
+    tx_order = np.argsort(tx_key, kind="stable")
+    tx_key = tx_key[tx_order]
+    cum_rev = np.concatenate([[0.0], np.cumsum(tx_rev[tx_order])])
+
+    lo = np.searchsorted(tx_key, ev_code * span + (ev_day - day_min), side="left")
+    hi = np.searchsorted(tx_key, ev_code * span + (ev_end - day_min), side="left")
+    ev_orders = hi - lo
+    ev_revenue = cum_rev[hi] - cum_rev[lo]
+
+    n = len(customers)
+    result = pd.DataFrame({
+        "treatment_group": np.where(exposed, "Treatment", "Control"),
+        "response": (np.bincount(ev_code, weights=ev_orders, minlength=n) > 0).astype(int),
+        "response_revenue": np.bincount(ev_code, weights=ev_revenue, minlength=n),
+        "exposures": np.bincount(exp_code, minlength=n),
+    }, index=customers)
+    return result
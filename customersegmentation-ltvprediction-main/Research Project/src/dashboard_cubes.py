@@ -0,0 +1,173 @@
+# src/dashboard_cubes.py
+from __future__ import annotations
+
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+# Compact aggregates of the score table the dashboard renders from, so a widget change
+# filters a few hundred rows instead of recomputing over every customer. Every cube
+# except the histograms has a `view` column: "All" or a cluster id (as a string).
+CUBES = ("cube_cluster_stats", "cube_histograms", "cube_churn_thresholds", "cube_top_customers")
+ALL = "All"
+HIGH_RISK = 0.6            # churn probability above which a customer is "high risk"
+TOP_N = 50                 # customers kept per view in each top list
+CLV_BINS = 40
+CHURN_BINS = 30
+THRESHOLD_STEP = 0.05      # matches the dashboard's alert threshold slider
+TOP_COLUMNS = ["customer_id", "cluster", "CLV", "churn_probability"]
+
+
+def _views(scores: pd.DataFrame):
+    yield ALL, scores
+    if "cluster" in scores.columns:
+        for cluster, group in scores.groupby("cluster", sort=True):
+            yield str(int(cluster)), group
+
+
+def _box_stats(values: pd.Series, prefix: str) -> Dict[str, float]:
+    """Precomputed box plot (quartiles, mean, 1.5 IQR whiskers) for plotly's go.Box."""
+    values = values.dropna()
+    if values.empty:
+        return {}
+    q1, median, q3 = values.quantile([0.25, 0.5, 0.75])
+    iqr = q3 - q1
+    return {
+        f"{prefix}_q1": q1, f"{prefix}_median": median, f"{prefix}_q3": q3, f"{prefix}_mean": values.mean(),
+        f"{prefix}_lowerfence": values[values >= q1 - 1.5 * iqr].min(),
+        f"{prefix}_upperfence": values[values <= q3 + 1.5 * iqr].max(),
+    }
+
+
+def cluster_stats(scores: pd.DataFrame) -> pd.DataFrame:
+    """Headline metrics, CLV box plot statistics and segment means per view."""
+    rows = []
+    for view, df in _views(scores):
+        row = {
+            "view": view,
+            "customers": len(df),
+            "avg_clv": df["CLV"].mean() if "CLV" in df else np.nan,
+            "total_revenue": (df["frequency"] * df["monetary_value"]).sum()
+            if {"frequency", "monetary_value"}.issubset(df.columns) else 0.0,
+        }
+        for column in ("recency", "frequency", "monetary_value"):
+            if column in df:
+                row[f"avg_{column}"] = df[column].mean()
+        if "churn_probability" in df:
+            row["avg_churn_probability"] = df["churn_probability"].mean()
+            row["high_risk_share"] = (df["churn_probability"] > HIGH_RISK).mean()
+        if "CLV" in df:
+            row.update(_box_stats(df["CLV"], "clv"))
+        if {"CLV", "CLV_ML"}.issubset(df.columns):
+            row.update(_box_stats(df["CLV_ML"], "clv_ml"))
+            row["avg_ml_lift"] = (df["CLV_ML"] - df["CLV"]).mean()
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+
+def histograms(scores: pd.DataFrame, clv_bins: int = CLV_BINS, churn_bins: int = CHURN_BINS) -> pd.DataFrame:
+    """
+    Bin counts per measure and cluster on edges shared by all clusters (CLV over its
+    range, churn probability over [0, 1]); a view's histogram is its cluster's rows,
+    "All" the sum over clusters.
+    """
+    clusters = scores["cluster"].astype(int) if "cluster" in scores else pd.Series(-1, index=scores.index)
+    frames = []
+    for measure, bins, value_range in (("CLV", clv_bins, None), ("churn_probability", churn_bins, (0.0, 1.0))):
+        if measure not in scores:
+            continue
+        values = scores[measure].to_numpy(dtype=float)
+        finite = np.isfinite(values)
+        if not finite.any():
+            continue
+        edges = np.histogram_bin_edges(values[finite], bins=bins, range=value_range)
+        for cluster in np.unique(clusters[finite]):
+            counts, _ = np.histogram(values[finite & (clusters.to_numpy() == cluster)], bins=edges)
+            frames.append(pd.DataFrame({"measure": measure, "cluster": int(cluster), "bin_left": edges[:-1],
+                                        "bin_right": edges[1:], "count": counts}))
+    columns = ["measure", "cluster", "bin_left", "bin_right", "count"]
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=columns)
+
+
+def churn_thresholds(scores: pd.DataFrame, step: float = THRESHOLD_STEP) -> pd.DataFrame:
+    """Customers at or above each alert threshold (0, step, ..., 1) per view."""
+    if "churn_probability" not in scores:
+        return pd.DataFrame(columns=["view", "threshold", "customers", "share"])
+    thresholds = np.round(np.arange(0, 1 + step / 2, step), 10)
+    frames = []
+    for view, df in _views(scores):
+        probabilities = np.sort(df["churn_probability"].dropna().to_numpy())
+        at_or_above = len(probabilities) - np.searchsorted(probabilities, thresholds, side="left")
+        frames.append(pd.DataFrame({"view": view, "threshold": thresholds, "customers": at_or_above,
+                                    "share": at_or_above / max(len(df), 1)}))
+    return pd.concat(frames, ignore_index=True)
+
+
+def top_customers(scores: pd.DataFrame, top_n: int = TOP_N) -> pd.DataFrame:
+    """The top_n customers per view by CLV (`list` "clv") and by churn probability ("churn"), NaN measures skipped."""
+    columns = [c for c in TOP_COLUMNS if c in scores.columns]
+    frames = []
+    for view, df in _views(scores):
+        for name, measure in (("clv", "CLV"), ("churn", "churn_probability")):
+            if measure not in df:
+                continue
+            top = df.dropna(subset=[measure]).nlargest(top_n, measure)[columns].reset_index(drop=True)
+            frames.append(top.assign(view=view, list=name, rank=np.arange(1, len(top) + 1)))
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=["view", "list", "rank", *columns])
+
+
+def build_cubes(scores: pd.DataFrame, config: Optional[dict] = None) -> Dict[str, pd.DataFrame]:
+    """
+    Every cube for the score table (customer_id, cluster, CLV, CLV_ML,
+    churn_probability, RFM columns), keyed by artifact name (see CUBES).
+    `config` is the `cubes` config section: top_n, clv_bins, churn_bins, threshold_step.
+    """
+    config = config or {}
+    return {
+        "cube_cluster_stats": cluster_stats(scores),
+        "cube_histograms": histograms(scores, int(config.get("clv_bins", CLV_BINS)),
+                                      int(config.get("churn_bins", CHURN_BINS))),
+        "cube_churn_thresholds": churn_thresholds(scores, float(config.get("threshold_step", THRESHOLD_STEP))),
+        "cube_top_customers": top_customers(scores, int(config.get("top_n", TOP_N))),
+    }
+
+
+# ---- dashboard lookups: each reads a few cube rows ----
+
+def view_stats(cubes: Dict[str, pd.DataFrame], view: str = ALL) -> Dict:
+    stats = cubes["cube_cluster_stats"]
+    rows = stats[stats["view"] == view]
+    return rows.iloc[0].dropna().to_dict() if not rows.empty else {}
+
+
+def leading_cluster(cubes: Dict[str, pd.DataFrame], views) -> Optional[Dict]:
+    """Stats row of the view (among `views`) with the highest average CLV; None when none has a CLV."""
+    stats = cubes["cube_cluster_stats"]
+    stats = stats[stats["view"].isin(views)].dropna(subset=["avg_clv"])
+    return stats.loc[stats["avg_clv"].idxmax()].to_dict() if not stats.empty else None
+
+
+def view_histogram(cubes: Dict[str, pd.DataFrame], measure: str, view: str = ALL,
+                   by_cluster: bool = False) -> pd.DataFrame:
+    """Bins of `measure` for a view: per cluster when by_cluster, else summed."""
+    hist = cubes["cube_histograms"]
+    hist = hist[hist["measure"] == measure]
+    if view != ALL:
+        hist = hist[hist["cluster"] == int(view)]
+    if not by_cluster:
+        hist = hist.groupby(["bin_left", "bin_right"], as_index=False)["count"].sum()
+    return hist
+
+
+def customers_at_threshold(cubes: Dict[str, pd.DataFrame], threshold: float, view: str = ALL) -> int:
+    """Customers with churn probability >= threshold (rounded down to the cube's grid)."""
+    table = cubes["cube_churn_thresholds"]
+    table = table[(table["view"] == view) & (table["threshold"] <= threshold + 1e-9)]
+    return int(table["customers"].iloc[-1]) if not table.empty else 0
+
+
+def view_top(cubes: Dict[str, pd.DataFrame], name: str, view: str = ALL) -> pd.DataFrame:
+    top = cubes["cube_top_customers"]
+    top = top[(top["view"] == view) & (top["list"] == name)].sort_values("rank")
+    return top[[c for c in TOP_COLUMNS if c in top.columns]].dropna(axis=1, how="all")
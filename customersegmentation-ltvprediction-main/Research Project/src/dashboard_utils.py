@@ -3,21 +3,62 @@ from __future__ import annotations
 import json
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, List, Optional
 
 import pandas as pd
 
 
 RESULTS_DIR = Path("output/results")
 FIGURES_DIR = Path("output/figures")
-RUN_HISTORY_PATH = Path("output/pipeline_runs.json")
+RUN_HISTORY_PATH = Path("output/pipeline_runs.json")  # legacy; imported into the history database
 
 
-def load_csv(name: str) -> pd.DataFrame:
+def load_csv(name: str, columns: Optional[List[str]] = None, filters=None) -> pd.DataFrame:
+    """
+    Latest run's copy of a results table from the Parquet results store, falling back
+    to output/results/<name> for results written before the store existed.
+    `columns` / `filters` are passed through to the store (projection and predicates).
+    """
+    from src.results_store import read_artifact
+
+    frame = read_artifact(Path(name).stem, columns=columns, filters=filters)
+    if not frame.empty:
+        return frame
     path = RESULTS_DIR / name
     if not path.exists():
         return pd.DataFrame()
-    return pd.read_csv(path)
+    return pd.read_csv(path, usecols=columns)
+
+
+def result_version(*names: str) -> str:
+    """
+    Cache key for dashboard loaders: modification time and size of the file each
+    result would be read from (results store first, then output/results). Artifacts a
+    cached stage carried into a new run are hard links of the old file, so their
+    version is unchanged and the dashboard keeps their cached frames.
+    """
+    from src.results_store import artifact_path
+
+    parts = []
+    for name in names:
+        path = artifact_path(Path(name).stem) if name.endswith(".csv") else None
+        path = path or RESULTS_DIR / name
+        try:
+            stat = path.stat()
+            parts.append(f"{stat.st_mtime_ns}:{stat.st_size}")
+        except FileNotFoundError:
+            parts.append("-")
+    return "|".join(parts)
+
+
+def load_json(name: str) -> Dict:
+    path = RESULTS_DIR / name
+    if not path.exists():
+        return {}
+    try:
+        return json.loads(path.read_text())
+    except json.JSONDecodeError:
+        return {}
 
 
 def format_currency(value: float) -> str:
@@ -38,20 +79,18 @@ def compute_summary_metrics(clv_df: pd.DataFrame) -> Dict[str, float]:
     return metrics
 
 
-def load_pipeline_history() -> List[Dict]:
-    if RUN_HISTORY_PATH.exists():
-        try:
-            return json.loads(RUN_HISTORY_PATH.read_text())
-        except json.JSONDecodeError:
-            return []
-    return []
+def load_pipeline_history(start=None, end=None, limit: Optional[int] = None) -> List[Dict]:
+    """Run entries (oldest first), optionally limited to start <= run_timestamp < end."""
+    from src.run_history import RUN_HISTORY_DB, query_runs
+
+    return query_runs(start=start, end=end, limit=limit, path=RUN_HISTORY_DB)
 
 
 def save_pipeline_history(entry: Dict) -> None:
-    history = load_pipeline_history()
-    history.append(entry)
-    RUN_HISTORY_PATH.parent.mkdir(parents=True, exist_ok=True)
-    RUN_HISTORY_PATH.write_text(json.dumps(history, indent=2, ensure_ascii=False))
+    """Append one run to the history database (src.run_history)."""
+    from src.run_history import RUN_HISTORY_DB, append_run
+
+    append_run(entry, path=RUN_HISTORY_DB)
 
 
 def build_history_entry(rfm: pd.DataFrame, ml_metrics=None, churn_metrics=None) -> Dict:
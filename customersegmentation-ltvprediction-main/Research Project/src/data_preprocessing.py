@@ -11,7 +11,13 @@ def load_and_clean_data(file_path):
         print(f"Loaded dataframe shape: {df.shape}, Profit min: {df['Profit'].min() if 'Profit' in df else 'N/A'}")
     except FileNotFoundError:
         raise FileNotFoundError(f"Dataset not found at {file_path}. Please place 'INDIA_RETAIL_DATA.xlsx' in data/raw/.")
-    
+    return clean_raw_data(df)
+
+def clean_raw_data(df):
+    """
+    Clean raw order lines in the INDIA_RETAIL_DATA schema (as read from the Excel
+    sheet, or generated by src.synthetic_data) and group them into transaction data.
+    """
     # Data cleaning
     df = df[pd.notna(df['City'])]  # Remove records without City
     df = df[df['QtyOrdered'] > 0]  # Remove non-positive quantities
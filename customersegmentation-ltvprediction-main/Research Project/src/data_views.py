@@ -0,0 +1,156 @@
+# src/data_views.py
+from __future__ import annotations
+
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pa_csv
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from src.dashboard_utils import RESULTS_DIR
+from src.results_store import artifact_path
+
+# What the dashboard sends to the browser: tables one sorted page at a time, scatter
+# plots as a bounded sample. Everything is read from the results store with column
+# projection and predicate pushdown (`filters`, as in results_store.read_artifact).
+PAGE_SIZE = 50
+SCATTER_POINTS = 5_000     # point budget per scatter plot
+OUTLIER_SHARE = 0.1        # of the budget reserved for the most extreme points
+EXPORT_DIR = Path("output/exports")
+
+
+def _read(name: str, columns: Optional[List[str]], filters, run_id: Optional[str]) -> Optional[pa.Table]:
+    """The artifact's matching rows and columns (output/results/<name>.csv for pre-store results)."""
+    path, fmt = artifact_path(name, run_id), "parquet"
+    if path is None and run_id is None and (RESULTS_DIR / f"{name}.csv").exists():
+        path, fmt = RESULTS_DIR / f"{name}.csv", "csv"
+    if path is None:
+        return None
+    return ds.dataset(path, format=fmt).to_table(
+        columns=columns, filter=pq.filters_to_expression(filters) if filters else None)
+
+
+def _sort_columns(sort_by) -> List[str]:
+    return [sort_by] if isinstance(sort_by, str) else list(sort_by or [])
+
+
+def _sort_keys(sort_by, ascending) -> List[Tuple[str, str]]:
+    columns = _sort_columns(sort_by)
+    ascending = [ascending] * len(columns) if isinstance(ascending, bool) else list(ascending)
+    return [(column, "ascending" if asc else "descending") for column, asc in zip(columns, ascending)]
+
+
+def _selection(name: str, columns, filters, sort_by, ascending, run_id) -> Optional[pa.Table]:
+    """Matching rows of an artifact, decoding only `columns` and the sort columns, sorted."""
+    read_columns = None if columns is None else list(dict.fromkeys([*columns, *_sort_columns(sort_by)]))
+    table = _read(name, read_columns, filters, run_id)
+    if table is None:
+        return None
+    if sort_by:
+        # Stable sort of the key columns only; ties keep file order
+        table = table.take(pc.sort_indices(table.select(_sort_columns(sort_by)),
+                                           sort_keys=_sort_keys(sort_by, ascending)))
+    return table.select(columns) if columns is not None else table
+
+
+def query_page(name: str, page: int = 0, page_size: int = PAGE_SIZE, sort_by=None, ascending=False,
+               columns: Optional[List[str]] = None, filters=None,
+               run_id: Optional[str] = None) -> Tuple[pd.DataFrame, int]:
+    """
+    One page of a results-store artifact: the rows matching `filters`, sorted by
+    `sort_by` (a column or list of columns, `ascending` a bool or one per column),
+    rows [page * page_size, (page + 1) * page_size). Only that slice is converted to
+    pandas. Returns (page frame, total matching rows).
+    """
+    table = _selection(name, columns, filters, sort_by, ascending, run_id)
+    if table is None:
+        return pd.DataFrame(columns=columns or []), 0
+    rows = table.slice(max(int(page), 0) * page_size, page_size)
+    return rows.to_pandas(), table.num_rows
+
+
+def page_count(total: int, page_size: int = PAGE_SIZE) -> int:
+    return max(1, -(-total // page_size))
+
+
+def downsample(df: pd.DataFrame, budget: int = SCATTER_POINTS, by: Optional[str] = "cluster",
+               outlier_columns: Sequence[str] = (), outlier_share: float = OUTLIER_SHARE,
+               random_state: int = 42) -> pd.DataFrame:
+    """
+    At most about `budget` rows of df for a scatter plot. The `outlier_share` of the
+    budget goes to the most extreme rows on `outlier_columns` (distance of their
+    percentile rank from the median, on whichever column is most extreme), so tails
+    stay visible; the rest is a seeded sample stratified by `by`, in proportion to
+    group size with every group kept.
+    """
+    if len(df) <= budget:
+        return df
+    keep = pd.Index([])
+    columns = [c for c in outlier_columns if c in df.columns]
+    n_outliers = int(budget * outlier_share) if columns else 0
+    if n_outliers:
+        extremeness = (df[columns].rank(pct=True) - 0.5).abs().max(axis=1)
+        keep = extremeness.nlargest(n_outliers).index
+    rest = df.drop(index=keep)
+    n_rest = budget - len(keep)
+    if by is not None and by in rest.columns:
+        groups = rest.groupby(by, observed=True)
+        sampled = groups.sample(frac=min(n_rest / len(rest), 1.0), random_state=random_state).index
+        sampled = sampled.union(groups.head(1).index)
+    else:
+        sampled = rest.sample(n_rest, random_state=random_state).index
+    return df.loc[df.index.isin(keep.union(sampled))]
+
+
+def scatter_points(name: str, columns: List[str], budget: int = SCATTER_POINTS, by: Optional[str] = "cluster",
+                   outlier_columns: Sequence[str] = (), filters=None,
+                   run_id: Optional[str] = None) -> Tuple[pd.DataFrame, int]:
+    """Downsampled scatter input read from the store. Returns (points, total matching rows)."""
+    table = _read(name, columns, filters, run_id)
+    if table is None:
+        return pd.DataFrame(columns=columns), 0
+    df = table.to_pandas()
+    return downsample(df, budget, by=by, outlier_columns=outlier_columns), len(df)
+
+
+def export_selection(name: str, fmt: str = "csv", sort_by=None, ascending=False,
+                     columns: Optional[List[str]] = None, filters=None, run_id: Optional[str] = None,
+                     export_dir: Path = EXPORT_DIR) -> Optional[Path]:
+    """
+    Write every row of a selection (same arguments as query_page, without paging)
+    to export_dir/<name>-<timestamp>.<csv|parquet> on the server, straight from Arrow.
+    Returns the file, or None when the artifact does not exist.
+    """
+    if fmt not in ("csv", "parquet"):
+        raise ValueError(f"Unknown export format '{fmt}'; use csv or parquet.")
+    table = _selection(name, columns, filters, sort_by, ascending, run_id)
+    if table is None:
+        return None
+    export_dir = Path(export_dir)
+    export_dir.mkdir(parents=True, exist_ok=True)
+    path = export_dir / f"{name}-{datetime.utcnow():%Y%m%dT%H%M%S%f}.{fmt}"
+    if fmt == "csv":
+        pa_csv.write_csv(table, path)
+    else:
+        pq.write_table(table, path, compression="zstd")
+    return path
+
+
+def selection_filters(**conditions) -> Optional[List[Tuple]]:
+    """
+    Store predicates from keyword conditions: a value means equality, a (op, value)
+    pair any pyarrow operator; None values are dropped. E.g.
+    selection_filters(cluster=2, churn_probability=(">=", 0.6)).
+    """
+    filters = []
+    for column, condition in conditions.items():
+        if condition is None:
+            continue
+        op, value = condition if isinstance(condition, tuple) else ("==", condition)
+        filters.append((column, op, value))
+    return filters or None
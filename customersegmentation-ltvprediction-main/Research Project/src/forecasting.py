@@ -1,42 +1,149 @@
 # src/forecasting.py
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Dict, Optional
+
+import numpy as np
 import pandas as pd
-from datetime import datetime, timedelta
 from src.dashboard_utils import RESULTS_DIR
+from src.ltv_trajectory import METRICS, trajectory_day_grid
+from src.results_store import read_artifact, resolve_run, write_artifact
+
+DAILY_GROWTH = 0.001   # historical CLV drift per day
+FORECAST_LIFT = 1.05   # forecast relative to historical
+
+LONG_ARTIFACT = "forecast_results"
+WIDE_ARTIFACT = "forecast_results_wide"
+
+
+def _int_dtype(values: np.ndarray):
+    """Smallest of int32/int64 that holds every value."""
+    limit = np.iinfo(np.int32)
+    if values.size and (values.max() > limit.max or values.min() < limit.min):
+        return np.int64
+    return np.int32
+
+
+def _panel_frame(ids: np.ndarray, dates: pd.DatetimeIndex, measures: Dict[str, np.ndarray],
+                 layout: str = "long") -> pd.DataFrame:
+    """
+    Lay out (customers x dates) measure matrices as a panel. `long`: one row per
+    (customer, date) with categorical customer_id/date; `wide`: one row per customer
+    with a `<measure>_<date>` column per measure and date.
+    """
+    labels = dates.strftime("%Y-%m-%d")
+    if layout == "wide":
+        columns = [f"{name}_{d}" for name in measures for d in labels]
+        wide = pd.DataFrame(np.hstack(list(measures.values())), columns=columns)
+        wide.insert(0, "customer_id", ids)
+        return wide
+
+    codes, uniques = pd.factorize(ids)
+    days = len(dates)
+    frame = {
+        "customer_id": pd.Categorical.from_codes(np.repeat(codes, days), categories=uniques),
+        "date": pd.Categorical.from_codes(np.tile(np.arange(days), len(ids)), categories=labels),
+    }
+    frame.update({name: values.ravel() for name, values in measures.items()})
+    return pd.DataFrame(frame)
+
+
+def forecast_panel(df: pd.DataFrame, days: int = 30, base_date: Optional[pd.Timestamp] = None,
+                   layout: str = "long") -> pd.DataFrame:
+    """
+    Daily CLV panel (customers x horizon) for every customer with a positive CLV.
+
+    The whole panel is one broadcast of the CLV column against the day offsets; dates
+    are generated once. `long` gives one row per (customer, day) with categorical
+    customer_id/date and int32 values; `wide` gives one row per customer with
+    `historical_clv_<date>` and `forecast_clv_<date>` columns.
+    """
+    valid = df.dropna(subset=["CLV", "customer_id"])
+    clv = pd.to_numeric(valid["CLV"], errors="coerce").fillna(0).to_numpy(dtype=np.float64)
+    keep = clv > 0
+    ids, clv = valid["customer_id"].to_numpy()[keep], clv[keep]
+
+    if base_date is None:
+        base_date = datetime.today().replace(day=1)
+    dates = pd.date_range(pd.Timestamp(base_date).normalize(), periods=days, freq="D")
+
+    historical = clv[:, None] * (1 + DAILY_GROWTH * np.arange(days))
+    forecast = np.rint(historical * FORECAST_LIFT)
+    historical = np.rint(historical)
+    dtype = _int_dtype(forecast)
+    return _panel_frame(ids, dates, {"historical_clv": historical.astype(dtype),
+                                     "forecast_clv": forecast.astype(dtype)}, layout)
+
+
+def trajectory_panel(trajectories: np.ndarray, meta: Dict, days: int = 30, layout: str = "long") -> pd.DataFrame:
+    """
+    Daily panel sliced from the stored BG/NBD trajectories (see src.ltv_trajectory):
+    cumulative expected purchases, prob_alive and cumulative expected revenue for the
+    first `days` days after the observation end. Only those grid columns are read.
+    """
+    grid = trajectory_day_grid(meta)
+    columns = np.flatnonzero((grid >= 1) & (grid <= days))
+    start = pd.Timestamp(meta.get("observation_end") or datetime.today().date())
+    dates = pd.DatetimeIndex(start + pd.to_timedelta(grid[columns], unit="D"))
+    ids = np.asarray(meta["customer_ids"], dtype=object)
+    lo, hi = (int(columns[0]), int(columns[-1]) + 1) if len(columns) else (0, 0)
+    measures = {name: np.asarray(trajectories[i, :, lo:hi], dtype=np.float32) for i, name in enumerate(METRICS)}
+    return _panel_frame(ids, dates, measures, layout)
+
+
+def wide_to_long(wide: pd.DataFrame) -> pd.DataFrame:
+    """Reshape a `wide` forecast panel back to one row per (customer, day)."""
+    long = wide.melt(id_vars="customer_id", var_name="column", value_name="value")
+    parts = long["column"].str.rsplit("_", n=1, expand=True)
+    measures = list(dict.fromkeys(parts[0]))
+    long = long.assign(measure=parts[0], date=parts[1])
+    long = long.pivot_table(index=["customer_id", "date"], columns="measure", values="value",
+                            observed=True, dropna=False)
+    return long.reset_index().rename_axis(columns=None)[["customer_id", "date", *measures]]
+
+
+def load_forecast_results() -> pd.DataFrame:
+    """
+    Read whichever forecast panel the pipeline wrote last (results store first, then
+    legacy files in output/results), always returned in long layout.
+    """
+    runs = {name: resolve_run(name) for name in (LONG_ARTIFACT, WIDE_ARTIFACT)}
+    runs = {name: run for name, run in runs.items() if run}
+    if runs:
+        name = max(runs, key=runs.get)
+        frame = read_artifact(name, run_id=runs[name])
+        return wide_to_long(frame) if name == WIDE_ARTIFACT else frame
+    for name, reshape in ((LONG_ARTIFACT, None), (WIDE_ARTIFACT, wide_to_long)):
+        for suffix, reader in ((".parquet", pd.read_parquet), (".csv", pd.read_csv)):
+            path = RESULTS_DIR / f"{name}{suffix}"
+            if path.exists():
+                frame = reader(path)
+                return reshape(frame) if reshape else frame
+    return pd.DataFrame()
+
+
+def run_city_forecast(df: pd.DataFrame, days: Optional[int] = None, config: Optional[dict] = None,
+                      base_date: Optional[pd.Timestamp] = None, trajectories=None):
+    """
+    Generate the daily CLV forecast per city (`forecasting.days`, 30 by default).
+    With `trajectories` (the (array, meta) pair from load_ltv_trajectories) the panel
+    is sliced from the BG/NBD trajectories; otherwise the CLV drift panel starting at
+    `base_date` is used (skipping cities with invalid CLV). `forecasting.layout`
+    selects the long or wide panel written to the results store.
+    """
+    config = config or {}
+    days = int(days or config.get("days", 30))
+    layout = config.get("layout", "long")
 
-def run_city_forecast(df: pd.DataFrame, days: int = 30):
-    """
-    Generate 30-day CLV forecast per city. Skips cities with invalid CLV.
-    """
-    forecast_data = []
-    base_date = datetime.today().replace(day=1)
-    
-    # Filter valid CLV rows
-    valid_df = df.dropna(subset=['CLV', 'customer_id']).copy()
-    valid_df['CLV'] = pd.to_numeric(valid_df['CLV'], errors='coerce').fillna(0)
-
-    for _, row in valid_df.iterrows():
-        city = row["customer_id"]
-        clv = float(row["CLV"])
-        if clv <= 0:
-            continue  # Skip zero/negative CLV
-
-        for i in range(days):
-            date = (base_date + timedelta(days=i)).strftime("%Y-%m-%d")
-            historical = clv * (1 + 0.001 * i)
-            forecast = historical * 1.05
-            forecast_data.append({
-                "customer_id": city,
-                "date": date,
-                "historical_clv": int(round(historical)),
-                "forecast_clv": int(round(forecast))
-            })
-
-    if not forecast_data:
+    if trajectories is not None and trajectories[0] is not None:
+        result_df = trajectory_panel(*trajectories, days=days, layout=layout)
+    else:
+        result_df = forecast_panel(df, days=days, base_date=base_date, layout=layout)
+    if result_df.empty:
         print("No valid CLV data for forecasting.")
         return
 
-    result_df = pd.DataFrame(forecast_data)
-    path = RESULTS_DIR / "forecast_results.csv"
-    RESULTS_DIR.mkdir(parents=True, exist_ok=True)
-    result_df.to_csv(path, index=False)
-    print(f"Forecast saved: {path} ({len(result_df)} rows)")
\ No newline at end of file
+    path = write_artifact(WIDE_ARTIFACT if layout == "wide" else LONG_ARTIFACT, result_df)
+    print(f"Forecast saved: {path} ({len(result_df)} rows)")
+    return result_df
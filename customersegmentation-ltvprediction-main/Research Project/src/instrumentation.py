@@ -0,0 +1,140 @@
+# src/instrumentation.py
+from __future__ import annotations
+
+import cProfile
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Optional
+
+try:
+    import resource
+except ImportError:  # Windows: no getrusage, RSS and child CPU are not reported
+    resource = None
+
+PROFILE_DIR = Path("output/profiles")
+
+_state: Dict = {"tracemalloc": False, "cprofile": False, "profile_dir": PROFILE_DIR}
+_records: List[Dict] = []
+_lock = threading.Lock()
+
+
+def configure(config: Optional[dict] = None) -> None:
+    """
+    Apply the `instrumentation` config section: `tracemalloc` (Python heap peak per
+    stage; adds overhead), `cprofile` (a .prof dump per stage) and `profile_dir`.
+    """
+    config = config or {}
+    _state["tracemalloc"] = bool(config.get("tracemalloc", False))
+    _state["cprofile"] = bool(config.get("cprofile", False))
+    _state["profile_dir"] = Path(config.get("profile_dir") or PROFILE_DIR)
+    if _state["tracemalloc"] and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    elif not _state["tracemalloc"] and tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+
+def reset() -> None:
+    with _lock:
+        _records.clear()
+
+
+def stage_records() -> List[Dict]:
+    """Measurements of every stage run since the last reset, in completion order."""
+    with _lock:
+        return [dict(r) for r in _records]
+
+
+def requires_serial() -> bool:
+    """
+    True while a process-wide measurement is on (tracemalloc peak, cProfile): it is
+    only attributable to a stage when no other stage runs at the same time.
+    """
+    return _state["tracemalloc"] or _state["cprofile"]
+
+
+def row_count(obj) -> Optional[int]:
+    """Rows of a frame/series/array (or length of a list), None for anything else."""
+    shape = getattr(obj, "shape", None)
+    if shape:
+        return int(shape[0])
+    return len(obj) if isinstance(obj, list) else None
+
+
+def _peak_rss_mb() -> Optional[float]:
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1e6 if sys.platform == "darwin" else peak / 1e3  # bytes on macOS, KiB elsewhere
+
+
+def _children_cpu() -> float:
+    """CPU seconds of finished child processes (e.g. process-pool workers)."""
+    if resource is None:
+        return 0.0
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+@contextmanager
+def profile_stage(name: str, rows_in=None, run_id: Optional[str] = None):
+    """
+    Measure one pipeline stage. Yields the record so the stage can set `rows_out`
+    (or pass anything with a len() as rows_in/rows_out).
+
+    Captures wall time, CPU time of the running thread (plus that of worker processes
+    that finished during the stage), process peak RSS after the stage, the tracemalloc
+    heap peak during the stage when enabled, and rows in/out.
+    A stage that raises is recorded with status "failed" and the error re-raised, so
+    callers keep their own failure handling. With cprofile on, the stage's profile
+    is dumped to <profile_dir>/<run_id>/<name>.prof.
+    """
+    record = {"stage": name, "status": "ok", "rows_in": row_count(rows_in) if rows_in is not None else None,
+              "rows_out": None}
+    profiler = cProfile.Profile() if _state["cprofile"] else None
+    if _state["tracemalloc"] and tracemalloc.is_tracing():
+        tracemalloc.reset_peak()
+    wall, cpu, child_cpu = time.perf_counter(), time.thread_time(), _children_cpu()
+    if profiler:
+        profiler.enable()
+    try:
+        yield record
+    except BaseException as e:
+        record["status"] = "failed"
+        record["error"] = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        if profiler:
+            profiler.disable()
+        record["wall_seconds"] = time.perf_counter() - wall
+        record["cpu_seconds"] = time.thread_time() - cpu
+        record["child_cpu_seconds"] = _children_cpu() - child_cpu
+        record["peak_rss_mb"] = _peak_rss_mb()
+        if _state["tracemalloc"] and tracemalloc.is_tracing():
+            record["tracemalloc_peak_mb"] = tracemalloc.get_traced_memory()[1] / 1e6
+        if record["rows_out"] is not None and not isinstance(record["rows_out"], int):
+            record["rows_out"] = row_count(record["rows_out"])
+        if profiler:
+            directory = _state["profile_dir"] / (run_id or "latest")
+            directory.mkdir(parents=True, exist_ok=True)
+            record["profile_path"] = str(directory / f"{name}.prof")
+            profiler.dump_stats(record["profile_path"])
+        with _lock:
+            _records.append(record)
+
+
+def format_stage_table(records: List[Dict]) -> str:
+    """Plain-text summary of stage records for the console/log."""
+    def cell(value, fmt="{}"):
+        return "-" if value is None else fmt.format(value)
+
+    lines = [f"{'stage':<22}{'status':<8}{'wall s':>9}{'cpu s':>9}{'rss MB':>9}{'rows in':>10}{'rows out':>10}"]
+    for r in records:
+        lines.append(
+            f"{r['stage']:<22}{r['status']:<8}{r['wall_seconds']:>9.2f}{r['cpu_seconds']:>9.2f}"
+            f"{cell(r.get('peak_rss_mb'), '{:.0f}'):>9}{cell(r['rows_in']):>10}{cell(r['rows_out']):>10}"
+        )
+    return "\n".join(lines)
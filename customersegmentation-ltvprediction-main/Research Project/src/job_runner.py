@@ -0,0 +1,234 @@
+# src/job_runner.py
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+# Per job: <job id>.json (command, state), <job id>.progress.jsonl (events from the
+# pipeline) and <job id>.log (its console output). <dataset>.lock marks a running job.
+JOBS_DIR = Path("output/jobs")
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+PROGRESS_ENV = "PIPELINE_PROGRESS_FILE"
+
+
+def _job_file(job_id: str, suffix: str) -> Path:
+    return JOBS_DIR / f"{job_id}{suffix}"
+
+
+def _lock_path(dataset: str) -> Path:
+    return JOBS_DIR / f"{dataset}.lock"
+
+
+def _pid_alive(pid: int) -> bool:
+    if os.name == "nt":
+        result = subprocess.run(["tasklist", "/FI", f"PID eq {pid}", "/NH"], capture_output=True, text=True)
+        return str(pid) in result.stdout
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _write_json(path: Path, payload: Dict) -> None:
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp_path.write_text(json.dumps(payload, indent=2))
+    os.replace(tmp_path, path)
+
+
+def _acquire_lock(dataset: str, job_id: str) -> None:
+    """
+    Create <dataset>.lock exclusively (atomic on every OS). A lock left by a runner
+    that no longer exists is removed first; a live one raises RuntimeError.
+    """
+    path = _lock_path(dataset)
+    for _ in range(2):
+        try:
+            fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            holder = running_job(dataset)
+            if holder is not None:
+                raise RuntimeError(f"A pipeline run for '{dataset}' is already in progress (job {holder['job_id']}).")
+            path.unlink(missing_ok=True)  # stale: its runner died
+            continue
+        with os.fdopen(fd, "w") as handle:
+            json.dump({"job_id": job_id, "pid": None, "started": datetime.utcnow().isoformat()}, handle)
+        return
+    raise RuntimeError(f"Could not acquire the job lock for '{dataset}'.")
+
+
+def running_job(dataset: str = "default") -> Optional[Dict]:
+    """The job holding the dataset's lock if its runner process is alive, else None."""
+    try:
+        lock = json.loads(_lock_path(dataset).read_text())
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+    if lock.get("pid") is None:  # runner still starting
+        started = datetime.fromisoformat(lock["started"])
+        return lock if (datetime.utcnow() - started).total_seconds() < 60 else None
+    return lock if _pid_alive(lock["pid"]) else None
+
+
+def start_job(dataset: str = "default", command: Optional[List[str]] = None) -> Dict:
+    """
+    Start `command` (the pipeline, `python main.py`, by default) in a detached runner
+    process and return the job record without waiting. Only one job per dataset runs
+    at a time: a second start raises RuntimeError while the first is alive.
+    """
+    JOBS_DIR.mkdir(parents=True, exist_ok=True)
+    job_id = f"{datetime.utcnow():%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:6]}"
+    _acquire_lock(dataset, job_id)
+    job = {
+        "job_id": job_id,
+        "dataset": dataset,
+        "command": command or [sys.executable, "main.py"],
+        "state": "starting",
+        "started": datetime.utcnow().isoformat(),
+    }
+    _write_json(_job_file(job_id, ".json"), job)
+    try:
+        runner = subprocess.Popen(
+            [sys.executable, "-m", "src.job_runner", "run", str(_job_file(job_id, ".json").resolve())],
+            cwd=PROJECT_DIR,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            # outlive the dashboard session that started it
+            **({"creationflags": subprocess.CREATE_NEW_PROCESS_GROUP} if os.name == "nt" else {"start_new_session": True}),
+        )
+    except OSError:
+        _lock_path(dataset).unlink(missing_ok=True)
+        raise
+    _write_json(_lock_path(dataset), {"job_id": job_id, "pid": runner.pid, "started": job["started"]})
+    return job
+
+
+def _run(job_path: Path) -> int:
+    """Runner process body: run the job's command, record the outcome, release the lock."""
+    job = json.loads(job_path.read_text())
+    job_id = job["job_id"]
+    env = {**os.environ, PROGRESS_ENV: str(job_path.with_name(f"{job_id}.progress.jsonl"))}
+    returncode = -1
+    try:
+        _write_json(job_path, {**job, "state": "running"})
+        with open(job_path.with_name(f"{job_id}.log"), "w") as log:
+            returncode = subprocess.run(job["command"], cwd=PROJECT_DIR, env=env, stdout=log,
+                                        stderr=subprocess.STDOUT).returncode
+    finally:
+        _write_json(job_path, {**job, "state": "succeeded" if returncode == 0 else "failed",
+                               "returncode": returncode, "finished": datetime.utcnow().isoformat()})
+        lock = job_path.with_name(f"{job['dataset']}.lock")
+        try:
+            if json.loads(lock.read_text()).get("job_id") == job_id:
+                lock.unlink()
+        except (FileNotFoundError, json.JSONDecodeError):
+            pass
+    return returncode
+
+
+def progress_reporter() -> Optional[Callable[[Dict], None]]:
+    """
+    Event sink for src.pipeline_dag.run_dag when the pipeline runs as a job: appends
+    each event as one JSON line to the job's progress file. None outside a job.
+    """
+    path = os.environ.get(PROGRESS_ENV)
+    if not path:
+        return None
+    lock = threading.Lock()
+
+    def report(event: Dict) -> None:
+        line = json.dumps({"ts": time.time(), **event}, default=str)
+        with lock, open(path, "a") as handle:
+            handle.write(line + "\n")
+
+    return report
+
+
+def read_progress(job_id: str) -> List[Dict]:
+    try:
+        lines = _job_file(job_id, ".progress.jsonl").read_text().splitlines()
+    except FileNotFoundError:
+        return []
+    events = []
+    for line in lines:
+        try:
+            events.append(json.loads(line))
+        except json.JSONDecodeError:  # line still being written
+            break
+    return events
+
+
+def latest_job(dataset: str = "default") -> Optional[Dict]:
+    jobs = [json.loads(p.read_text()) for p in JOBS_DIR.glob("*.json") if not p.name.startswith(".")]
+    jobs = [j for j in jobs if j.get("dataset") == dataset]
+    return max(jobs, key=lambda j: j["job_id"]) if jobs else None
+
+
+def job_status(job_id: str) -> Dict:
+    """
+    Job record plus progress summarised from its events: stages_total, stages_done,
+    running (stage names), last_stage, run_id (once published) and elapsed seconds.
+    A job whose runner died without recording an outcome is reported as failed.
+    """
+    job = json.loads(_job_file(job_id, ".json").read_text())
+    events = read_progress(job_id)
+    started = {e["stage"] for e in events if e["event"] == "stage_started"}
+    finished = [e for e in events if e["event"] in ("stage_finished", "stage_skipped")]
+    total = next((len(e["stages"]) for e in events if e["event"] == "run_started"), 0)
+    if job["state"] in ("starting", "running") and running_job(job["dataset"]) is None:
+        job = json.loads(_job_file(job_id, ".json").read_text())  # the runner may have just finished
+        if job["state"] in ("starting", "running"):
+            job["state"] = "failed"
+    job.update({
+        "stages_total": total,
+        "stages_done": len(finished),
+        "running": sorted(started - {e["stage"] for e in finished}),
+        "last_stage": finished[-1] if finished else None,
+        "run_id": next((e["run_id"] for e in events if e["event"] == "run_published"), None),
+        "elapsed_seconds": (datetime.fromisoformat(job.get("finished") or datetime.utcnow().isoformat())
+                            - datetime.fromisoformat(job["started"])).total_seconds(),
+    })
+    return job
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m src.job_runner", description="Background pipeline jobs.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    start = commands.add_parser("start", help="start a pipeline run in the background")
+    start.add_argument("--dataset", default="default")
+    run = commands.add_parser("run", help=argparse.SUPPRESS)
+    run.add_argument("job_file")
+    status = commands.add_parser("status", help="progress of the latest job")
+    status.add_argument("--dataset", default="default")
+    args = parser.parse_args(argv)
+
+    if args.command == "run":
+        sys.exit(_run(Path(args.job_file)))
+    if args.command == "start":
+        try:
+            print(f"Started job {start_job(args.dataset)['job_id']}")
+        except RuntimeError as e:
+            sys.exit(str(e))
+        return
+    job = latest_job(args.dataset)
+    if job is None:
+        print("No jobs yet.")
+        return
+    job = job_status(job["job_id"])
+    print(f"{job['job_id']}: {job['state']} ({job['stages_done']}/{job['stages_total']} stages, "
+          f"{job['elapsed_seconds']:.0f}s){' running: ' + ', '.join(job['running']) if job['running'] else ''}")
+
+
+if __name__ == "__main__":
+    main()
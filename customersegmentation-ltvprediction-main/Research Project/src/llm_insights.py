@@ -1,74 +1,322 @@
 # src/llm_insights.py
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import http.client
+import json
 import os
-import openai
-from typing import Generator
+import queue
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Dict, Generator, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+import pandas as pd
 
 # ----------------------------------------------------------------------
-#  CONFIG – put your OpenAI key in .env or set it in the environment
+#  CONFIG – set with configure(); the key is read from the environment
+#  variable named by api_key_env (OPENAI_API_KEY by default). base_url
+#  can point at any OpenAI-compatible endpoint, e.g. src.llm_mock_server.
 # ----------------------------------------------------------------------
-openai.api_key = os.getenv("OPENAI_API_KEY")   # <-- set this in your env
+DEFAULT_BASE_URL = "https://api.openai.com/v1"
 
+_state: Dict = {
+    "base_url": DEFAULT_BASE_URL,
+    "model": "gpt-3.5-turbo",
+    "api_key_env": "OPENAI_API_KEY",
+    "timeout": 30.0,
+    "cache_ttl": 3600.0,       # seconds a cached answer stays valid
+    "cache_entries": 256,      # LRU bound
+    "max_concurrency": 4,      # requests in flight per ask_many batch
+    "pool_size": 4,            # kept-alive connections
+}
+_cache: "OrderedDict[Tuple, Tuple[float, str]]" = OrderedDict()
+_in_flight: Dict[Tuple, Future] = {}
+_lock = threading.Lock()
+_pool: "queue.LifoQueue[http.client.HTTPConnection]" = queue.LifoQueue()
+_stats = {"requests": 0, "cache_hits": 0, "coalesced": 0}
 
-def get_llm_insight(query: str, df: "pd.DataFrame") -> str:
-    """
-    One-shot answer (non-streaming). Used for the sidebar Q&A.
-    """
-    if not openai.api_key:
-        return "Warning: OpenAI API key not set."
 
-    prompt = f"""
+def configure(config: Optional[dict] = None) -> None:
+    """Override any of the _state settings (base_url, model, ...). Clears the cache and the connection pool."""
+    config = config or {}
+    for key in _state:
+        if config.get(key) is not None:
+            _state[key] = type(_state[key])(config[key])
+    clear_cache()
+    _close_pool()
+
+
+def clear_cache() -> None:
+    with _lock:
+        _cache.clear()
+
+
+def stats() -> Dict[str, int]:
+    """Requests sent, cache hits and questions coalesced into an in-flight request."""
+    return dict(_stats)
+
+
+def _api_key() -> Optional[str]:
+    return os.getenv(_state["api_key_env"])
+
+
+# ---- prompt (shared by every entry point) ----
+
+def data_snapshot(df: pd.DataFrame) -> Dict:
+    """The summary of the score table the model is given."""
+    churn = df["churn_probability"] if "churn_probability" in df.columns else pd.Series([0.0])
+    return {
+        "cities": int(len(df)),
+        "avg_clv": float(df["CLV"].mean()) if len(df) else 0.0,
+        "high_churn_share": float((churn > 0.7).mean()),
+        "clusters": int(df["cluster"].nunique()) if "cluster" in df.columns else 0,
+    }
+
+
+def snapshot_hash(snapshot: Dict) -> str:
+    return hashlib.sha256(json.dumps(snapshot, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def build_prompt(query: str, snapshot: Dict) -> str:
+    return f"""
     You are a retail-analytics assistant. Summarise the data and answer the user.
 
     Data snapshot:
-    • Cities: {len(df):,}
-    • Avg CLV: {df['CLV'].mean():,.0f}
-    • Avg churn risk: {(df.get('churn_probability', pd.Series([0])) > 0.7).mean()*100:.1f}%
-    • Clusters: {df.get('cluster', pd.Series()).nunique()}
+    • Cities: {snapshot['cities']:,}
+    • Avg CLV: {snapshot['avg_clv']:,.0f}
+    • Avg churn risk: {snapshot['high_churn_share']*100:.1f}%
+    • Clusters: {snapshot['clusters']}
 
     Question: {query}
     """
+
+
+def normalize_question(query: str) -> str:
+    """Case, whitespace and trailing punctuation do not change the cache key."""
+    return re.sub(r"\s+", " ", query.strip().lower()).rstrip("?!. ")
+
+
+def _payload(query: str, snapshot: Dict, stream: bool = False) -> Dict:
+    payload = {
+        "model": _state["model"],
+        "messages": [{"role": "user", "content": build_prompt(query, snapshot)}],
+        "temperature": 0.2,
+    }
+    if stream:
+        payload["stream"] = True
+    else:
+        payload["max_tokens"] = 200
+    return payload
+
+
+# ---- response cache: (normalized question, snapshot hash, model) -> answer, TTL + LRU ----
+
+def _cache_key(query: str, snapshot: Dict) -> Tuple:
+    return normalize_question(query), snapshot_hash(snapshot), _state["model"]
+
+
+def _cache_get(key: Tuple) -> Optional[str]:
+    with _lock:
+        entry = _cache.get(key)
+        if entry is None:
+            return None
+        if entry[0] < time.monotonic():
+            del _cache[key]
+            return None
+        _cache.move_to_end(key)
+        _stats["cache_hits"] += 1
+        return entry[1]
+
+
+def _cache_put(key: Tuple, answer: str) -> None:
+    with _lock:
+        _cache[key] = (time.monotonic() + _state["cache_ttl"], answer)
+        _cache.move_to_end(key)
+        while len(_cache) > _state["cache_entries"]:
+            _cache.popitem(last=False)
+
+
+# ---- HTTP: kept-alive connections to the configured endpoint ----
+
+def _connect() -> http.client.HTTPConnection:
+    url = urlsplit(_state["base_url"])
+    cls = http.client.HTTPSConnection if url.scheme == "https" else http.client.HTTPConnection
+    return cls(url.hostname, url.port, timeout=_state["timeout"])
+
+
+def _close_pool() -> None:
+    while True:
+        try:
+            _pool.get_nowait().close()
+        except queue.Empty:
+            return
+
+
+def _open_request(payload: Dict) -> Tuple[http.client.HTTPConnection, http.client.HTTPResponse]:
+    """POST to <base_url>/chat/completions on a pooled connection (retrying once if it went stale)."""
+    body = json.dumps(payload).encode()
+    headers = {"Content-Type": "application/json"}
+    if _api_key():
+        headers["Authorization"] = f"Bearer {_api_key()}"
+    path = urlsplit(_state["base_url"]).path.rstrip("/") + "/chat/completions"
+    for attempt in range(2):
+        try:
+            conn = _pool.get_nowait()
+        except queue.Empty:
+            conn = _connect()
+        try:
+            conn.request("POST", path, body=body, headers=headers)
+            with _lock:
+                _stats["requests"] += 1
+            return conn, conn.getresponse()
+        except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+            conn.close()  # the server dropped an idle kept-alive connection
+            if attempt:
+                raise
+        except BaseException:
+            conn.close()  # timeout, refused connection, ...: never pool a connection in an unknown state
+            raise
+
+
+def _release(conn: http.client.HTTPConnection, response: http.client.HTTPResponse) -> None:
+    if response.will_close or _pool.qsize() >= _state["pool_size"]:
+        conn.close()
+    else:
+        _pool.put(conn)
+
+
+def _error_message(status: int, data: bytes) -> str:
+    """The API's error message from an error response body, else "HTTP <status>" (e.g. a proxy's HTML page)."""
     try:
-        resp = openai.ChatCompletion.create(
-            model="gpt-3.5-turbo",
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.2,
-            max_tokens=200,
-        )
-        return resp.choices[0].message.content.strip()
-    except Exception as e:
-        return f"LLM error: {e}"
+        error = json.loads(data).get("error")
+    except (ValueError, AttributeError):
+        error = None
+    message = error.get("message") if isinstance(error, dict) else None
+    return message or f"HTTP {status}"
+
+
+def _complete(payload: Dict) -> str:
+    conn, response = _open_request(payload)
+    try:
+        data = response.read()
+    finally:
+        _release(conn, response)
+    if response.status != 200:
+        raise RuntimeError(_error_message(response.status, data))
+    return json.loads(data or b"{}")["choices"][0]["message"]["content"].strip()
+
+
+def _check_key() -> Optional[str]:
+    if not _api_key() and _state["base_url"] == DEFAULT_BASE_URL:
+        return "Warning: OpenAI API key not set."
+    return None
+
 
+# ---- async client ----
 
-def stream_llm_response(query: str, df: "pd.DataFrame") -> Generator[str, None, None]:
+async def ask(query: str, df: Optional[pd.DataFrame] = None, snapshot: Optional[Dict] = None) -> str:
     """
-    Streaming version – yields chunks of text as they arrive.
-    Useful for a “type-writer” effect in a modal/chat window.
+    Answer one question about the data (a snapshot of df, or `snapshot` directly).
+    Cached answers are returned without a request; a question identical to one
+    already in flight (from any thread or event loop) waits for that request instead
+    of sending its own. Raises on HTTP or network errors (nothing is cached then).
     """
-    if not openai.api_key:
-        yield "Warning: OpenAI API key not set."
-        return
+    snapshot = snapshot if snapshot is not None else data_snapshot(df)
+    key = _cache_key(query, snapshot)
+    cached = _cache_get(key)
+    if cached is not None:
+        return cached
+    with _lock:
+        future = _in_flight.get(key)
+        owner = future is None
+        if owner:
+            future = _in_flight[key] = Future()
+        else:
+            _stats["coalesced"] += 1
+    if owner:
+        try:
+            answer = await asyncio.to_thread(_complete, _payload(query, snapshot))
+            _cache_put(key, answer)
+            future.set_result(answer)
+        except BaseException as e:
+            future.set_exception(e)
+        finally:
+            with _lock:
+                _in_flight.pop(key, None)
+    return await asyncio.wrap_future(future)
 
-    prompt = f"""
-    You are a retail-analytics assistant. Summarise the data and answer the user.
 
-    Data snapshot:
-    • Cities: {len(df):,}
-    • Avg CLV: {df['CLV'].mean():,.0f}
-    • Avg churn risk: {(df.get('churn_probability', pd.Series([0])) > 0.7).mean()*100:.1f}%
-    • Clusters: {df.get('cluster', pd.Series()).nunique()}
+async def ask_many(queries: List[str], df: Optional[pd.DataFrame] = None,
+                   snapshot: Optional[Dict] = None) -> List[str]:
+    """Answer a batch concurrently (max_concurrency at a time); errors become "LLM error: ..." answers."""
+    snapshot = snapshot if snapshot is not None else data_snapshot(df)
+    limit = asyncio.Semaphore(_state["max_concurrency"])
 
-    Question: {query}
+    async def one(query: str) -> str:
+        async with limit:
+            try:
+                return await ask(query, snapshot=snapshot)
+            except Exception as e:
+                return f"LLM error: {e}"
+
+    return list(await asyncio.gather(*(one(q) for q in queries)))
+
+
+# ---- sync entry points used by the dashboard ----
+
+def get_llm_insight(query: str, df: pd.DataFrame) -> str:
     """
+    One-shot answer (non-streaming). Used for the sidebar Q&A.
+    """
+    warning = _check_key()
+    if warning:
+        return warning
+    try:
+        return asyncio.run(ask(query, df))
+    except Exception as e:
+        return f"LLM error: {e}"
+
+
+def stream_llm_response(query: str, df: pd.DataFrame) -> Generator[str, None, None]:
+    """
+    Streaming version – yields chunks of text as they arrive.
+    Useful for a “type-writer” effect in a modal/chat window. A cached answer is
+    replayed word by word; a completed stream is cached like ask's answers.
+    """
+    warning = _check_key()
+    if warning:
+        yield warning
+        return
+    snapshot = data_snapshot(df)
+    key = _cache_key(query, snapshot)
+    cached = _cache_get(key)
+    if cached is not None:
+        yield from re.findall(r"\S+\s*", cached)
+        return
+    parts = []
     try:
-        stream = openai.ChatCompletion.create(
-            model="gpt-3.5-turbo",
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.2,
-            stream=True,
-        )
-        for chunk in stream:
-            content = chunk["choices"][0]["delta"].get("content")
-            if content:
-                yield content
+        conn, response = _open_request(_payload(query, snapshot, stream=True))
+        try:
+            if response.status != 200:
+                raise RuntimeError(f"HTTP {response.status}")
+            for line in response:
+                line = line.decode().strip()
+                if not line.startswith("data:"):
+                    continue
+                data = line[len("data:"):].strip()
+                if data == "[DONE]":
+                    break
+                content = json.loads(data)["choices"][0]["delta"].get("content")
+                if content:
+                    parts.append(content)
+                    yield content
+        finally:
+            conn.close()  # event streams are not reused
+        _cache_put(key, "".join(parts).strip())
     except Exception as e:
-        yield f"LLM streaming error: {e}"
\ No newline at end of file
+        yield f"LLM streaming error: {e}"
@@ -0,0 +1,102 @@
+# src/llm_mock_server.py
+from __future__ import annotations
+
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+
+# Offline stand-in for an OpenAI-compatible chat endpoint (POST /v1/chat/completions)
+# for tests and local runs: llm_insights.configure({"base_url": <its URL>}). It answers
+# with a canned reply echoing the question, optionally after `latency` seconds, and
+# counts requests and TCP connections so callers can check caching and connection reuse.
+
+
+def _reply(payload: Dict) -> str:
+    question = payload["messages"][-1]["content"].strip().splitlines()[-1].strip()
+    return f"[mock {payload.get('model', 'model')}] {question}"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, so clients can reuse the connection
+
+    def setup(self):
+        super().setup()
+        with self.server.stats_lock:
+            self.server.stats["connections"] += 1
+
+    def log_message(self, format, *args):  # keep test output quiet
+        pass
+
+    def _send_json(self, status: int, body: Dict) -> None:
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        if self.path.rstrip("/") != "/v1/chat/completions":
+            self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+            return
+        with self.server.stats_lock:
+            self.server.stats["requests"] += 1
+        time.sleep(self.server.latency)
+        text = _reply(payload)
+
+        if not payload.get("stream"):
+            self._send_json(200, {
+                "id": "mock", "object": "chat.completion", "model": payload.get("model"),
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": text},
+                             "finish_reason": "stop"}],
+            })
+            return
+        # Server-sent events, one word per chunk; the connection closes after [DONE]
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        for word in text.split(" "):
+            chunk = {"choices": [{"index": 0, "delta": {"content": word + " "}}]}
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            self.wfile.flush()
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.close_connection = True
+
+
+def start(host: str = "127.0.0.1", port: int = 0, latency: float = 0.0) -> Tuple[ThreadingHTTPServer, str]:
+    """
+    Serve in a daemon thread. Returns (server, base_url); server.stats holds the
+    request and connection counts, server.shutdown() stops it.
+    """
+    server = ThreadingHTTPServer((host, port), _Handler)
+    server.daemon_threads = True
+    server.latency = latency
+    server.stats = {"requests": 0, "connections": 0}
+    server.stats_lock = threading.Lock()
+    threading.Thread(target=server.serve_forever, name="llm-mock-server", daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}/v1"
+
+
+def main(argv: Optional[list] = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m src.llm_mock_server",
+                                     description="Local OpenAI-compatible mock endpoint.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds per request")
+    args = parser.parse_args(argv)
+    server, url = start(args.host, args.port, args.latency)
+    print(f"Mock LLM endpoint at {url}. Ctrl+C to stop.")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
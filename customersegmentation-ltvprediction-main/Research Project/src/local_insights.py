@@ -1,28 +1,260 @@
 # src/local_insights.py
+import json
+import re
+import time
+from pathlib import Path
+from typing import Dict, Generator, List, Optional, Tuple
+
+import numpy as np
 import pandas as pd
-from typing import Generator
 
-def generate_insight(query: str, df: pd.DataFrame) -> str:
+from src.dashboard_utils import RESULTS_DIR
+
+# Answers come from a small index of facts computed once per run (build_insight_index),
+# so a question costs a regex match and a dict lookup whatever the customer count.
+INDEX_FILE = "insight_index.json"
+TOP_N = 10                 # entities kept per list in the index
+HIGH_RISK = 0.7            # churn probability counted as high risk
+MAX_LATENCIES = 1000       # recent query latencies kept for latency_stats
+
+_latencies: List[float] = []
+
+
+def _top(df: pd.DataFrame, column: str, n: int) -> List[Dict]:
+    """The n rows with the largest `column`, skipping missing values; NaN fields become None (null in JSON)."""
+    columns = [c for c in ("customer_id", "cluster", "CLV", "churn_probability") if c in df.columns]
+    top = df.dropna(subset=[column]).nlargest(n, column)[columns]
+    return [{k: (None if pd.isna(v) else v.item() if isinstance(v, np.generic) else v) for k, v in row.items()}
+            for row in top.to_dict("records")]
+
+
+def _mean(values: pd.Series) -> Optional[float]:
+    """Mean of the non-missing values; None when there are none."""
+    values = values.dropna()
+    return float(values.mean()) if len(values) else None
+
+
+def _amount(value: Optional[float]) -> str:
+    return f"{value:,.0f}" if value is not None else "n/a"
+
+
+def _forecast_summary(panel: pd.DataFrame, n: int) -> Optional[Dict]:
+    """Value per customer at the end of the horizon (cumulative revenue, else forecast CLV)."""
+    if panel is None or panel.empty or "date" not in panel.columns:
+        return None
+    measure = "expected_revenue" if "expected_revenue" in panel.columns else "forecast_clv"
+    if measure not in panel.columns:
+        return None
+    dates = pd.to_datetime(np.asarray(panel["date"]))  # the panel stores dates as a categorical
+    end = panel.iloc[np.argsort(dates, kind="stable")].groupby("customer_id", sort=False, observed=True).tail(1)
+    finite = np.isfinite(end[measure].to_numpy(dtype=float))  # degenerate model fits can overflow
+    return {
+        "measure": measure,
+        "start": str(dates.min().date()),
+        "end": str(dates.max().date()),
+        "days": int(dates.nunique()),
+        "total": float(end.loc[finite, measure].sum()),
+        "non_finite": int((~finite).sum()),
+        "top": [{"customer_id": str(r["customer_id"]), measure: float(r[measure])}
+                for r in end[finite].nlargest(n, measure).to_dict("records")],
+    }
+
+
+def build_insight_index(df: pd.DataFrame, forecast: Optional[pd.DataFrame] = None, top_n: int = TOP_N,
+                        high_risk: float = HIGH_RISK) -> Dict:
+    """
+    Facts the query router answers from: totals, top entities by CLV and churn risk
+    (overall and per cluster), per-cluster stats, risk counts and, given the long
+    forecast panel, a forecast summary. JSON-serialisable.
+    """
+    has_churn = "churn_probability" in df.columns
+    index = {
+        "built": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "top_n": top_n,
+        "high_risk": high_risk,
+        "customers": int(len(df)),
+        "avg_clv": _mean(df["CLV"]),
+        "total_clv": float(df["CLV"].sum()),
+        "top_clv": _top(df, "CLV", top_n),
+        "top_risk": _top(df, "churn_probability", top_n) if has_churn else [],
+        "high_risk_customers": int((df["churn_probability"] > high_risk).sum()) if has_churn else None,
+        "clusters": {},
+        "forecast": _forecast_summary(forecast, top_n),
+    }
+    if "cluster" in df.columns:
+        for cluster, group in df.groupby("cluster", sort=True):
+            stats = {
+                "customers": int(len(group)),
+                "avg_clv": _mean(group["CLV"]),
+                "top_clv": _top(group, "CLV", top_n),
+            }
+            if has_churn:
+                stats["avg_churn_probability"] = _mean(group["churn_probability"])
+                stats["high_risk_customers"] = int((group["churn_probability"] > high_risk).sum())
+                stats["top_risk"] = _top(group, "churn_probability", top_n)
+            index["clusters"][str(int(cluster))] = stats
+    return index
+
+
+def save_insight_index(index: Dict, path: Optional[Path] = None) -> Path:
+    path = Path(path or RESULTS_DIR / INDEX_FILE)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    tmp_path.write_text(json.dumps(index, indent=2, default=str, allow_nan=False))
+    tmp_path.replace(path)
+    return path
+
+
+def load_insight_index(path: Optional[Path] = None) -> Dict:
+    try:
+        return json.loads(Path(path or RESULTS_DIR / INDEX_FILE).read_text())
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+# ---- query routing: (intent, pattern) in priority order; named groups are parameters ----
+_NUMBER = r"(?P<n>\d+)"
+_CLUSTER = r"(?:cluster|segment)\s*#?\s*(?P<cluster>\d+)"
+ROUTES: List[Tuple[str, "re.Pattern"]] = [
+    ("top_risk", re.compile(rf"\b(?:top|most|highest)\s*(?:{_NUMBER}\s*)?.*?(?:risk|churn)")),
+    ("top", re.compile(rf"\b(?:top|best|highest)\s*{_NUMBER}?")),
+    ("risk", re.compile(r"churn|risk")),
+    ("forecast", re.compile(r"forecast|next\s+\d*\s*days|predict")),
+    ("offer", re.compile(r"\bnbo\b|offer")),
+    ("cluster", re.compile(r"cluster|segment")),
+]
+
+
+def route_query(query: str) -> Tuple[str, Dict]:
+    """Intent of a question and its parameters, e.g. "top 5 in cluster 2" -> ("top", {"n": 5, "cluster": "2"})."""
     query = query.lower()
-    total_cities = len(df)
-    avg_clv = df['CLV'].mean()
-    high_risk = (df.get('churn_probability', pd.Series([0])) > 0.7).mean() * 100
-    top_city = df.nlargest(1, 'CLV')['customer_id'].iloc[0] if not df.empty else "N/A"
-
-    if "top" in query or "best" in query:
-        return f"The top-performing city is **{top_city}** with a CLV of {df['CLV'].max():,.0f}."
-    elif "churn" in query or "risk" in query:
-        return f"Currently, **{high_risk:.1f}%** of cities have a churn risk above 70%. Focus retention efforts on high-CLV, high-risk segments."
-    elif "cluster" in query:
-        clusters = df['cluster'].nunique() if 'cluster' in df.columns else 0
-        return f"There are **{clusters} customer segments** identified using AI-driven GMM clustering."
-    elif "forecast" in query:
-        return f"Forecasting is active. Use the Forecast tab to explore 30-day CLV predictions per city."
-    elif "nbo" in query or "offer" in query:
-        return f"Next-Best-Offer engine is running. High-CLV, low-recency customers are prioritized for premium upsell."
-    else:
-        return f"Total cities: {total_cities:,}. Avg CLV: {avg_clv:,.0f}. Use tabs to explore CLV, churn, and forecasts."
-
-def stream_insight(text: str) -> Generator[str, None, None]:
-    for char in text:
-        yield char
\ No newline at end of file
+    params: Dict = {}
+    cluster = re.search(_CLUSTER, query)
+    if cluster:
+        params["cluster"] = cluster.group("cluster")
+    for intent, pattern in ROUTES:
+        match = pattern.search(query)
+        if match:
+            if match.groupdict().get("n"):
+                params["n"] = int(match.group("n"))
+            return intent, params
+    return "summary", params
+
+
+def _scope(index: Dict, params: Dict) -> Tuple[Optional[Dict], str]:
+    cluster = params.get("cluster")
+    if cluster is None:
+        return index, "overall"
+    return index["clusters"].get(cluster), f"in cluster {cluster}"
+
+
+def _entity_list(rows: List[Dict], value: str, fmt: str) -> str:
+    return "; ".join(f"**{r['customer_id']}** ({fmt.format(r[value])})" for r in rows)
+
+
+def _answer_top(index: Dict, params: Dict) -> str:
+    scope, label = _scope(index, params)
+    if scope is None:
+        return f"There is no cluster {params['cluster']}; clusters are {', '.join(index['clusters'])}."
+    n = min(params.get("n", 1), index["top_n"])
+    rows = scope["top_clv"][:n]
+    if not rows:
+        return "No customers to rank."
+    if n == 1:
+        return f"The top-performing city {label} is **{rows[0]['customer_id']}** with a CLV of {rows[0]['CLV']:,.0f}."
+    return f"Top {len(rows)} cities by CLV {label}: " + _entity_list(rows, "CLV", "CLV {:,.0f}") + "."
+
+
+def _answer_top_risk(index: Dict, params: Dict) -> str:
+    scope, label = _scope(index, params)
+    if scope is None or not scope.get("top_risk"):
+        return "No churn scores for that selection."
+    rows = scope["top_risk"][:min(params.get("n", 5), index["top_n"])]
+    return f"Highest churn risk {label}: " + _entity_list(rows, "churn_probability", "{:.0%}") + "."
+
+
+def _answer_risk(index: Dict, params: Dict) -> str:
+    scope, label = _scope(index, params)
+    if scope is None or scope.get("high_risk_customers") is None:
+        return "Churn scores are not available for that selection."
+    share = scope["high_risk_customers"] / max(scope["customers"], 1) * 100
+    return (f"{label.capitalize()}, **{share:.1f}%** of cities ({scope['high_risk_customers']:,}) have a churn risk "
+            f"above {index['high_risk']:.0%}. Focus retention efforts on high-CLV, high-risk segments.")
+
+
+def _answer_cluster(index: Dict, params: Dict) -> str:
+    if "cluster" in params:
+        scope, label = _scope(index, params)
+        if scope is None:
+            return f"There is no cluster {params['cluster']}; clusters are {', '.join(index['clusters'])}."
+        churn = (f", avg churn risk {scope['avg_churn_probability']:.0%}"
+                 if scope.get("avg_churn_probability") is not None else "")
+        return f"Cluster {params['cluster']}: {scope['customers']:,} cities, avg CLV {_amount(scope['avg_clv'])}{churn}."
+    scored = [(cluster, stats) for cluster, stats in index["clusters"].items() if stats["avg_clv"] is not None]
+    best = max(scored, key=lambda kv: kv[1]["avg_clv"], default=None)
+    lead = f" Cluster {best[0]} leads with avg CLV {best[1]['avg_clv']:,.0f}." if best else ""
+    return f"There are **{len(index['clusters'])} customer segments** identified using AI-driven GMM clustering.{lead}"
+
+
+def _answer_forecast(index: Dict, params: Dict) -> str:
+    forecast = index.get("forecast")
+    if not forecast:
+        return "No forecast in the last run. Enable forecasting in config.yaml and rerun the pipeline."
+    label = "expected revenue" if forecast["measure"] == "expected_revenue" else "forecast CLV"
+    n = min(params.get("n", 3), index["top_n"])
+    skipped = (f" ({forecast['non_finite']:,} cities without a finite forecast excluded)"
+               if forecast.get("non_finite") else "")
+    return (f"Over the {forecast['days']} days to {forecast['end']}, total {label} is {forecast['total']:,.0f}"
+            f"{skipped}. Leading cities: " + _entity_list(forecast["top"][:n], forecast["measure"], "{:,.0f}") + ".")
+
+
+def _answer_offer(index: Dict, params: Dict) -> str:
+    return "Next-Best-Offer engine is running. High-CLV, low-recency customers are prioritized for premium upsell."
+
+
+def _answer_summary(index: Dict, params: Dict) -> str:
+    return (f"Total cities: {index['customers']:,}. Avg CLV: {_amount(index['avg_clv'])}. "
+            f"Use tabs to explore CLV, churn, and forecasts.")
+
+
+HANDLERS = {
+    "top": _answer_top,
+    "top_risk": _answer_top_risk,
+    "risk": _answer_risk,
+    "cluster": _answer_cluster,
+    "forecast": _answer_forecast,
+    "offer": _answer_offer,
+    "summary": _answer_summary,
+}
+
+
+def answer_query(query: str, index: Dict) -> Dict:
+    """Route and answer one question from the index: {"answer", "intent", "params", "latency_ms"}."""
+    started = time.perf_counter()
+    intent, params = route_query(query)
+    answer = HANDLERS[intent](index, params) if index else "No insight index yet. Run the pipeline first."
+    latency_ms = (time.perf_counter() - started) * 1000
+    _latencies.append(latency_ms)
+    del _latencies[:-MAX_LATENCIES]
+    return {"answer": answer, "intent": intent, "params": params, "latency_ms": latency_ms}
+
+
+def latency_stats() -> Dict[str, float]:
+    """Count, p50, p95 and max (ms) of the recent answer_query latencies."""
+    if not _latencies:
+        return {"count": 0}
+    values = np.asarray(_latencies)
+    return {"count": len(values), "p50_ms": float(np.percentile(values, 50)),
+            "p95_ms": float(np.percentile(values, 95)), "max_ms": float(values.max())}
+
+
+def generate_insight(query: str, df: pd.DataFrame, index: Optional[Dict] = None) -> str:
+    """Answer `query` from `index`, building it from df when none is given."""
+    return answer_query(query, index if index is not None else build_insight_index(df))["answer"]
+
+
+def stream_insight(text: str, chunk: str = "word") -> Generator[str, None, None]:
+    """Yield text in word (default) or sentence chunks, whitespace kept, for st.write_stream."""
+    pattern = r"\S+\s*" if chunk == "word" else r"[^.!?]+[.!?]*\s*"
+    for match in re.finditer(pattern, text):
+        yield match.group(0)
@@ -1,22 +1,42 @@
 import logging
 import os
 
+# Nothing is configured at import: the log file and handlers are set up by the
+# first setup_logging() / get_logger() call (main() makes it on start).
+_configured = False
+
+
 def setup_logging():
     """
     Set up logging configuration to save logs to a file and console.
+    Only the first call configures; later calls return the same logger.
     """
-    log_dir = 'output/logs'
-    os.makedirs(log_dir, exist_ok=True)
-    log_file = os.path.join(log_dir, 'app.log')
-
-    logging.basicConfig(
-        level=logging.INFO,
-        format='%(asctime)s - %(levelname)s - %(message)s',
-        handlers=[
-            logging.FileHandler(log_file),
-            logging.StreamHandler()
-        ]
-    )
+    global _configured
+    if not _configured:
+        log_dir = 'output/logs'
+        os.makedirs(log_dir, exist_ok=True)
+        log_file = os.path.join(log_dir, 'app.log')
+
+        logging.basicConfig(
+            level=logging.INFO,
+            format='%(asctime)s - %(levelname)s - %(message)s',
+            handlers=[
+                logging.FileHandler(log_file),
+                logging.StreamHandler()
+            ]
+        )
+        _configured = True
     return logging.getLogger(__name__)
 
-logger = setup_logging()
\ No newline at end of file
+
+def get_logger(name=None):
+    """A logger (this module's by default) with file and console logging set up."""
+    setup_logging()
+    return logging.getLogger(name or __name__)
+
+
+def __getattr__(name):
+    # `from src.logging_setup import logger` keeps working, configuring on first use
+    if name == 'logger':
+        return get_logger()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
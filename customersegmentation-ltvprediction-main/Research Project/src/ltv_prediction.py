@@ -1,49 +1,83 @@
 from lifetimes import BetaGeoFitter, GammaGammaFitter
 
-def predict_ltv(rfm, config):
+def fit_ltv_models(rfm, config):
+    """
+    Fit the BG/NBD (purchase frequency) and Gamma-Gamma (spend) models.
+    Returns (bgf, ggf); ggf is None when no customer has repeat purchases with spend.
+    `fit_tol` (optional) is the optimiser tolerance of both fits, lifetimes' 1e-7 by default.
+    The fitters are picklable (stage cache, model registry).
+    """
+    bgf = BetaGeoFitter(penalizer_coef=config['penalizer_coef_bgf'])
+    bgf.fit(rfm['frequency'], rfm['recency'], rfm['T'], tol=config.get('fit_tol', 1e-7))
+    valid_mask = (rfm['monetary_value'] > 0) & (rfm['frequency'] > 0)
+    ggf = None
+    if valid_mask.any():
+        ggf = GammaGammaFitter(penalizer_coef=config['penalizer_coef_ggf'])
+        ggf.fit(rfm.loc[valid_mask, 'frequency'], rfm.loc[valid_mask, 'monetary_value'],
+                tol=config.get('fit_tol', 1e-7))
+    for fitter in filter(None, (bgf, ggf)):
+        # lifetimes' simulation helper is a lambda, which blocks pickling the fitter
+        # (lifetimes' own save_model drops it the same way)
+        fitter.generate_new_data = None
+    return bgf, ggf
+
+
+def predict_ltv(rfm, config, models=None, closed_form=False):
     """
     Predict Lifetime Value using BG/NBD and Gamma-Gamma models.
+    `models` is a (bgf, ggf) pair from fit_ltv_models; they are fitted here when omitted.
+    `closed_form` computes the same CLV with src.ltv_trajectory.closed_form_clv, which
+    avoids lifetimes' per-month loop, so scoring a few customers online takes milliseconds.
     Returns RFM DataFrame with predicted purchases, probability alive, expected profit, and CLV.
     """
     # BG/NBD Model for purchase frequency
-    bgf = BetaGeoFitter(penalizer_coef=config['penalizer_coef_bgf'])
-    bgf.fit(rfm['frequency'], rfm['recency'], rfm['T'])
+    bgf, ggf = models if models is not None else fit_ltv_models(rfm, config)
+
+    def values(column, rows=slice(None)):
+        # with closed_form lifetimes gets plain arrays: its pandas arithmetic is a fixed cost per call
+        series = rfm.loc[rows, column]
+        return series.to_numpy(dtype=float) if closed_form else series
+
     rfm['predicted_purchases_30'] = bgf.conditional_expected_number_of_purchases_up_to_time(
-        30, rfm['frequency'], rfm['recency'], rfm['T']
+        30, values('frequency'), values('recency'), values('T')
     )
-    rfm['prob_alive'] = bgf.conditional_probability_alive(rfm['frequency'], rfm['recency'], rfm['T'])
+    rfm['prob_alive'] = bgf.conditional_probability_alive(values('frequency'), values('recency'), values('T'))
 
     # Gamma-Gamma Model for monetary value
-    valid_mask = (rfm['monetary_value'] > 0) & (rfm['frequency'] > 0)
-    ggf = GammaGammaFitter(penalizer_coef=config['penalizer_coef_ggf'])
+    valid_mask = (rfm['monetary_value'] > 0) & (rfm['frequency'] > 0) & (ggf is not None)
     if valid_mask.any():
-        ggf.fit(rfm.loc[valid_mask, 'frequency'], rfm.loc[valid_mask, 'monetary_value'])
         rfm['expected_avg_profit'] = 0.0
         rfm.loc[valid_mask, 'expected_avg_profit'] = ggf.conditional_expected_average_profit(
-            rfm.loc[valid_mask, 'frequency'], rfm.loc[valid_mask, 'monetary_value']
+            values('frequency', valid_mask), values('monetary_value', valid_mask)
         )
     else:
         rfm['expected_avg_profit'] = 0.0
 
+    def lifetime_value(*args, **kwargs):
+        if closed_form:
+            from src.ltv_trajectory import closed_form_clv
+            return closed_form_clv(ggf, *args, **kwargs)
+        return ggf.customer_lifetime_value(*args, **kwargs)
+
     # Calculate CLV with profit adjustment if available (hypothetical; adjust based on dataset)
     rfm['CLV'] = 0.0
     if 'profit_adjusted' in rfm.columns and valid_mask.any():  # Assume profit data is preprocessed
-        rfm.loc[valid_mask, 'CLV'] = ggf.customer_lifetime_value(
+        rfm.loc[valid_mask, 'CLV'] = lifetime_value(
             bgf,
-            rfm.loc[valid_mask, 'frequency'],
-            rfm.loc[valid_mask, 'recency'],
-            rfm.loc[valid_mask, 'T'],
-            rfm.loc[valid_mask, 'profit_adjusted'],  # Use profit instead of monetary_value if available
+            values('frequency', valid_mask),
+            values('recency', valid_mask),
+            values('T', valid_mask),
+            values('profit_adjusted', valid_mask),  # Use profit instead of monetary_value if available
             time=config['prediction_period_months'],
             discount_rate=config['monthly_discount_rate']
         )
     elif valid_mask.any():
-        rfm.loc[valid_mask, 'CLV'] = ggf.customer_lifetime_value(
+        rfm.loc[valid_mask, 'CLV'] = lifetime_value(
             bgf,
-            rfm.loc[valid_mask, 'frequency'],
-            rfm.loc[valid_mask, 'recency'],
-            rfm.loc[valid_mask, 'T'],
-            rfm.loc[valid_mask, 'monetary_value'],
+            values('frequency', valid_mask),
+            values('recency', valid_mask),
+            values('T', valid_mask),
+            values('monetary_value', valid_mask),
             time=config['prediction_period_months'],
             discount_rate=config['monthly_discount_rate']
         )
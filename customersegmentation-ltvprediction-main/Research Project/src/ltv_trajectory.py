@@ -0,0 +1,168 @@
+# src/ltv_trajectory.py
+from __future__ import annotations
+
+import json
+import os
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.dashboard_utils import RESULTS_DIR
+
+TRAJECTORY_FILE = "ltv_trajectories.npy"
+TRAJECTORY_META_FILE = "ltv_trajectories.json"
+# Leading axis of the stored array
+METRICS = ("expected_purchases", "prob_alive", "expected_revenue")
+
+
+def _bgnbd_params(bgf) -> Tuple[float, float, float, float]:
+    params = bgf.params_
+    return float(params["r"]), float(params["alpha"]), float(params["a"]), float(params["b"])
+
+
+def expected_purchases_curve(params, frequency, recency, T, t) -> np.ndarray:
+    """
+    BG/NBD conditional expected repeat purchases in (T, T + t] for every customer and
+    every horizon at once: customer columns are broadcast against the row of horizons
+    `t`, giving a (customers x horizons) array. Same closed form (Fader et al. 2005,
+    eq. 10) and hypergeometric fallback as lifetimes, evaluated in one call.
+    """
+    from scipy.special import hyp2f1  # scipy is only needed to compute, not to load, trajectories
+
+    r, alpha, a, b = params
+    x = np.asarray(frequency, dtype=np.float64)[:, None]
+    t_x = np.asarray(recency, dtype=np.float64)[:, None]
+    T = np.asarray(T, dtype=np.float64)[:, None]
+    t = np.asarray(t, dtype=np.float64)[None, :]
+
+    _a, _b, _c = r + x, b + x, a + b + x - 1
+    _z = t / (alpha + T + t)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ln_hyp = np.log(hyp2f1(_a, _b, _c, _z))
+        ln_hyp_alt = np.log(hyp2f1(_c - _a, _c - _b, _c, _z)) + (_c - _a - _b) * np.log1p(-_z)
+    ln_hyp = np.where(np.isinf(ln_hyp), ln_hyp_alt, ln_hyp)
+
+    first = (a + b + x - 1) / (a - 1)
+    second = 1 - np.exp(ln_hyp + (r + x) * np.log((alpha + T) / (alpha + t + T)))
+    denominator = 1 + (x > 0) * (a / (b + np.maximum(x, 1) - 1)) * ((alpha + T) / (alpha + t_x)) ** (r + x)
+    return first * second / denominator
+
+
+def closed_form_clv(ggf, bgf, frequency, recency, T, monetary_value, time: int = 12,
+                    discount_rate: float = 0.01) -> np.ndarray:
+    """
+    ggf.customer_lifetime_value(bgf, ...) in one vectorised call: expected purchases
+    per 30-day month over `time` months from expected_purchases_curve, times the
+    Gamma-Gamma expected profit, discounted monthly at `discount_rate`. lifetimes
+    loops over the months with two pandas predictions each, a fixed cost that
+    dominates when scoring a handful of customers.
+    """
+    grid = np.arange(time + 1) * 30.0
+    with np.errstate(invalid="ignore"):  # curves that overflow give NaN, as in lifetimes
+        monthly = np.diff(expected_purchases_curve(_bgnbd_params(bgf), frequency, recency, T, grid), axis=1)
+    discount = (1 + discount_rate) ** -np.arange(1, time + 1, dtype=np.float64)
+    spend = ggf.conditional_expected_average_profit(np.asarray(frequency, dtype=np.float64),
+                                                    np.asarray(monetary_value, dtype=np.float64))
+    return spend * (monthly @ discount)
+
+
+def prob_alive_curve(params, frequency, recency, T, t) -> np.ndarray:
+    """
+    Probability each customer is still alive t days after the observation end if
+    no further purchase is seen (P(alive) with the customer's age extended to T + t).
+    """
+    from scipy.special import expit
+
+    r, alpha, a, b = params
+    x = np.asarray(frequency, dtype=np.float64)[:, None]
+    t_x = np.asarray(recency, dtype=np.float64)[:, None]
+    age = np.asarray(T, dtype=np.float64)[:, None] + np.asarray(t, dtype=np.float64)[None, :]
+    log_div = (r + x) * np.log((alpha + age) / (alpha + t_x)) + np.log(a / (b + np.maximum(x, 1) - 1))
+    return np.where(x == 0, 1.0, expit(-log_div))
+
+
+def compute_ltv_trajectories(rfm: pd.DataFrame, bgf, days: int = 365, step: int = 1,
+                             chunk_size: int = 100_000, out: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Cumulative expected purchases, prob_alive and cumulative expected revenue for every
+    customer on the day grid 0, step, ..., days (days after the observation end).
+
+    Returns a float32 array of shape (len(METRICS), customers, grid points). Customers
+    are processed in blocks of `chunk_size`; pass `out` (e.g. a np.memmap) to write
+    the blocks straight to disk. Revenue uses the Gamma-Gamma `expected_avg_profit`
+    column (0 where the spend model was not fitted).
+    """
+    params = _bgnbd_params(bgf)
+    grid = np.arange(0, days + 1, step)
+    n = len(rfm)
+    if out is None:
+        out = np.empty((len(METRICS), n, len(grid)), dtype=np.float32)
+
+    frequency = rfm["frequency"].to_numpy(dtype=np.float64)
+    recency = rfm["recency"].to_numpy(dtype=np.float64)
+    age = rfm["T"].to_numpy(dtype=np.float64)
+    spend = (pd.to_numeric(rfm["expected_avg_profit"], errors="coerce").fillna(0).to_numpy(dtype=np.float64)
+             if "expected_avg_profit" in rfm.columns else np.zeros(n))
+    for start in range(0, n, chunk_size):
+        rows = slice(start, start + chunk_size)
+        purchases = expected_purchases_curve(params, frequency[rows], recency[rows], age[rows], grid)
+        out[0, rows] = purchases
+        out[1, rows] = prob_alive_curve(params, frequency[rows], recency[rows], age[rows], grid)
+        out[2, rows] = purchases * spend[rows, None]
+    return out
+
+
+def run_ltv_trajectories(rfm: pd.DataFrame, bgf, config: Optional[dict] = None,
+                         observation_end: Optional[pd.Timestamp] = None) -> Tuple[np.ndarray, Dict]:
+    """
+    Compute the trajectories for `ltv.trajectory_days` / `ltv.trajectory_step` and store
+    them as ltv_trajectories.npy (float32, written block by block through a memmap)
+    with ltv_trajectories.json holding customer ids, day grid and model parameters.
+    """
+    config = config or {}
+    days = int(config.get("trajectory_days", 365))
+    step = int(config.get("trajectory_step", 1))
+    grid = np.arange(0, days + 1, step)
+    shape = (len(METRICS), len(rfm), len(grid))
+
+    RESULTS_DIR.mkdir(parents=True, exist_ok=True)
+    # Written to a temporary file and renamed, so readers holding a memmap of the
+    # previous run keep a consistent (old) file
+    tmp_path = RESULTS_DIR / (TRAJECTORY_FILE + ".tmp")
+    out = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=np.float32, shape=shape)
+    compute_ltv_trajectories(rfm, bgf, days=days, step=step,
+                             chunk_size=int(config.get("trajectory_chunk_size", 100_000)), out=out)
+    out.flush()
+    os.replace(tmp_path, RESULTS_DIR / TRAJECTORY_FILE)
+
+    r, alpha, a, b = _bgnbd_params(bgf)
+    meta = {
+        "metrics": list(METRICS),
+        "shape": list(shape),
+        "days": days,
+        "step": step,
+        "observation_end": pd.Timestamp(observation_end).strftime("%Y-%m-%d") if observation_end is not None else None,
+        "bgnbd_params": {"r": r, "alpha": alpha, "a": a, "b": b},
+        "customer_ids": [str(c) for c in rfm.index],
+    }
+    (RESULTS_DIR / TRAJECTORY_META_FILE).write_text(json.dumps(meta))
+    print(f"LTV trajectories saved: {len(rfm):,} customers x {len(grid)} days "
+          f"({out.nbytes / 1e6:,.1f} MB float32)")
+    return out, meta
+
+
+def load_ltv_trajectories(mmap: bool = True) -> Tuple[Optional[np.ndarray], Dict]:
+    """
+    Stored trajectories and their metadata, memory-mapped by default so callers read
+    only the slices they index. Returns (None, {}) when nothing has been saved yet.
+    """
+    path, meta_path = RESULTS_DIR / TRAJECTORY_FILE, RESULTS_DIR / TRAJECTORY_META_FILE
+    if not path.exists() or not meta_path.exists():
+        return None, {}
+    return np.load(path, mmap_mode="r" if mmap else None), json.loads(meta_path.read_text())
+
+
+def trajectory_day_grid(meta: Dict) -> np.ndarray:
+    """Days after the observation end for each column of the stored array."""
+    return np.arange(0, meta["days"] + 1, meta["step"])
@@ -0,0 +1,153 @@
+# src/model_registry.py
+from __future__ import annotations
+
+import json
+import os
+import pickle
+import platform
+import shutil
+from datetime import datetime
+from importlib import metadata
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from src.stage_cache import hash_value
+
+# Fitted models of each pipeline run, so new customers can be scored without
+# refitting (python -m src.score). Layout: <dir>/<version>/<name>.pkl plus
+# <version>/manifest.json describing every model (feature schema, config, data
+# fingerprint, metrics, library versions); <dir>/LATEST names the last complete
+# version. A version is the results-store run id of the run that fitted it.
+REGISTRY_DIR = Path("output/models")
+LATEST_FILE = "LATEST"
+MANIFEST_FILE = "manifest.json"
+LIBRARIES = ("scikit-learn", "lifetimes", "numpy", "pandas")
+
+_state: Dict = {"enabled": True, "dir": REGISTRY_DIR, "keep_versions": 10}
+
+
+def configure(config: Optional[dict] = None) -> None:
+    """Apply the `registry` config section: enabled, dir, keep_versions (null = keep all)."""
+    config = config or {}
+    _state["enabled"] = bool(config.get("enabled", True))
+    _state["dir"] = Path(config.get("dir") or REGISTRY_DIR)
+    _state["keep_versions"] = config.get("keep_versions", 10)
+
+
+def enabled() -> bool:
+    return _state["enabled"]
+
+
+def fingerprint(data) -> str:
+    """Content hash of the data a model was fitted on (any value stage_cache can hash)."""
+    return hash_value(data)[:16]
+
+
+def _library_versions() -> Dict[str, str]:
+    versions = {"python": platform.python_version()}
+    for name in LIBRARIES:
+        try:
+            versions[name] = metadata.version(name)
+        except metadata.PackageNotFoundError:
+            pass
+    return versions
+
+
+def _version_dir(version: str) -> Path:
+    return _state["dir"] / version
+
+
+def load_manifest(version: Optional[str] = None) -> Dict:
+    """Manifest of `version` (the LATEST one by default); {} when there is none."""
+    version = version or latest_version()
+    try:
+        return json.loads((_version_dir(version) / MANIFEST_FILE).read_text()) if version else {}
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def _write_json(path: Path, payload) -> None:
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp_path.write_text(json.dumps(payload, indent=2, default=str))
+    os.replace(tmp_path, path)
+
+
+def save_model(name: str, model, version: str, features: Optional[List[str]] = None,
+               config: Optional[Dict] = None, data=None, metrics: Optional[Dict] = None) -> Path:
+    """
+    Pickle `model` as `name` in `version` and describe it in the version's manifest:
+    its input `features` (in order), the `config` it was fitted with, a fingerprint
+    of its training `data` and its validation `metrics`.
+    """
+    path = _version_dir(version)
+    path.mkdir(parents=True, exist_ok=True)
+    model_path = path / f"{name}.pkl"
+    with open(model_path, "wb") as handle:
+        pickle.dump(model, handle, protocol=pickle.HIGHEST_PROTOCOL)
+    manifest = load_manifest(version) or {"version": version, "created": datetime.now().isoformat(timespec="seconds"),
+                                          "libraries": _library_versions(), "models": {}}
+    manifest["models"][name] = {
+        "file": model_path.name,
+        "class": f"{type(model).__module__}.{type(model).__qualname__}",
+        "features": list(features) if features is not None else None,
+        "config": config,
+        "data_fingerprint": fingerprint(data) if data is not None else None,
+        "metrics": metrics,
+        "bytes": model_path.stat().st_size,
+    }
+    _write_json(path / MANIFEST_FILE, manifest)
+    return model_path
+
+
+def publish(version: str) -> str:
+    """Point LATEST at `version` (atomically): scoring uses its models by default."""
+    _state["dir"].mkdir(parents=True, exist_ok=True)
+    tmp_path = _state["dir"] / f".{LATEST_FILE}.{os.getpid()}.tmp"
+    tmp_path.write_text(version)
+    os.replace(tmp_path, _state["dir"] / LATEST_FILE)
+    return version
+
+
+def latest_version() -> Optional[str]:
+    path = _state["dir"] / LATEST_FILE
+    return path.read_text().strip() if path.exists() else None
+
+
+def list_versions() -> List[str]:
+    """Versions with a manifest, oldest first (run ids sort by time)."""
+    return sorted(p.parent.name for p in _state["dir"].glob(f"*/{MANIFEST_FILE}"))
+
+
+def load_model(name: str, version: Optional[str] = None) -> Tuple[object, Dict]:
+    """(model, manifest entry) of `name` in `version` (LATEST by default). Raises KeyError when absent."""
+    version = version or latest_version()
+    entry = load_manifest(version).get("models", {}).get(name)
+    if entry is None:
+        raise KeyError(f"No model '{name}' in registry version {version or '(none published)'}")
+    with open(_version_dir(version) / entry["file"], "rb") as handle:
+        return pickle.load(handle), entry
+
+
+def load_models(version: Optional[str] = None) -> Dict[str, Tuple[object, Dict]]:
+    """Every model of a version as {name: (model, manifest entry)}; warns on library version drift."""
+    version = version or latest_version()
+    manifest = load_manifest(version)
+    if not manifest:
+        raise FileNotFoundError(f"No model registry version {version or '(none published)'} in {_state['dir']}")
+    current = _library_versions()
+    drift = {k: (v, current.get(k)) for k, v in manifest.get("libraries", {}).items() if current.get(k) != v}
+    if drift:
+        print(f"Warning: models of {version} were saved with different library versions: {drift}")
+    return {name: load_model(name, version) for name in manifest["models"]}
+
+
+def prune(keep: Optional[int] = None) -> List[str]:
+    """Delete all but the newest `keep` versions (keep_versions by default; LATEST is always kept)."""
+    keep = _state["keep_versions"] if keep is None else keep
+    if not keep:
+        return []
+    latest = latest_version()
+    removed = [v for v in list_versions()[:-keep] if v != latest]
+    for version in removed:
+        shutil.rmtree(_version_dir(version), ignore_errors=True)
+    return removed
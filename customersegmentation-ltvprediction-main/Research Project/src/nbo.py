@@ -1,16 +1,154 @@
 # src/nbo.py
+from __future__ import annotations
+
+import json
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
 import pandas as pd
 from src.dashboard_utils import RESULTS_DIR
+from src.results_store import write_artifact
+from src.nbo_allocation import allocate_offers
+
+# Scores are linear in the customer features below, scaled by a per-cluster affinity:
+#   score[i, j] = (base_j + sum_f weight_jf * feature_if) * affinity[cluster_i, j]
+FEATURES = ["clv", "recency", "churn"]
+
+DEFAULT_OFFER_CATALOG: List[Dict] = [
+    {"name": "Premium Bundle", "base": 0.0, "clv_weight": 1.0, "recency_weight": 0.6, "churn_weight": -0.3},
+    {"name": "Standard Plan", "base": 0.3, "clv_weight": 0.2, "recency_weight": 0.2, "churn_weight": 0.0},
+    {"name": "Loyalty Reward", "base": 0.1, "clv_weight": 0.5, "recency_weight": 0.5, "churn_weight": -0.1},
+    {"name": "Win-back Discount", "base": 0.0, "clv_weight": 0.3, "recency_weight": -0.3, "churn_weight": 0.9},
+]
+
+
+def customer_features(df: pd.DataFrame, clv_scale: Optional[float] = None) -> np.ndarray:
+    """
+    Normalised feature matrix (n x len(FEATURES)), float32:
+    CLV relative to `clv_scale` (default: the 95th percentile) clipped to [0, 1],
+    recency as 1 / (1 + days/30), and churn probability (0 when the model was off).
+    """
+    clv = pd.to_numeric(df["CLV"], errors="coerce").fillna(0).to_numpy(dtype=np.float64)
+    if clv_scale is None:
+        clv_scale = float(np.percentile(clv, 95)) if len(clv) else 1.0
+    recency = pd.to_numeric(df["recency"], errors="coerce").fillna(0).to_numpy(dtype=np.float64)
+    churn = (pd.to_numeric(df["churn_probability"], errors="coerce").fillna(0).to_numpy(dtype=np.float64)
+             if "churn_probability" in df.columns else np.zeros(len(df)))
+    features = np.empty((len(df), len(FEATURES)), dtype=np.float32)
+    features[:, 0] = np.clip(clv / (clv_scale or 1.0), 0, 1)
+    features[:, 1] = 1.0 / (1.0 + np.maximum(recency, 0) / 30.0)
+    features[:, 2] = churn
+    return features
+
+
+def compile_catalog(catalog: List[Dict], clusters: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Turn the offer catalog into arrays: weights (features x offers), base (offers),
+    an affinity table (cluster codes x offers) and the cluster value of each code.
+    """
+    weights = np.array([[offer.get(f"{f}_weight", 0.0) for offer in catalog] for f in FEATURES], dtype=np.float32)
+    base = np.array([offer.get("base", 0.0) for offer in catalog], dtype=np.float32)
+    cluster_values = np.unique(clusters)
+    affinity = np.ones((len(cluster_values), len(catalog)), dtype=np.float32)
+    for j, offer in enumerate(catalog):
+        for cluster, multiplier in (offer.get("cluster_affinity") or {}).items():
+            affinity[cluster_values == cluster, j] = multiplier
+    return weights, base, affinity, cluster_values
+
+
+def score_offers(features: np.ndarray, cluster_codes: np.ndarray, weights: np.ndarray,
+                 base: np.ndarray, affinity: np.ndarray) -> np.ndarray:
+    """Customers x offers score matrix from one matrix product and broadcasted affinities."""
+    return (features @ weights + base) * affinity[cluster_codes]
+
+
+def top_k_offers(scores: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Per-row top-k offer indices and scores, best first (argpartition, then sort k columns)."""
+    k = min(k, scores.shape[1])
+    if k < scores.shape[1]:
+        idx = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    else:
+        idx = np.broadcast_to(np.arange(k), scores.shape).copy()
+    top = np.take_along_axis(scores, idx, axis=1)
+    order = np.argsort(-top, axis=1, kind="stable")
+    return np.take_along_axis(idx, order, axis=1), np.take_along_axis(top, order, axis=1)
+
+
+def run_nbo_recommendations(df: pd.DataFrame, config: Optional[dict] = None):
+    """
+    Score every customer against every offer in the catalog (`nbo.offers` in
+    config.yaml, DEFAULT_OFFER_CATALOG otherwise) and keep the top-k offers each.
+
+    Customers are processed in chunks of `chunk_size` rows so the score matrix stays
+    bounded in memory. Writes nbo_recommendations (one row per customer, best
+    offer) and nbo_offer_ranking (customer_id, rank, offer, score) to the results store.
+
+    With `allocation.enabled`, the top-k offers become candidates for an assignment
+    under per-offer `capacity` and a total `allocation.budget` on offer `cost`; the
+    result is the `assigned_offer` column, with solve statistics in nbo_allocation.json.
+    """
+    config = config or {}
+    catalog = config.get("offers") or DEFAULT_OFFER_CATALOG
+    top_k = int(config.get("top_k", 3))
+    chunk_size = int(config.get("chunk_size", 250_000))
+    offer_names = np.array([offer["name"] for offer in catalog])
 
-def run_nbo_recommendations(df: pd.DataFrame):
     df = df.copy()
-    df["offer_score"] = df["CLV"] * (100 / (df["recency"] + 1))
-    df["recommended_product"] = df["offer_score"].apply(
-        lambda x: "Premium Bundle" if x > df["offer_score"].quantile(0.8) else "Standard Plan"
-    )
+    started = time.perf_counter()
+    clv = pd.to_numeric(df["CLV"], errors="coerce").fillna(0).to_numpy()
+    clv_scale = float(np.percentile(clv, 95)) if len(clv) else 1.0
+    clusters = df["cluster"].to_numpy() if "cluster" in df.columns else np.zeros(len(df), dtype=int)
+    weights, base, affinity, cluster_values = compile_catalog(catalog, clusters)
+    cluster_codes = np.searchsorted(cluster_values, clusters)
+
+    k = min(top_k, len(catalog))
+    best_idx = np.empty((len(df), k), dtype=np.int32)
+    best_score = np.empty((len(df), k), dtype=np.float32)
+    for start in range(0, len(df), chunk_size):
+        chunk = slice(start, start + chunk_size)
+        features = customer_features(df.iloc[chunk], clv_scale=clv_scale)
+        scores = score_offers(features, cluster_codes[chunk], weights, base, affinity)
+        best_idx[chunk], best_score[chunk] = top_k_offers(scores, k)
+    elapsed = time.perf_counter() - started
+    rows_per_sec = len(df) / elapsed if elapsed > 0 else float("inf")
+
+    df["offer_score"] = best_score[:, 0]
+    df["recommended_product"] = offer_names[best_idx[:, 0]]
+    ranking = pd.DataFrame({
+        "customer_id": np.repeat(df["customer_id"].to_numpy(), k),
+        "rank": np.tile(np.arange(1, k + 1), len(df)),
+        "offer": offer_names[best_idx.ravel()],
+        "score": best_score.ravel(),
+    })
+
+    allocation = config.get("allocation") or {}
+    allocation_stats = None
+    if allocation.get("enabled", False):
+        costs = np.array([offer.get("cost", 0.0) for offer in catalog], dtype=np.float64)
+        capacities = np.array([np.inf if offer.get("capacity") is None else offer["capacity"]
+                               for offer in catalog], dtype=np.float64)
+        assigned, allocation_stats = allocate_offers(
+            best_idx,
+            best_score,
+            costs,
+            capacities=capacities,
+            budget=allocation.get("budget"),
+            method=allocation.get("method", "greedy"),
+            time_limit=allocation.get("time_limit", 60.0),
+            dual_iterations=allocation.get("dual_iterations", 50),
+        )
+        df["assigned_offer"] = np.where(assigned >= 0, offer_names[np.maximum(assigned, 0)], None)
+        df["offer_cost"] = np.where(assigned >= 0, costs[np.maximum(assigned, 0)], 0.0)
+
     df = df.sort_values("offer_score", ascending=False)
 
-    path = RESULTS_DIR / "nbo_recommendations.csv"
-    RESULTS_DIR.mkdir(parents=True, exist_ok=True)
-    df.to_csv(path, index=False)
-    print(f"NBO saved: {path}")
\ No newline at end of file
+    path = write_artifact("nbo_recommendations", df)
+    write_artifact("nbo_offer_ranking", ranking)
+    print(f"NBO saved: {path} ({len(df):,} customers x {len(catalog)} offers, {rows_per_sec:,.0f} rows/sec)")
+    if allocation_stats is not None:
+        (RESULTS_DIR / "nbo_allocation.json").write_text(json.dumps(allocation_stats, indent=2))
+        print(f"NBO allocation ({allocation_stats['method']}): {allocation_stats['customers_assigned']:,} offers, "
+              f"spend {allocation_stats['spend']:,.0f}, objective {allocation_stats['objective']:,.2f}, "
+              f"gap {allocation_stats['optimality_gap']:.2%}, {allocation_stats['solve_seconds']:.2f}s")
+    return df
@@ -0,0 +1,300 @@
+# src/nbo_allocation.py
+from __future__ import annotations
+
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+import numpy as np
+
+# Above this many (customer, offer) candidate pairs the exact solver falls back to greedy
+EXACT_MAX_VARIABLES = 200_000
+
+
+def _flatten_candidates(cand_offer: np.ndarray, cand_score: np.ndarray):
+    """(customer, offer, score) triples for every candidate pair with a positive score."""
+    customer = np.repeat(np.arange(cand_offer.shape[0]), cand_offer.shape[1])
+    offer, score = cand_offer.ravel(), cand_score.ravel().astype(np.float64)
+    keep = score > 0
+    return customer[keep], offer[keep], score[keep]
+
+
+def _rank_within_offer(offer: np.ndarray, score: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Order pairs by (offer, descending score) and return that order with each pair's
+    rank in its offer. The offer pass is a stable sort on a 16-bit key (radix sort).
+    """
+    by_score = np.argsort(-score, kind="stable")
+    order = by_score[np.argsort(offer[by_score].astype(np.int16), kind="stable")]
+    sorted_offer = offer[order]
+    group_start = np.r_[0, np.flatnonzero(np.diff(sorted_offer)) + 1]
+    run_length = np.diff(np.r_[group_start, len(order)])
+    rank = np.arange(len(order)) - np.repeat(group_start, run_length)
+    return order, rank
+
+
+def _row_best(values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Row-wise (max, argmax) for a tall, narrow matrix, one column at a time."""
+    best = values[:, 0].copy()
+    arg = np.zeros(len(values), dtype=np.int64)
+    for j in range(1, values.shape[1]):
+        better = values[:, j] > best
+        best[better] = values[better, j]
+        arg[better] = j
+    return best, arg
+
+
+def lagrangian_prices(cand_offer: np.ndarray, cand_score: np.ndarray, costs: np.ndarray,
+                      capacities: np.ndarray, budget: float, lower_bound: float = 0.0,
+                      iterations: int = 50, repair: Optional[Callable] = None,
+                      repair_every: int = 10) -> Tuple[float, np.ndarray, float]:
+    """
+    Relax the capacity and budget constraints with prices: a budget price `lam` and
+    a price `mu_j` per capacitated offer. For any prices
+
+        L = lam * budget + sum_j mu_j * cap_j + sum_i max(0, max_j score_ij - lam * cost_j - mu_j)
+
+    is an upper bound on the best allocation. Prices are tuned by projected
+    subgradient steps with a Polyak step towards `lower_bound`, halving the step
+    after three iterations without improvement. Every `repair_every` iterations
+    `repair(lam, mu)` may return a feasible objective that raises the lower bound.
+    Returns (lam, mu, lowest bound found).
+    """
+    m = len(costs)
+    has_budget = np.isfinite(budget)
+    capped = np.isfinite(capacities)
+    caps = np.where(capped, capacities, 0.0)
+    # Budget in units of the mean offer cost keeps both subgradients on a similar scale
+    scale = float(np.mean(costs)) or 1.0
+    budget_units = budget / scale if has_budget else 0.0
+    # (k, n) layout: per-customer maxima become contiguous reductions over k rows
+    offer_t = np.ascontiguousarray(cand_offer.T)
+    score_t = np.ascontiguousarray(cand_score.T)
+    cost_t = costs[offer_t] / scale
+    n_cols = np.arange(offer_t.shape[1])
+    lam, mu = 0.0, np.zeros(m)
+    best_lam, best_mu, best_bound = 0.0, mu.copy(), np.inf
+    theta, stalled = 2.0, 0
+
+    for it in range(iterations):
+        reduced = score_t - lam * cost_t
+        reduced -= mu[offer_t]
+        slot = reduced.argmax(axis=0)
+        value = reduced[slot, n_cols]
+        take = value > 0
+        bound = lam * budget_units + float(mu @ caps) + float(value[take].sum())
+        if bound < best_bound - 1e-9:
+            best_lam, best_mu, best_bound, stalled = lam, mu.copy(), bound, 0
+        else:
+            stalled += 1
+            if stalled >= 3:
+                theta, stalled = theta / 2, 0
+        if repair is not None and it % repair_every == repair_every - 1:
+            lower_bound = max(lower_bound, repair(best_lam / scale, best_mu))
+
+        chosen = offer_t[slot[take], n_cols[take]]
+        g_mu = np.where(capped, caps - np.bincount(chosen, minlength=m), 0.0)
+        g_lam = budget_units - float(costs[chosen].sum()) / scale if has_budget else 0.0
+        norm = g_lam ** 2 + float(g_mu @ g_mu)
+        if norm == 0:
+            break
+        step = theta * max(bound - lower_bound, 1e-9) / norm
+        lam = max(0.0, lam - step * g_lam)
+        mu = np.maximum(0.0, mu - step * g_mu)
+    return best_lam / scale, best_mu, best_bound
+
+
+def allocation_upper_bound(cand_offer: np.ndarray, cand_score: np.ndarray, capacities: np.ndarray) -> float:
+    """
+    Combinatorial upper bound: the smaller of (every customer gets its best offer)
+    and (every offer fills its capacity with its best candidates).
+    """
+    customer_bound = float(np.clip(_row_best(cand_score)[0], 0, None).sum())
+    _, offer, score = _flatten_candidates(cand_offer, cand_score)
+    order, rank = _rank_within_offer(offer, score)
+    offer_bound = float(score[order][rank < capacities[offer[order]]].sum())
+    return min(customer_bound, offer_bound)
+
+
+def _greedy_rounds(cand_offer: np.ndarray, priority: np.ndarray, costs: np.ndarray,
+                   remaining: np.ndarray, budget_left: float, assigned: np.ndarray) -> float:
+    """
+    One pass of the round-based priority heuristic; updates `assigned` and
+    `remaining` in place and returns the budget left. Candidates must be ordered by
+    descending priority per customer; only positive priorities are considered.
+    """
+    n, k = cand_offer.shape
+    pointer = np.zeros(n, dtype=np.int64)
+    active = np.flatnonzero(assigned < 0)
+
+    for _ in range(k):
+        active = active[pointer[active] < k]
+        if not len(active):
+            break
+        offer = cand_offer[active, pointer[active]]
+        score = priority[active, pointer[active]]
+        pointer[active] += 1
+        # Candidates are ordered best first, so a non-positive priority ends that customer's list
+        positive = score > 0
+        active, offer, score = active[positive], offer[positive], score[positive]
+        open_offer = remaining[offer] > 0
+        cust, offer, score = active[open_offer], offer[open_offer], score[open_offer]
+        if not len(cust):
+            continue
+
+        order, rank = _rank_within_offer(offer, score)
+        within_cap = order[rank < remaining[offer[order]]]
+        within_cap = within_cap[np.argsort(-score[within_cap], kind="stable")]
+        spend = np.cumsum(costs[offer[within_cap]])
+        accepted = within_cap[spend <= budget_left]
+
+        assigned[cust[accepted]] = offer[accepted]
+        remaining -= np.bincount(offer[accepted], minlength=len(remaining))
+        budget_left -= float(costs[offer[accepted]].sum())
+        active = active[assigned[active] < 0]
+    return budget_left
+
+
+def greedy_allocate(cand_offer: np.ndarray, cand_score: np.ndarray, costs: np.ndarray,
+                    capacities: np.ndarray, budget: float = np.inf,
+                    lam: float = 0.0, mu: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Priority heuristic, vectorised in rounds. In each round every unassigned customer
+    proposes its best remaining candidate; each offer accepts its highest-priority
+    proposals up to remaining capacity, then accepted proposals are admitted in
+    descending priority while the budget lasts. Rejected customers move on to their
+    next candidate, so a pass takes at most k rounds for k candidates each.
+
+    The first pass ranks by the priced score  score - lam * cost - mu_offer  (prices
+    from `lagrangian_prices`), so scarce offers and budget go to the customers who
+    gain most from them; a second pass on raw scores fills what is left.
+    Returns the assigned offer per customer (-1 = none).
+    """
+    assigned = np.full(cand_offer.shape[0], -1, dtype=np.int64)
+    remaining = capacities.astype(np.float64).copy()
+    budget_left = float(budget)
+
+    if lam > 0 or (mu is not None and mu.any()):
+        priced = cand_score - lam * costs[cand_offer] - (mu[cand_offer] if mu is not None else 0.0)
+        order = np.argsort(-priced, axis=1, kind="stable")
+        budget_left = _greedy_rounds(np.take_along_axis(cand_offer, order, axis=1),
+                                     np.take_along_axis(priced, order, axis=1),
+                                     costs, remaining, budget_left, assigned)
+    _greedy_rounds(cand_offer, cand_score, costs, remaining, budget_left, assigned)
+    return assigned
+
+
+def exact_allocate(cand_offer: np.ndarray, cand_score: np.ndarray, costs: np.ndarray,
+                   capacities: np.ndarray, budget: float = np.inf,
+                   time_limit: float = 60.0) -> Tuple[np.ndarray, float]:
+    """
+    Solve the assignment as a mixed-integer program (scipy HiGHS): maximise total
+    score with at most one offer per customer, per-offer capacity and a total budget.
+    Stops at `time_limit` seconds with the best solution found.
+    Returns (assigned offer per customer, solver upper bound).
+    """
+    from scipy.optimize import Bounds, LinearConstraint, milp
+    from scipy.sparse import coo_matrix, vstack
+
+    n = cand_offer.shape[0]
+    m = len(costs)
+    customer, offer, score = _flatten_candidates(cand_offer, cand_score)
+    v = len(score)
+    cols = np.arange(v)
+    rows = [coo_matrix((np.ones(v), (customer, cols)), shape=(n, v))]
+    upper = [np.ones(n)]
+    finite_cap = np.flatnonzero(np.isfinite(capacities))
+    if len(finite_cap):
+        cap_row = np.full(m, -1)
+        cap_row[finite_cap] = np.arange(len(finite_cap))
+        mask = cap_row[offer] >= 0
+        rows.append(coo_matrix((np.ones(mask.sum()), (cap_row[offer][mask], cols[mask])), shape=(len(finite_cap), v)))
+        upper.append(capacities[finite_cap])
+    if np.isfinite(budget):
+        rows.append(coo_matrix(costs[offer].reshape(1, -1)))
+        upper.append(np.array([budget]))
+
+    result = milp(
+        c=-score,
+        constraints=LinearConstraint(vstack(rows).tocsr(), -np.inf, np.concatenate(upper)),
+        integrality=np.ones(v),
+        bounds=Bounds(0, 1),
+        options={"time_limit": time_limit, "disp": False},
+    )
+    assigned = np.full(n, -1, dtype=np.int64)
+    if result.x is None:
+        return assigned, float("nan")
+    chosen = result.x > 0.5
+    assigned[customer[chosen]] = offer[chosen]
+    bound = getattr(result, "mip_dual_bound", None)
+    return assigned, -float(bound) if bound is not None else float(-result.fun)
+
+
+def allocate_offers(cand_offer: np.ndarray, cand_score: np.ndarray, costs: np.ndarray,
+                    capacities: Optional[np.ndarray] = None, budget: Optional[float] = None,
+                    method: str = "greedy", exact_max_variables: int = EXACT_MAX_VARIABLES,
+                    time_limit: float = 60.0, dual_iterations: int = 50) -> Tuple[np.ndarray, Dict]:
+    """
+    Assign at most one offer per customer from its candidate offers (`cand_offer`,
+    `cand_score`: customers x k, best first) under per-offer `capacities` (inf = no
+    cap) and a total `budget` on offer costs.
+
+    `method` is "greedy" (any scale) or "exact" (MILP; falls back to greedy above
+    `exact_max_variables` candidate pairs, stops at `time_limit` seconds). Returns
+    the assigned offer index per customer (-1 = none) and solve statistics; the
+    optimality gap is measured against the tighter of the combinatorial and
+    Lagrangian bounds (greedy) or the solver's dual bound (exact).
+    """
+    costs = np.asarray(costs, dtype=np.float64)
+    capacities = (np.full(len(costs), np.inf) if capacities is None
+                  else np.asarray(capacities, dtype=np.float64))
+    budget = np.inf if budget is None else float(budget)
+    cand_score = np.asarray(cand_score, dtype=np.float64)
+
+    if method == "exact" and (cand_score > 0).sum() > exact_max_variables:
+        print(f"Exact allocation limited to {exact_max_variables:,} candidate pairs; using greedy.")
+        method = "greedy"
+
+    def objective_of(assigned):
+        hit = assigned >= 0
+        slot = np.argmax(cand_offer[hit] == assigned[hit, None], axis=1)
+        return float(cand_score[hit, slot].sum())
+
+    started = time.perf_counter()
+    if method == "exact":
+        assigned, upper_bound = exact_allocate(cand_offer, cand_score, costs, capacities, budget, time_limit)
+    else:
+        assigned = greedy_allocate(cand_offer, cand_score, costs, capacities, budget)
+        upper_bound = allocation_upper_bound(cand_offer, cand_score, capacities)
+        constrained = np.isfinite(budget) or np.isfinite(capacities).any()
+        if constrained and dual_iterations > 0:
+            incumbent = {"assigned": assigned, "objective": objective_of(assigned)}
+
+            def repair(lam, mu):
+                # Greedy on the current prices; keep it if it beats the incumbent
+                priced = greedy_allocate(cand_offer, cand_score, costs, capacities, budget, lam=lam, mu=mu)
+                value = objective_of(priced)
+                if value > incumbent["objective"]:
+                    incumbent.update(assigned=priced, objective=value)
+                return incumbent["objective"]
+
+            lam, mu, dual_bound = lagrangian_prices(cand_offer, cand_score, costs, capacities, budget,
+                                                    lower_bound=incumbent["objective"],
+                                                    iterations=dual_iterations, repair=repair)
+            repair(lam, mu)
+            upper_bound = min(upper_bound, dual_bound)
+            assigned = incumbent["assigned"]
+    solve_seconds = time.perf_counter() - started
+
+    objective = objective_of(assigned)
+    gap = (upper_bound - objective) / upper_bound if upper_bound > 0 else 0.0
+    hit = assigned >= 0
+    stats = {
+        "method": method,
+        "objective": objective,
+        "upper_bound": upper_bound,
+        "optimality_gap": max(gap, 0.0),
+        "solve_seconds": solve_seconds,
+        "customers_assigned": int(hit.sum()),
+        "spend": float(costs[assigned[hit]].sum()),
+    }
+    return assigned, stats
@@ -0,0 +1,281 @@
+# src/pipeline_dag.py
+from __future__ import annotations
+
+import inspect
+import logging
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from src import instrumentation, results_store, stage_cache
+from src.instrumentation import profile_stage, row_count
+
+logger = logging.getLogger(__name__)
+
+# Stages naming the same resource never overlap (e.g. "matplotlib": pyplot keeps
+# global figure state and is not thread-safe)
+_resource_locks: Dict[str, threading.Lock] = {}
+_resource_guard = threading.Lock()
+
+
+def stage(name: str, func: Callable, inputs: Sequence[str] = (), outputs: Sequence[str] = (),
+          optional: Sequence[str] = (), isolated: bool = False, resources: Sequence[str] = (),
+          cache: Optional[Dict] = None) -> Dict:
+    """
+    Declare a pipeline stage. `func` is called with the stage's `inputs` and `optional`
+    inputs as keyword arguments and returns its `outputs` (a single value for one
+    output, a tuple in declaration order for several).
+
+    Required inputs must have been produced; optional ones are passed as None when
+    their producer is absent, failed or skipped. An `isolated` stage that raises is
+    logged and the run continues without its outputs (stages needing them are
+    skipped); any other failing stage aborts the run once the running stages finish.
+
+    `cache` makes a deterministic stage memoizable (see src.stage_cache) while the
+    cache is enabled: {"config": the config subsection it reads, "code": functions it
+    calls or names of modules (their whole module is versioned; a name is versioned
+    without importing the module), "sources": input files it reads,
+    "files": files it writes}. Results-store
+    artifacts written by the stage are cached (copied into the new run) automatically.
+    """
+    return {"name": name, "func": func, "inputs": tuple(inputs), "outputs": tuple(outputs),
+            "optional": tuple(optional), "isolated": isolated, "resources": tuple(resources),
+            "cache": cache}
+
+
+def _producers(stages: List[Dict]) -> Dict[str, str]:
+    producers: Dict[str, str] = {}
+    for s in stages:
+        for output in s["outputs"]:
+            if output in producers:
+                raise ValueError(f"Output '{output}' produced by both '{producers[output]}' and '{s['name']}'")
+            producers[output] = s["name"]
+    return producers
+
+
+def dependencies(stages: List[Dict], context: Iterable[str] = ()) -> Dict[str, List[str]]:
+    """
+    Upstream stages of every stage. Raises ValueError for a required input nobody
+    produces (and not in `context`) or a dependency cycle.
+    """
+    producers = _producers(stages)
+    available = set(context)
+    deps = {}
+    for s in stages:
+        missing = [i for i in s["inputs"] if i not in producers and i not in available]
+        if missing:
+            raise ValueError(f"Stage '{s['name']}' needs inputs nobody produces: {missing}")
+        deps[s["name"]] = sorted({producers[i] for i in s["inputs"] + s["optional"] if i in producers})
+
+    state: Dict[str, int] = {}  # 1 = visiting, 2 = done
+
+    def visit(name: str, path: List[str]) -> None:
+        if state.get(name) == 2:
+            return
+        if state.get(name) == 1:
+            raise ValueError("Dependency cycle: " + " -> ".join(path + [name]))
+        state[name] = 1
+        for dep in deps[name]:
+            visit(dep, path + [name])
+        state[name] = 2
+
+    for name in deps:
+        visit(name, [])
+    return deps
+
+
+def critical_path(deps: Dict[str, List[str]], durations: Dict[str, float]) -> Tuple[List[str], float]:
+    """Longest chain of dependent stages by duration: the lower bound on the run's wall time."""
+    finish: Dict[str, float] = {}
+    previous: Dict[str, Optional[str]] = {}
+
+    def longest(name: str) -> float:
+        if name not in finish:
+            upstream = [(longest(d), d) for d in deps.get(name, []) if d in durations]
+            best = max(upstream, default=(0.0, None))
+            finish[name] = best[0] + durations[name]
+            previous[name] = best[1]
+        return finish[name]
+
+    if not durations:
+        return [], 0.0
+    end = max(durations, key=longest)
+    path = [end]
+    while previous[path[-1]] is not None:
+        path.append(previous[path[-1]])
+    return path[::-1], finish[end]
+
+
+def _lock_for(resource: str) -> threading.Lock:
+    with _resource_guard:
+        return _resource_locks.setdefault(resource, threading.Lock())
+
+
+def _call(s: Dict, kwargs: Dict) -> Dict:
+    result = s["func"](**kwargs)
+    return dict(zip(s["outputs"], result if len(s["outputs"]) > 1 else (result,)))
+
+
+def _call_cached(s: Dict, kwargs: Dict, run_id: Optional[str], value_hash: Callable, record: Dict) -> Dict:
+    """
+    Run a cacheable stage, or reuse the outputs of an earlier run with the same key.
+    Output hashes are recorded so downstream keys chain from this stage's results.
+    """
+    spec = s["cache"]
+    input_hashes = {name: value_hash(name, value) for name, value in kwargs.items()}
+    input_hashes.update({str(path): stage_cache.hash_file(path) for path in spec.get("sources", [])})
+    settings = {"config": spec.get("config"), "files": [str(f) for f in spec.get("files", [])]}
+    code = [s["func"], *(inspect.getmodule(c) or c for c in spec.get("code", []))]
+    key = stage_cache.stage_key(s["name"], input_hashes, settings, code)
+    record["cache_key"] = key[:12]
+
+    entry = stage_cache.lookup(key)
+    if entry is not None and (not entry["artifacts"]
+                              or results_store.copy_artifacts(entry["artifacts"], entry["run_id"], run_id)):
+        stage_cache.restore_files(entry)
+        if entry["artifacts"]:
+            stage_cache.record_use(entry, run_id)
+        value_hash.update(entry["output_hashes"])
+        record["status"] = "cached"
+        return entry["outputs"]
+
+    with results_store.capture_artifacts() as written:
+        outputs = _call(s, kwargs)
+    output_hashes = {name: stage_cache.hash_value(value) for name, value in outputs.items()}
+    value_hash.update(output_hashes)
+    if stage_cache.store(key, s["name"], outputs, output_hashes, artifacts=sorted(set(written)),
+                         run_id=run_id, files=spec.get("files")) is None:
+        logger.warning(f"Stage '{s['name']}' outputs cannot be pickled; not cached.")
+    return outputs
+
+
+def _value_hasher() -> Callable:
+    """hash(name, value), memoized per output name for the run; .update() seeds known hashes."""
+    hashes: Dict[str, str] = {}
+    lock = threading.Lock()
+
+    def value_hash(name: str, value) -> str:
+        with lock:
+            if name in hashes:
+                return hashes[name]
+        digest = stage_cache.hash_value(value)
+        with lock:
+            return hashes.setdefault(name, digest)
+
+    def update(known: Dict[str, str]) -> None:
+        with lock:
+            hashes.update(known)
+
+    value_hash.update = update
+    return value_hash
+
+
+def _execute(s: Dict, kwargs: Dict, run_id: Optional[str], value_hash: Callable,
+             notify: Callable[[Dict], None]) -> Tuple[Dict, Dict]:
+    locks = [_lock_for(r) for r in sorted(s["resources"])]  # fixed order, no deadlock
+    for lock in locks:
+        lock.acquire()
+    try:
+        notify({"event": "stage_started", "stage": s["name"]})
+        rows_in = next((kwargs[i] for i in s["inputs"] if row_count(kwargs[i]) is not None), None)
+        with profile_stage(s["name"], rows_in=rows_in, run_id=run_id) as record:
+            if s["cache"] is not None and stage_cache.enabled():
+                outputs = _call_cached(s, kwargs, run_id, value_hash, record)
+            else:
+                outputs = _call(s, kwargs)
+            if s["outputs"]:
+                record["rows_out"] = row_count(outputs[s["outputs"][0]])
+        return outputs, record
+    finally:
+        for lock in reversed(locks):
+            lock.release()
+
+
+def run_dag(stages: List[Dict], context: Optional[Dict] = None, max_workers: int = 4,
+            run_id: Optional[str] = None, on_event: Optional[Callable[[Dict], None]] = None) -> Dict:
+    """
+    Run the stages on a thread pool, each as soon as all its upstream stages have
+    finished, profiling every stage with src.instrumentation.
+
+    Returns {"outputs", "status" (stage -> ok/cached/failed/skipped), "errors",
+    "critical_path", "critical_path_seconds", "wall_seconds"}. Process-wide
+    measurements (tracemalloc peak, cProfile) cannot be attributed to one of several
+    overlapping stages, so the stages run one at a time while they are enabled.
+
+    `on_event` receives progress events (run_started, stage_started, stage_finished,
+    stage_skipped, run_finished) as dicts, from the scheduler and worker threads.
+    """
+    deps = dependencies(stages, context or {})
+    by_name = {s["name"]: s for s in stages}
+    context = dict(context or {})
+    if instrumentation.requires_serial():
+        max_workers = 1
+    status: Dict[str, str] = {}
+    errors: Dict[str, str] = {}
+    abort: Optional[BaseException] = None
+    pending = [s["name"] for s in stages]  # declaration order breaks ties
+    running: Dict = {}
+    value_hash = _value_hasher()
+    notify = on_event or (lambda event: None)
+    started = time.perf_counter()
+    notify({"event": "run_started", "run_id": run_id, "stages": list(pending)})
+
+    with ThreadPoolExecutor(max_workers=max(1, int(max_workers)), thread_name_prefix="stage") as pool:
+        while pending or running:
+            progressed = False
+            for name in list(pending):
+                if any(d not in status for d in deps[name]):
+                    continue
+                pending.remove(name)
+                progressed = True
+                s = by_name[name]
+                missing = [i for i in s["inputs"] if i not in context]
+                if missing:
+                    status[name] = "skipped"
+                    logger.warning(f"Stage '{name}' skipped: missing {', '.join(missing)}.")
+                    notify({"event": "stage_skipped", "stage": name, "missing": missing})
+                    continue
+                kwargs = {i: context.get(i) for i in s["inputs"] + s["optional"]}
+                running[pool.submit(_execute, s, kwargs, run_id, value_hash, notify)] = name
+            if not running:
+                if not progressed:  # unreachable after validation; guards against a hang
+                    raise RuntimeError(f"Stages cannot be scheduled: {pending}")
+                continue
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                try:
+                    outputs, record = future.result()
+                    status[name] = record["status"]
+                    context.update(outputs)
+                    notify({"event": "stage_finished", "stage": name, "status": status[name],
+                            "wall_seconds": record["wall_seconds"]})
+                except Exception as e:
+                    status[name] = "failed"
+                    errors[name] = f"{type(e).__name__}: {e}"
+                    logger.error(f"Stage '{name}' failed: {e}")
+                    notify({"event": "stage_finished", "stage": name, "status": "failed", "error": errors[name]})
+                    if not by_name[name]["isolated"] and abort is None:
+                        abort = e
+            if abort is not None:
+                for name in pending:
+                    status[name] = "skipped"
+                    notify({"event": "stage_skipped", "stage": name, "missing": []})
+                pending.clear()  # running stages finish; nothing new starts
+
+    notify({"event": "run_finished", "run_id": run_id, "status": status})
+    if abort is not None:
+        raise abort
+
+    durations = {r["stage"]: r["wall_seconds"] for r in instrumentation.stage_records() if r["stage"] in status}
+    path, path_seconds = critical_path(deps, durations)
+    return {
+        "outputs": context,
+        "status": status,
+        "errors": errors,
+        "critical_path": path,
+        "critical_path_seconds": path_seconds,
+        "wall_seconds": time.perf_counter() - started,
+    }
@@ -0,0 +1,183 @@
+# src/results_store.py
+from __future__ import annotations
+
+import os
+import shutil
+import threading
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+from src.dashboard_utils import RESULTS_DIR
+
+# Layout: store/artifact=<name>/run_id=<run id>/part-0.parquet (hive-style partitions),
+# plus store/LATEST holding the id of the last completed run.
+STORE_DIR = RESULTS_DIR / "store"
+LATEST_FILE = "LATEST"
+PART_FILE = "part-0.parquet"
+COMPRESSION = "zstd"
+
+_state: Dict = {"run_id": None, "csv_mirror": False}
+_captured = threading.local()
+
+
+def configure(config: Optional[dict] = None) -> None:
+    """Apply the `results` config section (csv_mirror: also write output/results/<name>.csv)."""
+    config = config or {}
+    _state["csv_mirror"] = bool(config.get("csv_mirror", False))
+
+
+def new_run_id() -> str:
+    """Sortable run id: UTC timestamp plus a short random suffix."""
+    return f"{datetime.now(timezone.utc):%Y%m%dT%H%M%S%fZ}-{uuid.uuid4().hex[:6]}"
+
+
+def start_run(run_id: Optional[str] = None) -> str:
+    """Open a run; every write_artifact call goes to it until the next start_run."""
+    _state["run_id"] = run_id or new_run_id()
+    return _state["run_id"]
+
+
+def current_run_id() -> str:
+    return _state["run_id"] or start_run()
+
+
+def _partition(name: str, run_id: str) -> Path:
+    return STORE_DIR / f"artifact={name}" / f"run_id={run_id}"
+
+
+def write_artifact(name: str, df: pd.DataFrame, run_id: Optional[str] = None) -> Path:
+    """
+    Write one result table for the current run as compressed Parquet. The file is
+    written next to its final name and renamed, so readers never see a partial file.
+    """
+    partition = _partition(name, run_id or current_run_id())
+    partition.mkdir(parents=True, exist_ok=True)
+    path = partition / PART_FILE
+    tmp_path = partition / f".{PART_FILE}.{os.getpid()}.tmp"
+    df.to_parquet(tmp_path, index=False, compression=COMPRESSION)
+    os.replace(tmp_path, path)
+    for names in getattr(_captured, "stack", []):
+        names.append(name)
+    if _state["csv_mirror"]:
+        RESULTS_DIR.mkdir(parents=True, exist_ok=True)
+        df.to_csv(RESULTS_DIR / f"{name}.csv", index=False)
+    return path
+
+
+@contextmanager
+def capture_artifacts():
+    """Collect the names of the artifacts written by the current thread inside the block."""
+    names: List[str] = []
+    _captured.stack = getattr(_captured, "stack", []) + [names]
+    try:
+        yield names
+    finally:
+        _captured.stack = [n for n in _captured.stack if n is not names]
+
+
+def copy_artifacts(names: List[str], from_run: str, run_id: Optional[str] = None) -> bool:
+    """
+    Copy artifacts of an earlier run into the current run (hard links where the file
+    system allows). Returns False, copying nothing, if any of them no longer exists.
+    """
+    run_id = run_id or current_run_id()
+    sources = [_partition(name, from_run) / PART_FILE for name in names]
+    if not all(path.exists() for path in sources):
+        return False
+    for name, source in zip(names, sources):
+        partition = _partition(name, run_id)
+        partition.mkdir(parents=True, exist_ok=True)
+        tmp_path = partition / f".{PART_FILE}.{os.getpid()}.tmp"
+        try:
+            os.link(source, tmp_path)
+        except OSError:
+            shutil.copyfile(source, tmp_path)
+        os.replace(tmp_path, partition / PART_FILE)
+        if _state["csv_mirror"]:
+            pd.read_parquet(partition / PART_FILE).to_csv(RESULTS_DIR / f"{name}.csv", index=False)
+    return True
+
+
+def publish_run(run_id: Optional[str] = None) -> str:
+    """Point LATEST at the run (atomically), making its artifacts the default for readers."""
+    run_id = run_id or current_run_id()
+    STORE_DIR.mkdir(parents=True, exist_ok=True)
+    tmp_path = STORE_DIR / f".{LATEST_FILE}.{os.getpid()}.tmp"
+    tmp_path.write_text(run_id)
+    os.replace(tmp_path, STORE_DIR / LATEST_FILE)
+    return run_id
+
+
+def latest_run_id() -> Optional[str]:
+    path = STORE_DIR / LATEST_FILE
+    return path.read_text().strip() if path.exists() else None
+
+
+def list_runs(name: Optional[str] = None) -> List[str]:
+    """Run ids (oldest first) that wrote `name`, or that wrote any artifact."""
+    artifacts = [STORE_DIR / f"artifact={name}"] if name else STORE_DIR.glob("artifact=*")
+    runs = {p.name.split("=", 1)[1] for a in artifacts if a.is_dir()
+            for p in a.glob("run_id=*") if (p / PART_FILE).exists()}
+    return sorted(runs)
+
+
+def resolve_run(name: str, run_id: Optional[str] = None) -> Optional[str]:
+    """
+    The run to read `name` from: `run_id` if given, else the LATEST run, else (when
+    LATEST did not produce it) the newest published run that did. Runs newer than
+    LATEST are still in progress and are skipped.
+    """
+    if run_id:
+        return run_id if (_partition(name, run_id) / PART_FILE).exists() else None
+    runs = list_runs(name)
+    latest = latest_run_id()
+    if latest:
+        runs = [r for r in runs if r <= latest]
+    return runs[-1] if runs else None
+
+
+def artifact_path(name: str, run_id: Optional[str] = None) -> Optional[Path]:
+    """Parquet file read_artifact would read for `name`, or None."""
+    run = resolve_run(name, run_id)
+    return _partition(name, run) / PART_FILE if run else None
+
+
+def read_artifact(name: str, columns: Optional[List[str]] = None, filters=None,
+                  run_id: Optional[str] = None) -> pd.DataFrame:
+    """
+    Read one artifact of one run. `columns` projects (only those columns are decoded);
+    `filters` are pyarrow predicates pushed down to the row groups, e.g.
+    [("cluster", "==", 2)] or [("CLV", ">", 1000), ("cluster", "in", [0, 1])].
+    Returns an empty frame when no run has the artifact.
+    """
+    path = artifact_path(name, run_id)
+    if path is None:
+        return pd.DataFrame()
+    return pd.read_parquet(path, columns=columns, filters=filters)
+
+
+def read_artifact_history(name: str, columns: Optional[List[str]] = None, filters=None,
+                          runs: Optional[List[str]] = None) -> pd.DataFrame:
+    """The artifact across runs (all by default), with a run_id column."""
+    frames = []
+    for run in runs or list_runs(name):
+        frame = read_artifact(name, columns=columns, filters=filters, run_id=run)
+        if not frame.empty:
+            frames.append(frame.assign(run_id=run))
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+
+def prune_runs(keep: int) -> List[str]:
+    """Delete all but the newest `keep` runs (LATEST is always kept). Returns removed ids."""
+    runs = list_runs()
+    latest = latest_run_id()
+    removed = [r for r in runs[:-keep] if r != latest] if keep > 0 else []
+    for run in removed:
+        for partition in STORE_DIR.glob(f"artifact=*/run_id={run}"):
+            shutil.rmtree(partition, ignore_errors=True)
+    return removed
@@ -0,0 +1,168 @@
+# src/run_history.py
+from __future__ import annotations
+
+import json
+import sqlite3
+from contextlib import closing
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+RUN_HISTORY_DB = Path("output/pipeline_runs.db")
+# Stage measurements (see src.instrumentation) indexed as stage:<stage>:<measure>
+STAGE_METRICS = ("wall_seconds", "cpu_seconds", "child_cpu_seconds", "peak_rss_mb", "tracemalloc_peak_mb",
+                 "rows_in", "rows_out")
+
+# One row per run (the full entry as JSON) plus one row per numeric metric, so the
+# timeline and metric queries are index range scans instead of a file rewrite per run.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id            INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_timestamp TEXT NOT NULL,
+    run_id        TEXT,
+    entry         TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_runs_timestamp ON runs (run_timestamp);
+CREATE TABLE IF NOT EXISTS run_metrics (
+    run     INTEGER NOT NULL REFERENCES runs (id),
+    name    TEXT NOT NULL,
+    value   REAL,
+    PRIMARY KEY (run, name)
+);
+CREATE INDEX IF NOT EXISTS idx_metrics_name_value ON run_metrics (name, value);
+CREATE TABLE IF NOT EXISTS history_meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+def connect(path: Optional[Path] = None) -> sqlite3.Connection:
+    """
+    Open the history database in WAL mode (readers never block the writer) with a
+    busy timeout, so several pipelines can append at once. The schema is created and
+    the legacy JSON history next to it (pipeline_runs.json) is imported on first use.
+    """
+    path = Path(path or RUN_HISTORY_DB)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(path, timeout=30.0, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(SCHEMA)
+    migrate_json(conn, path.with_suffix(".json"))
+    return conn
+
+
+def _insert(conn: sqlite3.Connection, entry: Dict) -> int:
+    timestamp = entry.get("run_timestamp") or datetime.utcnow().isoformat()
+    cursor = conn.execute(
+        "INSERT INTO runs (run_timestamp, run_id, entry) VALUES (?, ?, ?)",
+        (timestamp, entry.get("run_id"), json.dumps({**entry, "run_timestamp": timestamp}, ensure_ascii=False)),
+    )
+    run = cursor.lastrowid
+    conn.executemany(
+        "INSERT OR REPLACE INTO run_metrics (run, name, value) VALUES (?, ?, ?)",
+        [(run, key, float(value)) for key, value in _numeric_metrics(entry)],
+    )
+    return run
+
+
+def _numeric_metrics(entry: Dict) -> List[Tuple[str, float]]:
+    """Top-level numeric values, plus stage:<stage>:<measure> for each stage record."""
+    def numeric(value) -> bool:
+        return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+    metrics = [(key, value) for key, value in entry.items() if numeric(value)]
+    for stage in entry.get("stages") or []:
+        metrics += [(f"stage:{stage['stage']}:{key}", value) for key, value in stage.items()
+                    if key in STAGE_METRICS and numeric(value)]
+    return metrics
+
+
+def migrate_json(conn: sqlite3.Connection, json_path: Path) -> int:
+    """
+    Import the entries of a legacy JSON history file once (recorded in history_meta).
+    The JSON file is left in place. Returns the number of imported runs.
+    """
+    json_path = Path(json_path)
+    migrated = "SELECT 1 FROM history_meta WHERE key = 'migrated_json'"
+    if not json_path.exists() or conn.execute(migrated).fetchone():
+        return 0
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        if conn.execute(migrated).fetchone():  # another writer got here first
+            conn.execute("COMMIT")
+            return 0
+        try:
+            entries = json.loads(json_path.read_text())
+        except json.JSONDecodeError:
+            entries = []
+        for entry in entries:
+            _insert(conn, entry)
+        conn.execute("INSERT INTO history_meta (key, value) VALUES ('migrated_json', ?)", (str(json_path),))
+        conn.execute("COMMIT")
+        return len(entries)
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+
+def append_run(entry: Dict, path: Optional[Path] = None) -> int:
+    """
+    Append one run entry in a single transaction; a crash leaves either the whole
+    entry or nothing. BEGIN IMMEDIATE takes the write lock up front, and concurrent
+    writers wait for it (busy timeout) instead of failing. Returns the row id.
+    """
+    with closing(connect(path)) as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            run = _insert(conn, entry)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+    return run
+
+
+def query_runs(start: Optional[str] = None, end: Optional[str] = None, limit: Optional[int] = None,
+               path: Optional[Path] = None) -> List[Dict]:
+    """
+    Run entries with start <= run_timestamp < end (ISO strings or datetimes), oldest
+    first. `limit` keeps only the most recent runs in the range.
+    """
+    clauses, params = [], []
+    if start is not None:
+        clauses.append("run_timestamp >= ?")
+        params.append(_iso(start))
+    if end is not None:
+        clauses.append("run_timestamp < ?")
+        params.append(_iso(end))
+    sql = "SELECT entry FROM runs"
+    if clauses:
+        sql += " WHERE " + " AND ".join(clauses)
+    sql += " ORDER BY run_timestamp DESC, id DESC"
+    if limit:
+        sql += f" LIMIT {int(limit)}"
+    with closing(connect(path)) as conn:
+        rows = conn.execute(sql, params).fetchall()
+    return [json.loads(entry) for (entry,) in reversed(rows)]
+
+
+def metric_series(name: str, start: Optional[str] = None, end: Optional[str] = None,
+                  path: Optional[Path] = None) -> List[Tuple[str, float]]:
+    """(run_timestamp, value) pairs of one metric over a time range, oldest first."""
+    sql = ("SELECT r.run_timestamp, m.value FROM run_metrics m JOIN runs r ON r.id = m.run "
+           "WHERE m.name = ?")
+    params: list = [name]
+    if start is not None:
+        sql += " AND r.run_timestamp >= ?"
+        params.append(_iso(start))
+    if end is not None:
+        sql += " AND r.run_timestamp < ?"
+        params.append(_iso(end))
+    with closing(connect(path)) as conn:
+        return conn.execute(sql + " ORDER BY r.run_timestamp, r.id", params).fetchall()
+
+
+def _iso(value) -> str:
+    return value.isoformat() if hasattr(value, "isoformat") else str(value)
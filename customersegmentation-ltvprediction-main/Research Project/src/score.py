@@ -0,0 +1,155 @@
+# src/score.py
+from __future__ import annotations
+
+import argparse
+import os
+import time
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src import model_registry
+from src.ltv_prediction import predict_ltv
+from src.segmentation import assign_segments
+from src.uplift import predict_uplift, uplift_features
+
+# Batch scoring of new customers with a registry version's models (nothing is refitted):
+#   python -m src.score customers.csv scored.parquet [--version RUN_ID] [--chunksize 100000]
+# The input is a customer-level RFM table (recency, frequency, monetary_value, T,
+# profit_adjusted, ... as calculate_rfm builds it), CSV or Parquet, read and written
+# chunk by chunk so its size is not bounded by memory.
+SCORE_COLUMNS = ["cluster", "predicted_purchases_30", "prob_alive", "expected_avg_profit", "CLV",
+                 "CLV_ML", "churn_probability", "uplift"]
+
+Models = Dict[str, Tuple[object, Dict]]
+
+
+def load_scoring_models(version: Optional[str] = None) -> Models:
+    """{name: (model, manifest entry)} of `version` (LATEST by default); it must hold the BG/NBD model."""
+    models = model_registry.load_models(version)
+    if "bgnbd" not in models:
+        raise KeyError(f"Registry version {version or model_registry.latest_version()} has no BG/NBD model")
+    return models
+
+
+def required_features(models: Models) -> List[str]:
+    """Input columns the models were fitted on, less the ones scoring derives itself."""
+    needed = []
+    for name, (_, entry) in models.items():
+        if name == "uplift_arms":
+            continue  # uplift sees the scored frame, one-hot encoded as when fitted
+        needed += [f for f in entry.get("features") or [] if f not in SCORE_COLUMNS and f not in needed]
+    return needed
+
+
+def score_frame(rfm: pd.DataFrame, models: Models) -> pd.DataFrame:
+    """
+    A copy of `rfm` with SCORE_COLUMNS added, in the pipeline's order: segment, BG/NBD
+    and Gamma-Gamma LTV, ML CLV, churn probability, uplift (each when the version has it).
+    Raises ValueError when a feature the models need is missing.
+    """
+    missing = [f for f in required_features(models) if f not in rfm.columns]
+    if missing:
+        raise ValueError(f"Input lacks features the models were fitted on: {missing}")
+    rfm = rfm.copy()
+    if "segment_model" in models:
+        rfm["cluster"] = assign_segments(rfm, models["segment_scaler"][0], models["segment_model"][0]).astype(int)
+    bgf, entry = models["bgnbd"]
+    ggf = models["gamma_gamma"][0] if "gamma_gamma" in models else None
+    rfm = predict_ltv(rfm, entry["config"], models=(bgf, ggf), closed_form=True)
+    if "clv_gbm" in models:
+        model, entry = models["clv_gbm"]
+        rfm["CLV_ML"] = model.predict(rfm[entry["features"]])
+    if "churn_gbm" in models:
+        clf, entry = models["churn_gbm"]
+        rfm["churn_probability"] = clf.predict_proba(rfm[entry["features"]])[:, 1]
+    if "uplift_arms" in models:
+        arms, entry = models["uplift_arms"]
+        X = uplift_features(rfm).reindex(columns=entry["features"], fill_value=0.0)
+        rfm["uplift"] = np.round(predict_uplift(arms, X), 3)
+    return rfm
+
+
+def _read_chunks(path: Path, chunksize: int) -> Iterator[pd.DataFrame]:
+    if path.suffix == ".parquet":
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunksize)
+
+
+def score_file(input_path, output_path, version: Optional[str] = None, chunksize: int = 100_000,
+               id_column: str = "customer_id", keep_columns: bool = False) -> Dict:
+    """
+    Stream `input_path` through score_frame `chunksize` rows at a time into `output_path`
+    (Parquet or CSV by suffix; replaced only once complete). The output holds `id_column`
+    and the scores, plus every input column with `keep_columns`.
+    Returns {"version", "rows", "chunks", "seconds"}.
+    """
+    input_path, output_path = Path(input_path), Path(output_path)
+    version = version or model_registry.latest_version()
+    models = load_scoring_models(version)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = output_path.with_name(f".{output_path.name}.{os.getpid()}.tmp")
+    writer = None
+    rows = chunks = 0
+    start = time.perf_counter()
+    try:
+        for chunk in _read_chunks(input_path, chunksize):
+            has_id = id_column in chunk.columns
+            scored = score_frame(chunk.set_index(id_column) if has_id else chunk, models)
+            if not keep_columns:
+                scored = scored[[c for c in SCORE_COLUMNS if c in scored.columns]]
+            scored = scored.reset_index() if has_id else scored
+            if output_path.suffix == ".parquet":
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+                if writer is None:
+                    table = pa.Table.from_pandas(scored, preserve_index=False)
+                    writer = pq.ParquetWriter(tmp_path, table.schema)
+                else:
+                    table = pa.Table.from_pandas(scored, schema=writer.schema, preserve_index=False)
+                writer.write_table(table)
+            else:
+                scored.to_csv(tmp_path, mode="a" if chunks else "w", header=not chunks, index=False)
+            rows += len(scored)
+            chunks += 1
+        if writer is not None:
+            writer.close()
+            writer = None
+        if not chunks:
+            raise ValueError(f"{input_path} has no rows to score")
+        os.replace(tmp_path, output_path)
+    finally:
+        if writer is not None:
+            writer.close()
+        tmp_path.unlink(missing_ok=True)
+    return {"version": version, "rows": rows, "chunks": chunks, "seconds": time.perf_counter() - start}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m src.score",
+                                     description="Score a customer/RFM file with registered models.")
+    parser.add_argument("input", help="CSV or Parquet customer table")
+    parser.add_argument("output", help="scored CSV or Parquet file")
+    parser.add_argument("--version", default=None, help="registry version (default: LATEST)")
+    parser.add_argument("--registry-dir", default=None, help=f"default {model_registry.REGISTRY_DIR}")
+    parser.add_argument("--chunksize", type=int, default=100_000)
+    parser.add_argument("--id-column", default="customer_id")
+    parser.add_argument("--keep-columns", action="store_true", help="copy the input columns to the output")
+    args = parser.parse_args(argv)
+
+    if args.registry_dir:
+        model_registry.configure({"dir": args.registry_dir})
+    stats = score_file(args.input, args.output, version=args.version, chunksize=args.chunksize,
+                       id_column=args.id_column, keep_columns=args.keep_columns)
+    rate = stats["rows"] / max(stats["seconds"], 1e-9)
+    print(f"Scored {stats['rows']:,} customers in {stats['chunks']} chunks with models {stats['version']} "
+          f"in {stats['seconds']:.1f}s ({rate:,.0f} rows/s) -> {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,288 @@
+# src/scoring_service.py
+from __future__ import annotations
+
+import argparse
+import json
+import queue
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src import model_registry
+from src.score import SCORE_COLUMNS, load_scoring_models, required_features, score_frame
+
+# Per-customer scores on request, from one registry version loaded at start:
+#   POST /score    {"customers": [{"customer_id": "A", "recency": 30, "frequency": 4, ...}, ...]}
+#               -> {"version": ..., "scores": [{"customer_id": "A", "cluster": 2, "CLV": ..., ...}, ...]}
+#   GET /metrics   latency percentiles, throughput, cache and batch statistics
+#   GET /health
+# Customers missing from the LRU cache are queued; one batcher thread scores
+# everything queued within `max_wait_ms` (up to `max_batch` customers) with a single
+# vectorised score_frame call, so concurrent requests share the per-call model overhead.
+DEFAULTS = {"max_batch": 512, "max_wait_ms": 2.0, "cache_entries": 100_000, "latency_window": 10_000,
+            "timeout_s": 30.0}
+ID_FIELD = "customer_id"
+NON_NEGATIVE = ("recency", "frequency", "T")  # BG/NBD counts and durations
+
+
+def input_features(models) -> List[str]:
+    """Fields a customer is scored from (and cached by): every model input the scores do not derive."""
+    features = required_features(models)
+    if "uplift_arms" in models:
+        features += [f for f in models["uplift_arms"][1]["features"] if f not in SCORE_COLUMNS and f not in features]
+    return features
+
+
+def _validate(records, required: List[str], features: List[str]) -> Optional[str]:
+    """Error message for a malformed request; None when every customer can be scored."""
+    if not isinstance(records, list) or not records:
+        return 'Body must be a customer object or {"customers": [...]} with at least one customer'
+    for i, record in enumerate(records):
+        if not isinstance(record, dict):
+            return f"Customer {i} is not an object"
+        missing = [f for f in required if record.get(f) is None]
+        if missing:
+            return f"Customer {i} lacks features the models were fitted on: {missing}"
+        try:
+            values = {f: float(record[f]) for f in features if record.get(f) is not None}
+        except (TypeError, ValueError):
+            return f"Customer {i} has a non-numeric feature"
+        not_finite = [f for f, value in values.items() if not np.isfinite(value)]
+        if not_finite:
+            return f"Customer {i} has non-finite features: {not_finite}"
+        negative = [f for f in NON_NEGATIVE if values.get(f, 0.0) < 0]
+        if negative:
+            return f"Customer {i} has negative features: {negative}"
+    return None
+
+
+def _score_records(server, records: List[Dict]) -> List[Dict]:
+    frame = pd.DataFrame(records, columns=server.features)
+    scored = score_frame(frame.astype(float), server.models)
+    scored = scored[[c for c in SCORE_COLUMNS if c in scored.columns]]
+    rows = scored.astype(object).where(scored.notna(), None).to_dict("records")
+    with server.metrics_lock:
+        server.metrics["batches"] += 1
+        server.metrics["batched_customers"] += len(rows)
+    return rows
+
+
+def _score_batch(server, items: List[Tuple[List[Dict], Future]]) -> None:
+    """
+    Score the customers of every queued request in one score_frame call and resolve their
+    futures. When the batch fails, each request is re-scored alone, so only the requests
+    whose input caused the error receive it.
+    """
+    try:
+        rows = _score_records(server, [record for records, _ in items for record in records])
+    except Exception as exc:
+        if len(items) == 1:
+            items[0][1].set_exception(exc)
+            return
+        for records, future in items:
+            try:
+                future.set_result(_score_records(server, records))
+            except Exception as exc:
+                future.set_exception(exc)
+        return
+    offset = 0
+    for records, future in items:
+        future.set_result(rows[offset:offset + len(records)])
+        offset += len(records)
+
+
+def _batch_loop(server) -> None:
+    max_batch, max_wait = server.settings["max_batch"], server.settings["max_wait_ms"] / 1000
+    while not server.stopping.is_set():
+        try:
+            items = [server.pending.get(timeout=0.1)]
+        except queue.Empty:
+            continue
+        size = len(items[0][0])
+        deadline = time.perf_counter() + max_wait
+        while size < max_batch:
+            remaining = deadline - time.perf_counter()
+            try:
+                item = server.pending.get(timeout=remaining) if remaining > 0 else server.pending.get_nowait()
+            except queue.Empty:
+                break
+            items.append(item)
+            size += len(item[0])
+        _score_batch(server, items)
+
+
+def score_customers(server, records: List[Dict]) -> List[Dict]:
+    """Scores of `records` (cached ones from the LRU, the rest via the batcher), in request order."""
+    keys = [tuple(record.get(f) for f in server.features) for record in records]
+    results: List[Optional[Dict]] = [None] * len(records)
+    with server.cache_lock:
+        for i, key in enumerate(keys):
+            if key in server.cache:
+                server.cache.move_to_end(key)
+                results[i] = server.cache[key]
+    misses = [i for i, result in enumerate(results) if result is None]
+    if misses:
+        future: Future = Future()
+        server.pending.put(([records[i] for i in misses], future))
+        scored = future.result(timeout=server.settings["timeout_s"])
+        with server.cache_lock:
+            for i, row in zip(misses, scored):
+                results[i] = row
+                server.cache[keys[i]] = row
+            while len(server.cache) > server.settings["cache_entries"]:
+                server.cache.popitem(last=False)
+    with server.metrics_lock:
+        server.metrics["cache_hits"] += len(records) - len(misses)
+        server.metrics["cache_misses"] += len(misses)
+    return [{ID_FIELD: record[ID_FIELD], **row} if ID_FIELD in record else dict(row)
+            for record, row in zip(records, results)]
+
+
+def metrics(server) -> Dict:
+    """Service metrics; latency and throughput cover the last `latency_window` requests."""
+    with server.metrics_lock:
+        counts = dict(server.metrics)
+        window = list(server.latencies)
+    now = time.perf_counter()
+    lookups = counts["cache_hits"] + counts["cache_misses"]
+    result = {
+        "version": server.version,
+        "uptime_seconds": round(now - server.started, 3),
+        **{k: v for k, v in counts.items() if k != "batched_customers"},
+        "cache_hit_rate": round(counts["cache_hits"] / lookups, 4) if lookups else None,
+        "cache_size": len(server.cache),
+        "mean_batch_size": round(counts["batched_customers"] / counts["batches"], 2) if counts["batches"] else None,
+        "latency_ms": None, "requests_per_second": None, "customers_per_second": None,
+    }
+    if window:
+        latencies = np.array([latency for _, latency, _ in window]) * 1000
+        p50, p90, p99 = np.percentile(latencies, [50, 90, 99])
+        result["latency_ms"] = {"p50": round(p50, 3), "p90": round(p90, 3), "p99": round(p99, 3),
+                                "max": round(float(latencies.max()), 3)}
+        span = max(window[-1][0] - (window[0][0] - window[0][1]), 1e-9)
+        result["requests_per_second"] = round(len(window) / span, 1)
+        result["customers_per_second"] = round(sum(n for _, _, n in window) / span, 1)
+    return result
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, so clients can reuse the connection
+
+    def log_message(self, format, *args):  # one line per request would dominate the latency
+        pass
+
+    def _send_json(self, status: int, body: Dict) -> None:
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        path = self.path.rstrip("/")
+        if path == "/metrics":
+            self._send_json(200, metrics(self.server))
+        elif path == "/health":
+            self._send_json(200, {"status": "ok", "version": self.server.version})
+        else:
+            self._send_json(404, {"error": f"Unknown path {self.path}"})
+
+    def do_POST(self):
+        start = time.perf_counter()
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if self.path.rstrip("/") != "/score":
+            self._send_json(404, {"error": f"Unknown path {self.path}"})
+            return
+        try:
+            payload = json.loads(body or b"{}")
+        except json.JSONDecodeError as exc:
+            payload, error = None, f"Invalid JSON: {exc}"
+        else:
+            records = payload["customers"] if isinstance(payload, dict) and "customers" in payload else payload
+            records = [records] if isinstance(records, dict) else records
+            error = _validate(records, self.server.required, self.server.features)
+        if error:
+            with self.server.metrics_lock:
+                self.server.metrics["errors"] += 1
+            self._send_json(400, {"error": error})
+            return
+        try:
+            scores = score_customers(self.server, records)
+        except Exception as exc:
+            with self.server.metrics_lock:
+                self.server.metrics["errors"] += 1
+            self._send_json(500, {"error": f"{type(exc).__name__}: {exc}"})
+            return
+        self._send_json(200, {"version": self.server.version, "scores": scores})
+        finished = time.perf_counter()
+        with self.server.metrics_lock:
+            self.server.metrics["requests"] += 1
+            self.server.metrics["customers"] += len(records)
+            self.server.latencies.append((finished, finished - start, len(records)))
+
+
+def start(host: str = "127.0.0.1", port: int = 0, version: Optional[str] = None,
+          settings: Optional[Dict] = None) -> Tuple[ThreadingHTTPServer, str]:
+    """
+    Load `version`'s models (LATEST by default) once and serve them in daemon threads.
+    `settings` overrides DEFAULTS. Returns (server, base_url); stop(server) shuts it down.
+    """
+    version = version or model_registry.latest_version()
+    models = load_scoring_models(version)
+    server = ThreadingHTTPServer((host, port), _Handler)
+    server.daemon_threads = True
+    server.version, server.models = version, models
+    server.required, server.features = required_features(models), input_features(models)
+    server.settings = {**DEFAULTS, **(settings or {})}
+    server.cache, server.cache_lock = OrderedDict(), threading.Lock()
+    server.pending, server.stopping = queue.Queue(), threading.Event()
+    server.metrics = {"requests": 0, "customers": 0, "errors": 0, "cache_hits": 0, "cache_misses": 0,
+                      "batches": 0, "batched_customers": 0}
+    server.latencies = deque(maxlen=server.settings["latency_window"])
+    server.metrics_lock = threading.Lock()
+    server.started = time.perf_counter()
+    threading.Thread(target=_batch_loop, args=(server,), name="scoring-batcher", daemon=True).start()
+    threading.Thread(target=server.serve_forever, name="scoring-service", daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def stop(server: ThreadingHTTPServer) -> None:
+    server.shutdown()
+    server.server_close()
+    server.stopping.set()
+
+
+def main(argv: Optional[list] = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m src.scoring_service",
+                                     description="Local HTTP scoring service over registered models.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8502)
+    parser.add_argument("--version", default=None, help="registry version (default: LATEST)")
+    parser.add_argument("--registry-dir", default=None, help=f"default {model_registry.REGISTRY_DIR}")
+    parser.add_argument("--max-batch", type=int, default=DEFAULTS["max_batch"], help="customers per model call")
+    parser.add_argument("--max-wait-ms", type=float, default=DEFAULTS["max_wait_ms"],
+                        help="how long the batcher waits for more requests")
+    parser.add_argument("--cache-entries", type=int, default=DEFAULTS["cache_entries"], help="0 disables the cache")
+    args = parser.parse_args(argv)
+
+    if args.registry_dir:
+        model_registry.configure({"dir": args.registry_dir})
+    server, url = start(args.host, args.port, args.version, {
+        "max_batch": args.max_batch, "max_wait_ms": args.max_wait_ms, "cache_entries": args.cache_entries})
+    print(f"Scoring service for models {server.version} at {url} (POST /score, GET /metrics). Ctrl+C to stop.")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        stop(server)
+
+
+if __name__ == "__main__":
+    main()
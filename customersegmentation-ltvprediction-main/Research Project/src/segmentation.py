@@ -1,49 +1,90 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
 from sklearn.preprocessing import StandardScaler
 from sklearn.cluster import KMeans
 from sklearn.mixture import GaussianMixture
 
+from src.shared_arrays import published, run_attached
+
+SEGMENT_FEATURES = ['recency', 'frequency', 'monetary_value']
+
+
+def _sweep(fit, rfm_scaled, counts, n_jobs=1):
+    """
+    fit(views, n) for every cluster count, in-process or (n_jobs > 1, None = all cores)
+    in a process pool reading the scaled features from shared memory.
+    """
+    n_jobs = n_jobs if n_jobs and n_jobs > 0 else (os.cpu_count() or 1)
+    if n_jobs == 1 or len(counts) == 1:
+        return [fit({'X': rfm_scaled}, n) for n in counts]
+    with published({'X': rfm_scaled}) as specs, \
+            ProcessPoolExecutor(max_workers=min(n_jobs, len(counts))) as pool:
+        return list(pool.map(run_attached, repeat(fit), repeat(specs), counts))
+
+def _kmeans_inertia(views, n):
+    kmeans = KMeans(n_clusters=n, n_init=10, random_state=42)
+    kmeans.fit(views['X'])
+    return kmeans.inertia_
+
+def _gmm_with_bic(views, n):
+    gmm = GaussianMixture(n_components=n, covariance_type='full', random_state=42)
+    gmm.fit(views['X'])
+    return gmm, gmm.bic(views['X'])
+
+def fit_clustering(rfm, n_clusters):
+    """
+    Fit the scaler and K-Means on the RFM features.
+    Returns (scaler, kmeans); assign_segments labels any customers with them.
+    """
+    scaler = StandardScaler()
+    rfm_scaled = scaler.fit_transform(rfm[SEGMENT_FEATURES])
+    kmeans = KMeans(n_clusters=n_clusters, n_init=10, random_state=42)
+    kmeans.fit(rfm_scaled)
+    return scaler, kmeans
+
 def perform_clustering(rfm, n_clusters):
     """
     Perform K-Means clustering on RFM data.
     Returns cluster labels.
     """
-    rfm_features = rfm[['recency', 'frequency', 'monetary_value']]
-    scaler = StandardScaler()
-    rfm_scaled = scaler.fit_transform(rfm_features)
-    kmeans = KMeans(n_clusters=n_clusters, n_init=10, random_state=42)
-    return kmeans.fit_predict(rfm_scaled)
+    _, kmeans = fit_clustering(rfm, n_clusters)
+    return kmeans.labels_
 
-def get_elbow_data(rfm):
+def get_elbow_data(rfm, n_jobs=1):
     """
     Compute inertia for elbow method.
     Returns list of inertia values for 1 to 7 clusters.
     """
-    rfm_features = rfm[['recency', 'frequency', 'monetary_value']]
+    rfm_features = rfm[SEGMENT_FEATURES]
     scaler = StandardScaler()
     rfm_scaled = scaler.fit_transform(rfm_features)
-    inertia = []
-    for n in range(1, 8):
-        kmeans = KMeans(n_clusters=n, n_init=10, random_state=42)
-        kmeans.fit(rfm_scaled)
-        inertia.append(kmeans.inertia_)
-    return inertia
+    return _sweep(_kmeans_inertia, rfm_scaled, list(range(1, 8)), n_jobs)
 
-def perform_auto_gmm_segmentation(rfm, max_components: int = 7):
+def fit_auto_gmm_segmentation(rfm, max_components: int = 7, n_jobs=1):
     """
-    Select number of clusters automatically using BIC with Gaussian Mixture Models.
-    Returns cluster labels (ints).
+    Fit the scaler and the Gaussian Mixture with the best BIC (1 to max_components).
+    Returns (scaler, gmm).
     """
-    rfm_features = rfm[['recency', 'frequency', 'monetary_value']]
     scaler = StandardScaler()
-    rfm_scaled = scaler.fit_transform(rfm_features)
+    rfm_scaled = scaler.fit_transform(rfm[SEGMENT_FEATURES])
     best_gmm = None
     best_bic = float('inf')
-    for n in range(1, max_components + 1):
-        gmm = GaussianMixture(n_components=n, covariance_type='full', random_state=42)
-        gmm.fit(rfm_scaled)
-        bic = gmm.bic(rfm_scaled)
+    for gmm, bic in _sweep(_gmm_with_bic, rfm_scaled, list(range(1, max_components + 1)), n_jobs):
         if bic < best_bic:
             best_bic = bic
             best_gmm = gmm
-    labels = best_gmm.predict(rfm_scaled)
-    return labels
\ No newline at end of file
+    return scaler, best_gmm
+
+def perform_auto_gmm_segmentation(rfm, max_components: int = 7):
+    """
+    Select number of clusters automatically using BIC with Gaussian Mixture Models.
+    Returns cluster labels (ints).
+    """
+    scaler, gmm = fit_auto_gmm_segmentation(rfm, max_components)
+    return assign_segments(rfm, scaler, gmm)
+
+def assign_segments(rfm, scaler, model):
+    """Cluster labels for customers (fitted or new) from a fitted scaler and clusterer."""
+    return model.predict(scaler.transform(rfm[SEGMENT_FEATURES]))
@@ -0,0 +1,160 @@
+# src/shared_arrays.py
+from __future__ import annotations
+
+import atexit
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+from multiprocessing import resource_tracker, shared_memory
+from pathlib import Path
+from typing import Callable, Dict, Iterator, Optional, Tuple
+
+import numpy as np
+
+# Feature/target arrays handed to process-pool workers without pickling them per task:
+#
+#     with published({"X": X, "y": y}) as specs:          # parent: one copy in
+#         pool.map(run_attached, repeat(fit), repeat(specs), tasks)
+#
+#     def fit(views, task):                               # worker: zero-copy, read-only
+#         return model.fit(views["X"], views["y"])            # never return a view
+#
+# Specs are a few bytes per array. The "shared_memory" backend copies each array into
+# a POSIX shared-memory block; "memmap" writes an .npy file (under `directory`, the
+# temp dir by default) that workers map, for arrays larger than /dev/shm. The parent
+# owns the blocks/files and removes them when the block exits, on error too, and at
+# interpreter exit for anything a crash left behind.
+BACKENDS = ("shared_memory", "memmap")
+
+Spec = Tuple[str, str, Tuple[int, ...], str]  # (backend, block name or file path, shape, dtype)
+
+_owned: Dict[int, Tuple[int, Callable[[], None]]] = {}  # id -> (owning pid, cleanup)
+_owned_lock = threading.Lock()
+_own_tracker: Dict[int, bool] = {}  # pid -> attaching process runs a resource tracker of its own
+
+
+def _release_all() -> None:
+    with _owned_lock:
+        # a forked worker inherits the table but must not remove its parent's arrays
+        cleanups = [cleanup for pid, cleanup in _owned.values() if pid == os.getpid()]
+        _owned.clear()
+    for cleanup in cleanups:
+        cleanup()
+
+
+atexit.register(_release_all)
+
+
+def _publish_one(array: np.ndarray, backend: str, directory: Optional[str]) -> Tuple[Spec, Callable[[], None]]:
+    array = np.ascontiguousarray(array)
+    if backend == "shared_memory":
+        shm = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+
+        def cleanup():
+            shm.close()
+            try:
+                shm.unlink()
+            except FileNotFoundError:
+                pass
+        try:
+            np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)[...] = array
+        except BaseException:
+            cleanup()
+            raise
+        return (backend, shm.name, array.shape, array.dtype.str), cleanup
+
+    handle, path = tempfile.mkstemp(prefix="shared_array_", suffix=".npy", dir=directory)
+    os.close(handle)
+
+    def cleanup():
+        Path(path).unlink(missing_ok=True)
+    try:
+        if array.size:
+            target = np.lib.format.open_memmap(path, mode="w+", dtype=array.dtype, shape=array.shape)
+            target[...] = array
+            target.flush()
+            del target
+        else:
+            np.save(path, array)  # an empty array cannot be mapped
+    except BaseException:
+        cleanup()
+        raise
+    return (backend, path, array.shape, array.dtype.str), cleanup
+
+
+@contextmanager
+def published(arrays: Dict[str, np.ndarray], backend: str = "shared_memory",
+              directory: Optional[str] = None) -> Iterator[Dict[str, Spec]]:
+    """
+    Copy `arrays` once into shared memory (or memory-mapped .npy files with
+    backend="memmap") and yield their picklable specs, {name: spec}, for attached()
+    in workers. The blocks/files are removed when the block exits.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown shared array backend {backend!r}; expected one of {BACKENDS}")
+    specs: Dict[str, Spec] = {}
+    cleanups = []
+    try:
+        for name, array in arrays.items():
+            spec, cleanup = _publish_one(array, backend, directory)
+            specs[name] = spec
+            cleanups.append(cleanup)
+            with _owned_lock:
+                _owned[id(cleanup)] = (os.getpid(), cleanup)
+        yield specs
+    finally:
+        for cleanup in cleanups:
+            with _owned_lock:
+                _owned.pop(id(cleanup), None)
+            cleanup()
+
+
+def _attach_block(name: str) -> shared_memory.SharedMemory:
+    """Attach to a block published by the parent without taking ownership."""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)  # Python >= 3.13
+    except TypeError:
+        pass
+    # Pool workers started after the parent's resource tracker (fork or spawn) talk to
+    # that tracker, which already holds the block: unregistering would drop the parent's
+    # registration. A process that had no tracker at its first attach gets one of its
+    # own, which must not unlink the block when the process exits.
+    own_tracker = _own_tracker.setdefault(os.getpid(), getattr(resource_tracker._resource_tracker, "_fd", None) is None)
+    shm = shared_memory.SharedMemory(name=name)
+    if own_tracker:
+        resource_tracker.unregister(shm._name, "shared_memory")
+    return shm
+
+
+@contextmanager
+def attached(specs: Dict[str, Spec]) -> Iterator[Dict[str, np.ndarray]]:
+    """
+    Read-only, zero-copy views {name: array} of published arrays. The views are only
+    valid inside the block: anything returned from it must not be (or keep) a view.
+    """
+    blocks = []
+    views: Dict[str, np.ndarray] = {}
+    try:
+        for name, (backend, location, shape, dtype) in specs.items():
+            if backend == "shared_memory":
+                shm = _attach_block(location)
+                blocks.append(shm)
+                view = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+            elif int(np.prod(shape)):
+                view = np.load(location, mmap_mode="r")
+            else:
+                view = np.load(location)
+            view.flags.writeable = False
+            views[name] = view
+        yield views
+    finally:
+        views.clear()
+        for shm in blocks:
+            shm.close()
+
+
+def run_attached(func: Callable, specs: Dict[str, Spec], *args):
+    """Process-pool entry point: func(views, *args) over attached(specs)."""
+    with attached(specs) as views:
+        return func(views, *args)
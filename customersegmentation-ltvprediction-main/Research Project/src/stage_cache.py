@@ -0,0 +1,321 @@
+# src/stage_cache.py
+from __future__ import annotations
+
+import argparse
+import ast
+import hashlib
+import importlib.util
+import inspect
+import json
+import os
+import pickle
+import shutil
+import time
+import uuid
+from datetime import datetime
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# One directory per entry: <dir>/<key[:2]>/<key>/ with outputs.pkl, meta.json and
+# files/ (copies of the files the stage wrote). meta.json's mtime is the last use.
+CACHE_DIR = Path("output/cache/stages")
+OUTPUTS_FILE = "outputs.pkl"
+META_FILE = "meta.json"
+
+_state: Dict = {"enabled": False, "cache_dir": CACHE_DIR, "max_bytes": 512 * 1024 ** 2}
+
+
+def configure(config: Optional[dict] = None) -> None:
+    """Apply the `cache` config section: enabled, dir, max_mb (LRU size bound)."""
+    config = config or {}
+    _state["enabled"] = bool(config.get("enabled", False))
+    _state["cache_dir"] = Path(config.get("dir") or CACHE_DIR)
+    _state["max_bytes"] = int(float(config.get("max_mb", 512)) * 1024 ** 2)
+
+
+def enabled() -> bool:
+    return _state["enabled"]
+
+
+def _sha(*parts: bytes) -> str:
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(len(part).to_bytes(8, "little"))
+        digest.update(part)
+    return digest.hexdigest()
+
+
+def hash_file(path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as handle:
+        for block in iter(lambda: handle.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def hash_value(value) -> str:
+    """
+    Content hash of a stage input/output. Frames and series hash their values, index,
+    column names and dtypes (pandas' vectorised row hash, no serialisation); arrays
+    their bytes; containers recurse; paths hash the file contents; anything else
+    is pickled, or when it cannot be, hashed by its non-callable attributes.
+    """
+    if isinstance(value, pd.DataFrame):
+        rows = pd.util.hash_pandas_object(value, index=True).to_numpy()
+        layout = json.dumps([list(map(str, value.columns)), list(map(str, value.dtypes)),
+                             list(map(str, value.index.names))])
+        return _sha(b"frame", layout.encode(), rows.tobytes())
+    if isinstance(value, pd.Series):
+        rows = pd.util.hash_pandas_object(value, index=True).to_numpy()
+        return _sha(b"series", f"{value.name}|{value.dtype}".encode(), rows.tobytes())
+    if isinstance(value, np.ndarray):
+        array = np.ascontiguousarray(value)
+        return _sha(b"array", f"{array.dtype}|{array.shape}".encode(), array.tobytes())
+    if isinstance(value, (list, tuple)):
+        return _sha(b"seq", *(hash_value(v).encode() for v in value))
+    if isinstance(value, dict):
+        return _sha(b"dict", *(f"{k}={hash_value(v)}".encode() for k, v in sorted(value.items(), key=str)))
+    if isinstance(value, Path):
+        return _sha(b"file", hash_file(value).encode())
+    try:
+        return _sha(b"pickle", pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+    except (pickle.PicklingError, TypeError, AttributeError):
+        state = {k: v for k, v in vars(value).items() if not callable(v)} if hasattr(value, "__dict__") else repr(value)
+        return _sha(b"object", type(value).__qualname__.encode(), hash_value(state).encode())
+
+
+def _find_spec(name: str):
+    try:
+        return importlib.util.find_spec(name)
+    except (ImportError, ValueError):
+        return None
+
+
+@lru_cache(maxsize=None)
+def _package_imports(name: str, source: bytes) -> Tuple[str, ...]:
+    """Modules of `name`'s top-level package that its source imports, anywhere in the file."""
+    package = name.split(".")[0]
+    imported = []
+    for node in ast.walk(ast.parse(source)):
+        if isinstance(node, ast.Import):
+            imported += [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            imported.append(node.module)
+            spec = _find_spec(node.module) if node.module.split(".")[0] == package else None
+            if spec is not None and spec.submodule_search_locations is not None:
+                imported += [f"{node.module}.{alias.name}" for alias in node.names]  # from src import x
+    return tuple(module for module in imported if module.split(".")[0] == package and module != package)
+
+
+def _module_sources(name: str) -> List[bytes]:
+    """
+    Source of a module given by name and of every module of its package it imports,
+    transitively, read from their files without importing them.
+    """
+    sources: Dict[str, bytes] = {}
+    pending = [name]
+    while pending:
+        module = pending.pop()
+        if module in sources:
+            continue
+        spec = _find_spec(module)
+        if spec is None or not spec.has_location:
+            if module == name:
+                sources[module] = name.encode()
+            continue
+        sources[module] = Path(spec.origin).read_bytes()
+        pending += _package_imports(module, sources[module])
+    return [sources[name]] + [sources[module] for module in sorted(sources) if module != name]
+
+
+def code_version(*objects) -> str:
+    """
+    Hash of the source of functions/modules; any edit to them invalidates the key.
+    A string names a module (e.g. "src.segmentation"), so a stage's key can be
+    computed on a cache hit without importing the module it would run; the modules
+    of its package it imports (src.nbo -> src.nbo_allocation) are folded in too.
+    """
+    sources = []
+    for obj in objects:
+        if isinstance(obj, str):
+            sources += _module_sources(obj)
+            continue
+        try:
+            sources.append(inspect.getsource(obj).encode())
+        except (OSError, TypeError):
+            sources.append(repr(obj).encode())
+    return _sha(b"code", *sources)
+
+
+def stage_key(stage: str, input_hashes: Dict[str, str], config=None, code: Iterable = ()) -> str:
+    """
+    Cache key of one stage execution: its name, the content hashes of its inputs,
+    its config subsection and the version of its code. Input hashes are the output
+    hashes recorded upstream, so keys chain from the raw data down the DAG.
+    """
+    payload = json.dumps({"stage": stage, "inputs": dict(sorted(input_hashes.items())),
+                          "config": config, "code": code_version(*code)}, sort_keys=True, default=str)
+    return _sha(payload.encode())
+
+
+def _entry_dir(key: str) -> Path:
+    return _state["cache_dir"] / key[:2] / key
+
+
+def lookup(key: str) -> Optional[Dict]:
+    """
+    Cached entry for `key` ({"outputs", "output_hashes", "artifacts", "run_id",
+    "files", "path"}), or None. A hit marks the entry as recently used.
+    """
+    path = _entry_dir(key)
+    meta_path = path / META_FILE
+    try:
+        meta = json.loads(meta_path.read_text())
+        with open(path / OUTPUTS_FILE, "rb") as handle:
+            outputs = pickle.load(handle)
+    except (FileNotFoundError, json.JSONDecodeError, pickle.UnpicklingError, EOFError):
+        return None
+    os.utime(meta_path)
+    return {**meta, "outputs": outputs, "path": path}
+
+
+def store(key: str, stage: str, outputs: Dict, output_hashes: Dict[str, str],
+          artifacts: Optional[List[str]] = None, run_id: Optional[str] = None,
+          files: Optional[List[str]] = None) -> Optional[Path]:
+    """
+    Save a stage's outputs (pickled), the results-store artifacts it wrote in `run_id`
+    and copies of the `files` it wrote. The entry is assembled in a temporary
+    directory and renamed into place, so concurrent runs never see half an entry.
+    Returns None when the outputs cannot be pickled.
+    """
+    path = _entry_dir(key)
+    tmp = path.parent / f".{key}.{uuid.uuid4().hex[:8]}.tmp"
+    (tmp / "files").mkdir(parents=True)
+    try:
+        with open(tmp / OUTPUTS_FILE, "wb") as handle:
+            pickle.dump(outputs, handle, protocol=pickle.HIGHEST_PROTOCOL)
+    except (pickle.PicklingError, TypeError, AttributeError):
+        shutil.rmtree(tmp, ignore_errors=True)
+        return None
+    files = [str(f) for f in files or [] if Path(f).exists()]
+    for i, file in enumerate(files):
+        shutil.copyfile(file, tmp / "files" / str(i))
+    meta = {
+        "stage": stage,
+        "key": key,
+        "created": datetime.utcnow().isoformat(),
+        "output_hashes": output_hashes,
+        "artifacts": list(artifacts or []),
+        "run_id": run_id,
+        "files": files,
+    }
+    meta["size_bytes"] = sum(f.stat().st_size for f in tmp.rglob("*") if f.is_file())
+    (tmp / META_FILE).write_text(json.dumps(meta, indent=2))
+    shutil.rmtree(path, ignore_errors=True)
+    try:
+        os.replace(tmp, path)
+    except OSError:  # another run stored the same key first
+        shutil.rmtree(tmp, ignore_errors=True)
+    return path
+
+
+def record_use(entry: Dict, run_id: Optional[str]) -> None:
+    """After a hit, point the entry at the run its artifacts were just copied into."""
+    meta = {k: v for k, v in entry.items() if k not in ("outputs", "path")}
+    meta["run_id"] = run_id
+    (Path(entry["path"]) / META_FILE).write_text(json.dumps(meta, indent=2))
+
+
+def restore_files(entry: Dict) -> None:
+    """Put the files a cached stage wrote back in place (skipping unchanged ones)."""
+    for i, file in enumerate(entry.get("files", [])):
+        cached = Path(entry["path"]) / "files" / str(i)
+        target = Path(file)
+        if target.exists() and hash_file(target) == hash_file(cached):
+            continue
+        target.parent.mkdir(parents=True, exist_ok=True)
+        tmp = target.with_name(f".{target.name}.{os.getpid()}.tmp")
+        shutil.copyfile(cached, tmp)
+        os.replace(tmp, target)
+
+
+def list_entries() -> List[Dict]:
+    """Metadata of every entry, most recently used first (with last_used and path)."""
+    entries = []
+    for meta_path in _state["cache_dir"].glob(f"*/*/{META_FILE}"):
+        try:
+            meta = json.loads(meta_path.read_text())
+        except (OSError, json.JSONDecodeError):
+            continue
+        meta["last_used"] = meta_path.stat().st_mtime
+        meta["path"] = str(meta_path.parent)
+        entries.append(meta)
+    return sorted(entries, key=lambda m: m["last_used"], reverse=True)
+
+
+def cache_size() -> int:
+    return sum(m.get("size_bytes", 0) for m in list_entries())
+
+
+def evict(max_bytes: Optional[int] = None) -> List[str]:
+    """Drop least recently used entries until the cache fits `max_bytes`. Returns their keys."""
+    max_bytes = _state["max_bytes"] if max_bytes is None else max_bytes
+    entries = list_entries()
+    total = sum(m.get("size_bytes", 0) for m in entries)
+    removed = []
+    for meta in reversed(entries):  # least recently used first
+        if total <= max_bytes:
+            break
+        shutil.rmtree(meta["path"], ignore_errors=True)
+        total -= meta.get("size_bytes", 0)
+        removed.append(meta["key"])
+    return removed
+
+
+def purge(stage: Optional[str] = None) -> int:
+    """Delete every entry (or those of one stage). Returns the number removed."""
+    entries = [m for m in list_entries() if stage is None or m["stage"] == stage]
+    for meta in entries:
+        shutil.rmtree(meta["path"], ignore_errors=True)
+    return len(entries)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m src.stage_cache", description="Inspect or purge the stage cache.")
+    parser.add_argument("--dir", default=str(CACHE_DIR), help="cache directory")
+    commands = parser.add_subparsers(dest="command", required=True)
+    listing = commands.add_parser("list", help="entries, most recently used first")
+    listing.add_argument("--stage")
+    commands.add_parser("stats", help="entries and size per stage")
+    purging = commands.add_parser("purge", help="delete entries")
+    purging.add_argument("--stage", help="only this stage")
+    evicting = commands.add_parser("evict", help="LRU-evict down to a size")
+    evicting.add_argument("--max-mb", type=float, required=True)
+    args = parser.parse_args(argv)
+    _state["cache_dir"] = Path(args.dir)
+
+    if args.command == "list":
+        for m in list_entries():
+            if args.stage in (None, m["stage"]):
+                used = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(m["last_used"]))
+                print(f"{m['key'][:12]}  {m['stage']:<20} {m.get('size_bytes', 0) / 1e6:>9.2f} MB  last used {used}")
+    elif args.command == "stats":
+        per_stage: Dict[str, List[int]] = {}
+        for m in list_entries():
+            per_stage.setdefault(m["stage"], []).append(m.get("size_bytes", 0))
+        for name, sizes in sorted(per_stage.items()):
+            print(f"{name:<20} {len(sizes):>4} entries {sum(sizes) / 1e6:>9.2f} MB")
+        print(f"{'total':<20} {sum(map(len, per_stage.values())):>4} entries "
+              f"{sum(map(sum, per_stage.values())) / 1e6:>9.2f} MB")
+    elif args.command == "purge":
+        print(f"Removed {purge(args.stage)} entries.")
+    elif args.command == "evict":
+        print(f"Evicted {len(evict(int(args.max_mb * 1024 ** 2)))} entries.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+# src/synthetic_data.py
+from __future__ import annotations
+
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Order lines in the schema of data/raw/INDIA_RETAIL_DATA.xlsx ('retails' sheet), at
+# any scale, for tests and benchmarks. Customers ("City") buy at heterogeneous rates
+# during an active spell that ends after a random number of purchases, so there are
+# both loyal and churned customers; order dates follow a yearly seasonal curve.
+
+COLUMNS = [
+    "Order Priority", "Discount offered", "Unit Price", "Freight Expenses", "Freight Mode", "Segment",
+    "Product Type", "Product Sub-Category", "Product Container", "State", "City", "Region", "Country",
+    "Order Date", "Ship Date", "Profit", "QtyOrdered", "Sales",
+]
+PRIORITIES = ["High", "Low", "Not Specified", "Medium", "Critical"]
+FREIGHT_MODES = ["Regular Air", "Delivery Truck", "Express Air"]
+SEGMENTS = ["Hotels / Hospitals", "Restaurant Chain", "Personel Usage", "Stand Alone Restaurants"]
+PRODUCTS: Dict[str, List[str]] = {
+    "Processed Meat": ["Bacon", "Fresh Water Eel", "Smoked Salmon", "Foie Gras", "Salami", "Ham"],
+    "Canned Foods": ["Assorted Fruits", "Sliced Pineapple", "Quail Eggs", "Baked Beans", "Sweet Corn",
+                     "Tuna", "Olives"],
+    "Preserved Food": ["Sundried Tomatoes", "Marmalade", "Jams", "Pickle"],
+}
+CONTAINERS = ["Small Box", "Wrap Bag", "Small Pack", "Jumbo Drum", "Jumbo Box", "Medium Box", "Large Box"]
+STATES: List[Tuple[str, str]] = [
+    ("Uttar Pradesh", "North"), ("Bihar", "North"), ("Chhattisgarh", "North"), ("Punjab", "North"),
+    ("Haryana", "North"), ("Madhya Pradesh", "West"), ("Maharashtra", "West"), ("Gujarat", "West"),
+    ("Rajasthan", "West"), ("Goa", "West"), ("Tamil Nadu", "South"), ("Karnataka", "South"),
+    ("Kerala", "South"), ("Andhra Pradesh", "South"), ("Telangana", "South"), ("West Bengal", "East"),
+    ("Assam", "East"), ("Odisha", "East"), ("Jharkhand", "East"), ("Tripura", "East"),
+    ("Meghalaya", "East"), ("Sikkim", "East"),
+]
+
+
+def _seasonal_cdf(days: int, start: pd.Timestamp, seasonality: float) -> np.ndarray:
+    """CDF over day offsets of a yearly cycle peaking in the last quarter."""
+    day_of_year = (start + pd.to_timedelta(np.arange(days), unit="D")).dayofyear.to_numpy()
+    density = 1 + seasonality * np.sin(2 * np.pi * (day_of_year - 200) / 365.25)
+    return np.concatenate([[0.0], np.cumsum(density) / density.sum()])
+
+
+def generate_transactions(rows: int = 10_000, customers: Optional[int] = None, days: int = 1461,
+                          start: str = "2010-01-01", seasonality: float = 0.3,
+                          seed: int = 0) -> pd.DataFrame:
+    """
+    `rows` raw order lines from `customers` cities (rows // 8 by default, like the
+    real data) over `days` days from `start`. `seasonality` is the amplitude of the
+    yearly cycle in order volume (0 = flat). Deterministic for a given seed.
+    """
+    rng = np.random.default_rng(seed)
+    customers = max(1, min(customers or rows // 8, rows))
+    start_ts = pd.Timestamp(start)
+
+    # Customers, as BG/NBD assumes: a gamma-distributed purchase rate while active and a
+    # beta-distributed chance of dropping out after each purchase
+    first = rng.integers(0, max(days // 2, 1), customers)
+    rate = rng.gamma(0.8, 1.25, customers) * (rows / customers) / (days / 2)  # orders per day
+    purchases = rng.geometric(rng.beta(1.0, 3.0, customers))  # until dropout
+    active = rng.gamma(purchases, 1 / rate)
+    dropout = np.minimum(first + active.astype(np.int64) + 1, days)
+    # Every customer orders once; the other lines go to customers in proportion to rate * spell length
+    weight = rate * (dropout - first)
+    customer = np.concatenate([np.arange(customers),
+                               rng.choice(customers, rows - customers, p=weight / weight.sum())])
+    rng.shuffle(customer)
+
+    # Order day within the customer's spell, drawn from the seasonal curve by inverse CDF
+    cdf = _seasonal_cdf(days, start_ts, seasonality)
+    lo, hi = cdf[first[customer]], cdf[dropout[customer]]
+    day = np.searchsorted(cdf, lo + rng.random(rows) * (hi - lo), side="right") - 1
+    day = np.clip(day, first[customer], dropout[customer] - 1)
+    order_date = start_ts + pd.to_timedelta(day, unit="D")
+    ship_date = order_date + pd.to_timedelta(np.minimum(rng.geometric(0.45, rows) - 1, 92), unit="D")
+
+    # Products
+    product_types = np.array(list(PRODUCTS))
+    type_code = rng.integers(0, len(product_types), rows)
+    sub_code = np.floor(rng.random(rows) * np.array([len(PRODUCTS[t]) for t in product_types])[type_code])
+    sub_categories = np.array([sub for t in product_types for sub in PRODUCTS[t]])
+    sub_offset = np.cumsum([0] + [len(PRODUCTS[t]) for t in product_types])[:-1]
+    sub_category = sub_categories[sub_offset[type_code] + sub_code.astype(np.int64)]
+    base_price = rng.lognormal(3.5, 1.0, len(sub_categories))  # per sub-category
+    spend_level = rng.lognormal(0, 0.5, customers)  # some customers buy dearer lines than others
+    unit_price = np.round(base_price[sub_offset[type_code] + sub_code.astype(np.int64)]
+                          * spend_level[customer] * rng.lognormal(0, 0.3, rows), 2)
+    quantity = np.minimum(rng.negative_binomial(2, 0.12, rows) + 1, 170)
+    discount = rng.integers(0, 11, rows) / 100
+    sales = np.round(unit_price * quantity * (1 - discount) * rng.lognormal(0, 0.05, rows), 2)
+    profit = np.round(sales * rng.normal(0.1, 0.35, rows), 4)
+
+    # Cities sit in one state each
+    state_code = rng.integers(0, len(STATES), customers)[customer]
+    width = len(str(customers - 1))
+    frame = pd.DataFrame({
+        "Order Priority": rng.choice(PRIORITIES, rows),
+        "Discount offered": discount,
+        "Unit Price": unit_price,
+        "Freight Expenses": np.round(rng.gamma(1.5, 8.0, rows), 2),
+        "Freight Mode": rng.choice(FREIGHT_MODES, rows, p=[0.6, 0.25, 0.15]),
+        "Segment": rng.choice(SEGMENTS, rows),
+        "Product Type": product_types[type_code],
+        "Product Sub-Category": sub_category,
+        "Product Container": rng.choice(CONTAINERS, rows),
+        "State": np.array([s for s, _ in STATES])[state_code],
+        "City": np.char.add("City_", np.char.zfill(customer.astype(str), width)),
+        "Region": np.array([r for _, r in STATES])[state_code],
+        "Country": "India",
+        "Order Date": order_date,
+        "Ship Date": ship_date,
+        "Profit": profit,
+        "QtyOrdered": quantity.astype(np.int64),
+        "Sales": sales,
+    })
+    return frame[COLUMNS]
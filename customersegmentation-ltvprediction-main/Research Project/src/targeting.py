@@ -0,0 +1,135 @@
+# src/targeting.py
+from __future__ import annotations
+
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.results_store import write_artifact
+
+# Above this many candidates the top-k threshold is found by bucketed counting
+BUCKET_SEARCH_MIN_ROWS = 5_000_000
+
+
+def _bucket_threshold(values: np.ndarray, k: int, n_buckets: int = 4096) -> float:
+    """
+    Lower edge of the histogram bucket holding the k-th largest value. Every value at
+    or above it is a candidate, so the exact top-k needs only a partition of that subset.
+    """
+    lo, hi = float(values.min()), float(values.max())
+    if lo == hi:
+        return lo
+    counts, edges = np.histogram(values, bins=n_buckets, range=(lo, hi))
+    from_top = np.cumsum(counts[::-1])
+    bucket = n_buckets - 1 - int(np.searchsorted(from_top, k))
+    return float(edges[max(bucket, 0)])
+
+
+def top_k_indices(values: np.ndarray, k: int, method: str = "auto") -> np.ndarray:
+    """
+    Positions of the k largest values, ordered from largest to smallest.
+
+    `partition` uses np.argpartition (linear time) and sorts only the k winners.
+    `bucket` first narrows the candidates with a histogram threshold, which keeps the
+    partition small when n is very large and k is comparatively small.
+    """
+    values = np.asarray(values)
+    k = int(min(max(k, 0), len(values)))
+    if k == 0:
+        return np.empty(0, dtype=np.int64)
+    if method == "auto":
+        method = "bucket" if len(values) >= BUCKET_SEARCH_MIN_ROWS else "partition"
+
+    if method == "bucket":
+        candidates = np.flatnonzero(values >= _bucket_threshold(values, k))
+    else:
+        candidates = np.arange(len(values))
+    sub = values[candidates]
+    if k < len(sub):
+        keep = np.argpartition(-sub, k - 1)[:k]
+        candidates, sub = candidates[keep], sub[keep]
+    return candidates[np.argsort(-sub, kind="stable")]
+
+
+def _quota_candidates(value: np.ndarray, clusters: np.ndarray, quotas: Dict, k: int) -> np.ndarray:
+    """
+    Per-cluster top-`quota` pools (clusters without a quota contribute up to k).
+    Any optimal selection under per-cluster caps is drawn from these pools.
+    """
+    pools = []
+    for cluster in np.unique(clusters):
+        members = np.flatnonzero(clusters == cluster)
+        cap = min(int(quotas.get(cluster, k)), k)
+        pools.append(members[top_k_indices(value[members], cap, method="partition")])
+    return np.concatenate(pools) if pools else np.empty(0, dtype=np.int64)
+
+
+def optimize_campaign_targets(df: pd.DataFrame, budget: float, cost_per_contact: float,
+                              cluster_quotas: Optional[Dict] = None, roi_curve_points: int = 50,
+                              method: str = "auto") -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Choose whom to contact so that expected incremental value (uplift x CLV) net of
+    contact cost is maximised under a contact budget.
+
+    Only customers whose expected incremental value exceeds the contact cost are
+    eligible. `cluster_quotas` maps cluster -> maximum contacts in that cluster.
+    Returns (selected customers in descending value order, ROI curve by budget).
+    The selection for any smaller budget is a prefix of the returned list, so the
+    ROI curve is a cumulative sum over it.
+    """
+    value = (pd.to_numeric(df["uplift"], errors="coerce").fillna(0).to_numpy(dtype=np.float64)
+             * pd.to_numeric(df["CLV"], errors="coerce").fillna(0).to_numpy(dtype=np.float64))
+    max_contacts = int(budget // cost_per_contact) if cost_per_contact > 0 else len(df)
+
+    eligible = np.flatnonzero(value > cost_per_contact)
+    if cluster_quotas and "cluster" in df.columns:
+        clusters = df["cluster"].to_numpy()[eligible]
+        eligible = eligible[_quota_candidates(value[eligible], clusters, cluster_quotas, max_contacts)]
+    chosen = eligible[top_k_indices(value[eligible], max_contacts, method=method)]
+
+    columns = [c for c in ("customer_id", "cluster", "uplift", "CLV") if c in df.columns]
+    selected = df.iloc[chosen][columns].reset_index(drop=True)
+    selected.insert(0, "rank", np.arange(1, len(selected) + 1))
+    selected["expected_incremental_value"] = value[chosen]
+    selected["net_value"] = value[chosen] - cost_per_contact
+    selected["cumulative_spend"] = selected["rank"] * cost_per_contact
+
+    cum_value = np.cumsum(value[chosen])
+    contacts = np.unique(np.linspace(1, len(chosen), min(roi_curve_points, len(chosen))).astype(int))
+    spend = contacts * cost_per_contact
+    incremental = cum_value[contacts - 1] if len(chosen) else np.empty(0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        roi = np.where(spend > 0, (incremental - spend) / spend, np.nan)
+    roi_curve = pd.DataFrame({
+        "budget": spend,
+        "contacts": contacts,
+        "expected_incremental_value": incremental,
+        "net_value": incremental - spend,
+        "roi": roi,
+    })
+    return selected, roi_curve
+
+
+def run_campaign_targeting(df: pd.DataFrame, config: dict):
+    """
+    Targeting stage: select customers for the configured budget and save the list
+    and the ROI curve to the results store.
+    """
+    selected, roi_curve = optimize_campaign_targets(
+        df,
+        budget=config["budget"],
+        cost_per_contact=config["cost_per_contact"],
+        cluster_quotas=config.get("cluster_quotas"),
+        roi_curve_points=config.get("roi_curve_points", 50),
+    )
+
+    write_artifact("campaign_targets", selected)
+    write_artifact("campaign_roi_curve", roi_curve)
+    if selected.empty:
+        print("No customers have expected incremental value above the contact cost.")
+    else:
+        last = roi_curve.iloc[-1]
+        print(f"Campaign targets saved: {len(selected)} contacts, spend {last['budget']:,.0f}, "
+              f"expected incremental value {last['expected_incremental_value']:,.0f} (ROI {last['roi']:.2f})")
+    return selected, roi_curve
@@ -1,66 +1,202 @@
 # src/uplift.py
+from __future__ import annotations
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
-from sklearn.model_selection import train_test_split
+from sklearn.model_selection import StratifiedKFold
 from sklearn.ensemble import RandomForestClassifier
-from src.ltv_prediction import predict_ltv
 
-from src.dashboard_utils import RESULTS_DIR
-from src.data_preprocessing import load_and_clean_data, calculate_rfm  # <- Added
+from src.results_store import write_artifact
+from src.shared_arrays import published, run_attached
+from src.uplift_evaluation import evaluate_uplift, save_uplift_evaluation
+
+
+def _new_forest() -> RandomForestClassifier:
+    # n_jobs=1: parallelism comes from the fold pool, not from inside each forest
+    return RandomForestClassifier(n_estimators=100, random_state=42, n_jobs=1)
+
+
+def _arm_probability(X_train: np.ndarray, y_train: np.ndarray, X_score: np.ndarray):
+    """
+    Fit one arm (treatment or control) and return P(response=1) for X_score.
+    A training split with a single class predicts that class as a constant.
+    """
+    classes = np.unique(y_train)
+    if len(classes) < 2:
+        return np.full(len(X_score), float(classes[0]) if len(classes) else 0.0), None
+    clf = _new_forest()
+    clf.fit(X_train, y_train)
+    return clf.predict_proba(X_score)[:, 1], clf
+
+
+def _fit_fold(X: np.ndarray, y: np.ndarray, treated: np.ndarray, folds: np.ndarray, fold: int):
+    """
+    Train both arms on every fold except `fold` and score the held-out rows.
+    Returns (held-out row positions, uplift, treatment-arm feature importances).
+    """
+    test = np.flatnonzero(folds == fold)
+    train = folds != fold
+    t_mask = train & treated
+    c_mask = train & ~treated
+    prob_treat, clf_treat = _arm_probability(X[t_mask], y[t_mask], X[test])
+    prob_ctrl, _ = _arm_probability(X[c_mask], y[c_mask], X[test])
+    importances = clf_treat.feature_importances_ if clf_treat is not None else np.zeros(X.shape[1])
+    return test, prob_treat - prob_ctrl, importances
+
+
+def _fit_fold_shared(views, fold: int):
+    """Process-pool entry point (via run_attached): `_fit_fold` over zero-copy views of the parent's arrays."""
+    return _fit_fold(views["X"], views["y"], views["treated"], views["folds"], fold)
+
+
+def cross_fit_uplift(X: np.ndarray, y: np.ndarray, treated: np.ndarray,
+                     n_folds: int = 5, n_jobs: int | None = None, random_state: int = 42,
+                     shared_backend: str = "shared_memory"):
+    """
+    Out-of-fold T-learner uplift: every row is scored by treatment/control forests
+    that were trained without it.
+
+    Folds are stratified on (treatment, response) and fitted in parallel worker
+    processes. Features, targets and fold ids are published once (src.shared_arrays,
+    `shared_backend` "shared_memory" or "memmap") so workers read them in place
+    instead of receiving a pickled copy per fold.
+    Returns (uplift per row, mean treatment-arm feature importances).
+    """
+    X = np.ascontiguousarray(X, dtype=np.float64)
+    y = np.ascontiguousarray(y, dtype=np.int8)
+    treated = np.ascontiguousarray(treated, dtype=bool)
+
+    strata = treated.astype(np.int8) * 2 + y
+    n_folds = max(2, min(n_folds, int(np.bincount(strata).max())))
+    skf = StratifiedKFold(n_splits=n_folds, shuffle=True, random_state=random_state)
+    folds = np.empty(len(y), dtype=np.int32)
+    # StratifiedKFold warns (but still splits) when a stratum is smaller than n_folds
+    for fold, (_, test) in enumerate(skf.split(np.zeros(len(y)), strata)):
+        folds[test] = fold
+
+    n_jobs = n_jobs if n_jobs and n_jobs > 0 else (os.cpu_count() or 1)
+    n_workers = min(n_jobs, n_folds)
+
+    if n_workers == 1:
+        results = [_fit_fold(X, y, treated, folds, fold) for fold in range(n_folds)]
+    else:
+        arrays = {"X": X, "y": y, "treated": treated, "folds": folds}
+        with published(arrays, backend=shared_backend) as specs, ProcessPoolExecutor(max_workers=n_workers) as pool:
+            results = list(pool.map(run_attached, repeat(_fit_fold_shared), repeat(specs), range(n_folds)))
+
+    uplift = np.empty(len(y), dtype=np.float64)
+    for test, fold_uplift, _ in results:
+        uplift[test] = fold_uplift
+    importances = np.mean([imp for _, _, imp in results], axis=0)
+    return uplift, importances
+
 
-def run_uplift_modeling(raw_file_path: str):
+UPLIFT_EXCLUDED = ["customer_id", "treatment_group", "response", "uplift"]
+
+
+def uplift_features(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Model features of a customer frame: every column but the id, assignment, response
+    and uplift, categoricals one-hot encoded, non-finite values (e.g. inf purchases) as 0.
+    """
+    X = df[[c for c in df.columns if c not in UPLIFT_EXCLUDED]].copy()
+    X = pd.get_dummies(X, drop_first=True)
+    return X.astype(float).replace([np.inf, -np.inf], np.nan).fillna(0.0)
+
+
+def fit_uplift_arms(X: pd.DataFrame, y, treated) -> dict:
+    """
+    Treatment and control forests fitted on all customers, for scoring new ones
+    (run_uplift_modeling's scores stay out-of-fold). An arm with a single response
+    class is kept as that constant probability.
+    """
+    y, treated = np.asarray(y), np.asarray(treated, dtype=bool)
+    arms = {}
+    for arm, mask in (("treatment", treated), ("control", ~treated)):
+        constant, clf = _arm_probability(X[mask], y[mask], X.iloc[:1])
+        arms[arm] = clf if clf is not None else float(constant[0])
+    return arms
+
+
+def predict_uplift(arms: dict, X: pd.DataFrame) -> np.ndarray:
+    """P(response | treated) - P(response | control) from fit_uplift_arms' arms."""
+    def probability(arm):
+        return np.full(len(X), arm) if isinstance(arm, float) else arm.predict_proba(X)[:, 1]
+    return probability(arms["treatment"]) - probability(arms["control"])
+
+
+def run_uplift_modeling(data, config: dict | None = None, assignment: pd.DataFrame | None = None):
     """
     Uplift modeling to predict which customers are most likely to respond to a campaign.
 
+    `data` is either the path to the raw transaction file or a customer-level frame
+    that already carries CLV (e.g. `rfm_with_id` from main.py). `config` is the
+    `uplift` section of config.yaml; with `cross_fit` enabled (the default) every
+    customer's uplift comes from models that never saw that customer.
+    `assignment` (indexed by customer_id, from `build_treatment_response`) supplies
+    observed treatment_group/response; without it both are simulated.
+
     Steps:
     1. Load and preprocess raw transaction data
     2. Calculate RFM features (recency, frequency, monetary value)
     3. Assign treatment/control group
     4. Split dataset into features and target
-    5. Train separate models for treatment and control
+    5. Train separate models for treatment and control (K-fold cross-fitted)
     6. Compute uplift score per customer
-    7. Evaluate model using AUUC / baseline comparison
-    8. Visualize top responders and feature importance
+    7. Evaluate with Qini / uplift curves, AUUC and bootstrap bands
+    8. Save top-responder and feature-importance figures to `figure_dir` (output/figures)
     """
+    config = config or {}
 
     # -----------------------
     # Step 1: Load and preprocess data
     # -----------------------
-    transaction_data = load_and_clean_data(raw_file_path)
-    rfm = calculate_rfm(transaction_data)
-    
-    ltv_config={'penalizer_coef_bgf' :0.0,
-                
-                'penalizer_coef_ggf': 0.0,
-                
-                'prediction_period_months':6,
-                
-                'monthly_discount_rate': 0.01
-                    }
-    rfm=predict_ltv(rfm,config=ltv_config)
-
-    df = rfm.reset_index().rename(columns={'index': 'customer_id'})  # Add customer_id column
+    if isinstance(data, pd.DataFrame):
+        df = data.copy()
+        if "customer_id" not in df.columns:
+            df = df.reset_index().rename(columns={"index": "customer_id"})
+    else:
+        from src.data_preprocessing import load_and_clean_data, calculate_rfm
+        from src.ltv_prediction import predict_ltv
+        transaction_data = load_and_clean_data(data)
+        rfm = calculate_rfm(transaction_data)
+
+        ltv_config={'penalizer_coef_bgf' :0.0,
+
+                    'penalizer_coef_ggf': 0.0,
+
+                    'prediction_period_months':6,
+
+                    'monthly_discount_rate': 0.01
+                        }
+        rfm=predict_ltv(rfm,config=ltv_config)
+
+        df = rfm.reset_index().rename(columns={'index': 'customer_id'})  # Add customer_id column
 
     # -----------------------
     # Step 2: Assign treatment/control groups
     # -----------------------
-    np.random.seed(42)
-    df["treatment_group"] = np.where(np.random.rand(len(df)) < 0.5,"Treatment","Control")
+    if assignment is not None:
+        # Real assignment from campaign exposure logs (see src/campaign_exposure.py)
+        observed = assignment.reindex(df["customer_id"])
+        df["treatment_group"] = observed["treatment_group"].fillna("Control").to_numpy()
+        df["response"] = observed["response"].fillna(0).astype(int).to_numpy()
+    else:
+        np.random.seed(42)
+        df["treatment_group"] = np.where(np.random.rand(len(df)) < 0.5,"Treatment","Control")
 
-    # Step 2b: Define target (response)
-    df["response"] =((df["CLV"]>df["CLV"].median()) | (np.random.rand(len(df))<0.2)).astype(int)
+        # Step 2b: Define target (response)
+        df["response"] =((df["CLV"]>df["CLV"].median()) | (np.random.rand(len(df))<0.2)).astype(int)
     # -----------------------
     # Step 3: Prepare features
     # -----------------------
-    feature_cols = [c for c in df.columns if c not in ["customer_id", "treatment_group", "response"]]
-    X = df[feature_cols].copy()
+    X = uplift_features(df)
     y = df["response"]
 
-    # One-hot encode categorical features
-    X = pd.get_dummies(X, drop_first=True)
-
     treat_idx = df[df["treatment_group"] == "Treatment"].index
     ctrl_idx = df[df["treatment_group"] == "Control"].index
 
@@ -76,61 +212,88 @@ def run_uplift_modeling(raw_file_path: str):
         return df
 
     # -----------------------
-    # Step 4: Train separate models
+    # Step 4-5: Train separate models and compute uplift scores
     # -----------------------
-    clf_treat = RandomForestClassifier(n_estimators=100, random_state=42)
-    clf_ctrl = RandomForestClassifier(n_estimators=100, random_state=42)
+    if config.get("cross_fit", True):
+        uplift, feature_importance = cross_fit_uplift(
+            X.to_numpy(),
+            y.to_numpy(),
+            (df["treatment_group"] == "Treatment").to_numpy(),
+            n_folds=config.get("n_folds", 5),
+            n_jobs=config.get("n_jobs"),
+            random_state=config.get("random_state", 42),
+            shared_backend=config.get("shared_backend", "shared_memory"),
+        )
+    else:
+        # Legacy in-sample scoring: both arms score the customers they were trained on
+        clf_treat = _new_forest()
+        clf_ctrl = _new_forest()
 
-    clf_treat.fit(X_treat, y_treat)
-    clf_ctrl.fit(X_ctrl, y_ctrl)
+        clf_treat.fit(X_treat, y_treat)
+        clf_ctrl.fit(X_ctrl, y_ctrl)
 
-    # -----------------------
-    # Step 5: Compute uplift scores
-    # -----------------------
-    prob_treat = clf_treat.predict_proba(X)[:, 1]
-    prob_ctrl = clf_ctrl.predict_proba(X)[:, 1]
+        prob_treat = clf_treat.predict_proba(X)[:, 1]
+        prob_ctrl = clf_ctrl.predict_proba(X)[:, 1]
+        uplift = prob_treat - prob_ctrl
+        feature_importance = clf_treat.feature_importances_
 
-    df["uplift"] = (prob_treat - prob_ctrl).round(3)
+    df["uplift"] = np.round(uplift, 3)
 
     # -----------------------
     # Step 6: Evaluate uplift
     # -----------------------
     top20 = df.sort_values("uplift", ascending=False).head(20)
 
-    plt.figure(figsize=(10,6))
+    import matplotlib
+    matplotlib.use("Agg")  # figures are only written to files; never open a GUI window
+    import matplotlib.pyplot as plt  # plotting stack loaded only when a model is run
+    import seaborn as sns
+    figure_dir = config.get("figure_dir", "output/figures")
+    os.makedirs(figure_dir, exist_ok=True)
+    fig = plt.figure(figsize=(10,6))
     sns.barplot(x="customer_id", y="uplift", data=top20)
     plt.title("Top 20 Customers by Predicted Uplift")
     plt.xticks(rotation=45)
     plt.ylabel("Predicted Uplift")
     plt.tight_layout()
-    plt.show()
+    fig.savefig(os.path.join(figure_dir, "uplift_top20.png"))
+    plt.close(fig)
 
-    top20_sum = top20["uplift"].sum()
-    random20_sum = df.sample(20, random_state=42)["uplift"].sum()
-    print(f"Total predicted uplift (Top 20): {top20_sum:.3f}")
-    print(f"Total predicted uplift (Random 20): {random20_sum:.3f}")
-    print(f"Improvement over baseline: {top20_sum - random20_sum:.3f}")
+    evaluation = evaluate_uplift(
+        uplift,
+        (df["treatment_group"] == "Treatment").to_numpy(),
+        y.to_numpy(),
+        n_bootstrap=config.get("n_bootstrap", 200),
+        random_state=config.get("random_state", 42),
+    )
+    save_uplift_evaluation(evaluation)
+    eval_metrics = evaluation["metrics"]
+    print(f"AUUC: {eval_metrics['auuc']:.4f} "
+          f"[{eval_metrics['auuc_lower']:.4f}, {eval_metrics['auuc_upper']:.4f}]")
+    print(f"Qini coefficient: {eval_metrics['qini_coefficient']:.4f} "
+          f"[{eval_metrics['qini_coefficient_lower']:.4f}, {eval_metrics['qini_coefficient_upper']:.4f}]")
 
     # -----------------------
     # Step 7: Feature importance
     # -----------------------
     importances = pd.DataFrame({
         "feature": X.columns,
-        "importance": clf_treat.feature_importances_
+        "importance": feature_importance
     }).sort_values(by="importance", ascending=False)
 
-    plt.figure(figsize=(12,6))
+    fig = plt.figure(figsize=(12,6))
     sns.barplot(x="importance", y="feature", data=importances.head(15))
     plt.title("Top 15 Features Influencing Treatment Response")
     plt.tight_layout()
-    plt.show()
+    fig.savefig(os.path.join(figure_dir, "uplift_feature_importance.png"))
+    plt.close(fig)
 
     # -----------------------
     # Step 8: Save results
     # -----------------------
-    RESULTS_DIR.mkdir(parents=True, exist_ok=True)
-    path = RESULTS_DIR / "uplift_results.csv"
-    df[["customer_id", "response", "uplift", "treatment_group", "CLV"]].to_csv(path, index=False)
+    output_cols = ["customer_id", "response", "uplift", "treatment_group", "CLV"]
+    output_cols += [c for c in ("cluster", "churn_probability") if c in df.columns]
+    path = write_artifact("uplift_results", df[output_cols])
     print(f"Uplift results saved: {path}")
 
     return df
@@ -1,7 +1,28 @@
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import matplotlib
+matplotlib.use("Agg")  # figures are only written to files; never open a GUI window
 import matplotlib.pyplot as plt
 import seaborn as sns
 
-def plot_rfm(rfm, output_path):
+import src.segmentation
+from src.stage_cache import code_version, hash_value
+
+# Render settings (`visualization` config section)
+MAX_ROWS = 50_000          # scatter/histogram inputs above this are sampled
+ELBOW_MAX_ROWS = 20_000    # rows the elbow KMeans sweep is fitted on
+RENDER_MANIFEST = ".render_hashes.json"
+
+
+def _sample_note(shown, total):
+    return f" (sample of {shown:,} / {total:,})" if shown < total else ""
+
+
+def plot_rfm(rfm, output_path, total_rows=None):
     """
     Plot distributions of RFM metrics.
     Saves plot to output_path.
@@ -10,46 +31,59 @@ def plot_rfm(rfm, output_path):
     sns.histplot(rfm['frequency'], ax=axes[0], kde=True).set_title('Frequency')
     sns.histplot(rfm['recency'], ax=axes[1], kde=True).set_title('Recency')
     sns.histplot(rfm['T'], ax=axes[2], kde=True).set_title('T')
+    note = _sample_note(len(rfm), total_rows or len(rfm))
+    if note:
+        fig.suptitle(note.strip(" ()").capitalize())
     plt.tight_layout()
     plt.savefig(output_path)
     plt.close()
 
-def plot_elbow(rfm, output_path):
+def plot_elbow(rfm, output_path, total_rows=None):
     """
     Plot elbow curve for K-Means clustering.
     Saves plot to output_path.
     """
     from src.segmentation import get_elbow_data
     inertia = get_elbow_data(rfm)
+    plt.figure()
     plt.plot(range(1, 8), inertia)
     plt.xlabel("Number of Clusters")
     plt.ylabel("Inertia")
-    plt.title("Elbow Method for Optimal Number of Clusters")
+    plt.title("Elbow Method for Optimal Number of Clusters" + _sample_note(len(rfm), total_rows or len(rfm)))
     plt.savefig(output_path)
     plt.close()
 
-def plot_clusters(rfm, output_path):
+def plot_clusters(rfm, output_path, total_rows=None, hexbin=False):
     """
     Plot scatter of recency vs frequency, colored by cluster.
+    With hexbin, plot the density of every point instead (for very large inputs).
     Saves plot to output_path.
     """
     plt.figure(figsize=(10, 6))
-    sns.scatterplot(x='recency', y='frequency', hue='cluster', data=rfm, palette='viridis', size='monetary_value')
-    plt.title("Segments based on RFM (City-based)")
+    if hexbin:
+        plt.hexbin(rfm['recency'], rfm['frequency'], gridsize=60, bins='log', mincnt=1, cmap='viridis')
+        plt.colorbar(label='log10(count)')
+        plt.xlabel('recency')
+        plt.ylabel('frequency')
+        plt.title("Customer density by recency and frequency")
+    else:
+        sns.scatterplot(x='recency', y='frequency', hue='cluster', data=rfm, palette='viridis', size='monetary_value')
+        plt.title("Segments based on RFM (City-based)" + _sample_note(len(rfm), total_rows or len(rfm)))
     plt.savefig(output_path)
     plt.close()
 
-def plot_clv(rfm, output_path):
+def plot_clv(rfm, output_path, total_rows=None):
     """
     Plot distribution of CLV.
     Saves plot to output_path.
     """
+    plt.figure()
     sns.histplot(rfm['CLV'], kde=True)
-    plt.title("Distribution of Lifetime Value")
+    plt.title("Distribution of Lifetime Value" + _sample_note(len(rfm), total_rows or len(rfm)))
     plt.savefig(output_path)
     plt.close()
 
-def plot_clv_by_cluster(rfm, output_path):
+def plot_clv_by_cluster(rfm, output_path, total_rows=None):
     """
     Plot average CLV per cluster.
     Saves plot to output_path.
@@ -61,4 +95,100 @@ def plot_clv_by_cluster(rfm, output_path):
     plt.xlabel("Cluster")
     plt.ylabel("Average CLV")
     plt.savefig(output_path)
-    plt.close()
\ No newline at end of file
+    plt.close()
+
+
+# file name -> (plot function, columns it reads, how large inputs are reduced)
+FIGURES = {
+    'rfm_distributions.png': (plot_rfm, ['frequency', 'recency', 'T'], 'sample'),
+    'elbow_plot.png': (plot_elbow, ['recency', 'frequency', 'monetary_value'], 'elbow'),
+    'cluster_scatter.png': (plot_clusters, ['recency', 'frequency', 'cluster', 'monetary_value'], 'stratified'),
+    'clv_distribution.png': (plot_clv, ['CLV'], 'sample'),
+    'clv_by_cluster.png': (plot_clv_by_cluster, ['cluster', 'CLV'], 'aggregate'),
+}
+
+
+def stratified_sample(df, n, by='cluster', random_state=42):
+    """About n rows, sampled per `by` group in proportion to its size (every group kept)."""
+    if len(df) <= n:
+        return df
+    groups = df.groupby(by, observed=True)
+    sampled = groups.sample(frac=n / len(df), random_state=random_state)
+    return df.loc[sampled.index.union(groups.head(1).index)]
+
+
+def figure_input(rfm, name, max_rows=MAX_ROWS, elbow_max_rows=ELBOW_MAX_ROWS, scatter='sample'):
+    """
+    The reduced frame a figure is drawn from, so drawing cost is bounded by `max_rows`
+    whatever the customer count: histograms and the elbow sweep use a seeded random
+    sample, the cluster scatter a per-cluster sample (or every point when drawn as a
+    hexbin), the cluster bar chart the per-cluster means.
+    Returns (frame, plot kwargs).
+    """
+    _, columns, reduce = FIGURES[name]
+    data = rfm[[c for c in columns if c in rfm.columns]]
+    kwargs = {'total_rows': len(rfm)}
+    if reduce == 'aggregate':
+        data = data.groupby('cluster', as_index=False)['CLV'].mean()
+        kwargs = {}
+    elif reduce == 'stratified' and scatter == 'hexbin' and len(data) > max_rows:
+        data = data[['recency', 'frequency']]
+        kwargs['hexbin'] = True
+    elif reduce == 'stratified':
+        data = stratified_sample(data, max_rows)
+    else:
+        limit = elbow_max_rows if reduce == 'elbow' else max_rows
+        if len(data) > limit:
+            data = data.sample(limit, random_state=42)
+    return data, kwargs
+
+
+def _render(name, data, kwargs, output_path):
+    FIGURES[name][0](data, output_path, **kwargs)
+    return name
+
+
+def render_figures(rfm, output_dir='output/figures', config=None):
+    """
+    Render every figure in FIGURES into output_dir. Each figure is drawn from its
+    reduced input (figure_input); a figure whose input hash (data, settings and this
+    module's code) matches the one recorded at its last render is left as is. The
+    rest are rendered in a process pool of `n_jobs` workers (in-process when 1).
+    Returns {file name: "rendered" | "unchanged"}.
+    """
+    config = config or {}
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    manifest_path = output_dir / RENDER_MANIFEST
+    try:
+        manifest = json.loads(manifest_path.read_text())
+    except (FileNotFoundError, json.JSONDecodeError):
+        manifest = {}
+
+    code = code_version(sys.modules[__name__], src.segmentation)  # the elbow sweep lives there
+    status, todo, hashes = {}, [], {}
+    for name in FIGURES:
+        data, kwargs = figure_input(rfm, name, max_rows=int(config.get('max_rows', MAX_ROWS)),
+                                    elbow_max_rows=int(config.get('elbow_max_rows', ELBOW_MAX_ROWS)),
+                                    scatter=config.get('scatter', 'sample'))
+        hashes[name] = hash_value([data, kwargs, code])
+        if manifest.get(name) == hashes[name] and (output_dir / name).exists():
+            status[name] = 'unchanged'
+        else:
+            todo.append((name, data, kwargs, str(output_dir / name)))
+
+    n_jobs = config.get('n_jobs', 2)
+    n_jobs = n_jobs if n_jobs and n_jobs > 0 else (os.cpu_count() or 1)
+    if n_jobs > 1 and len(todo) > 1:
+        with ProcessPoolExecutor(max_workers=min(n_jobs, len(todo))) as pool:
+            done = list(pool.map(_render, *zip(*todo)))
+    else:
+        done = [_render(*task) for task in todo]
+
+    for name in done:
+        status[name] = 'rendered'
+        manifest[name] = hashes[name]
+    tmp_path = manifest_path.with_name(f"{RENDER_MANIFEST}.{os.getpid()}.tmp")
+    tmp_path.write_text(json.dumps(manifest, indent=2))
+    os.replace(tmp_path, manifest_path)
+    return {name: status[name] for name in FIGURES}
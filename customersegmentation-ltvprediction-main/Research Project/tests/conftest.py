@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+from src import model_registry
+from src.churn import label_churn, train_churn_model
+from src.data_preprocessing import calculate_rfm, clean_raw_data
+from src.ltv_prediction import fit_ltv_models, predict_ltv
+from src.ml_clv import train_clv_model
+from src.segmentation import SEGMENT_FEATURES, fit_clustering
+from src.synthetic_data import generate_transactions
+from src.uplift import fit_uplift_arms, uplift_features
+
+LTV_CONFIG = {'penalizer_coef_bgf': 0.001, 'penalizer_coef_ggf': 0.0, 'monthly_discount_rate': 0.01,
+              'prediction_period_months': 12, 'fit_tol': 1e-5}
+
+
+@pytest.fixture
+def published_models(tmp_path):
+    """
+    Every scoring model fitted on a small synthetic run, saved and published as registry
+    version "run-1" under tmp_path. Yields (rfm with the pipeline's scores, {registry name: model}).
+    """
+    model_registry.configure({"dir": str(tmp_path / "models")})
+    transactions = clean_raw_data(generate_transactions(3000, customers=300, seed=2))
+    rfm = calculate_rfm(transactions)
+    scaler, kmeans = fit_clustering(rfm, 3)
+    rfm['cluster'] = kmeans.labels_.astype(int)
+    bgf, ggf = fit_ltv_models(rfm, LTV_CONFIG)
+    rfm = predict_ltv(rfm, LTV_CONFIG, models=(bgf, ggf))
+    clv_model, clv_metrics = train_clv_model(rfm)
+    clf, churn_metrics = train_churn_model(rfm, label_churn(transactions))
+    X = uplift_features(rfm)
+    treated = np.arange(len(rfm)) % 2 == 0
+    arms = fit_uplift_arms(X, (rfm['CLV'] > rfm['CLV'].median()).astype(int), treated)
+
+    save = model_registry.save_model
+    save("segment_scaler", scaler, "run-1", SEGMENT_FEATURES)
+    save("segment_model", kmeans, "run-1", SEGMENT_FEATURES)
+    save("bgnbd", bgf, "run-1", ['frequency', 'recency', 'T'], LTV_CONFIG)
+    save("gamma_gamma", ggf, "run-1", ['frequency', 'monetary_value'], LTV_CONFIG)
+    save("clv_gbm", clv_model, "run-1", list(clv_model.feature_names_in_), metrics=clv_metrics)
+    save("churn_gbm", clf, "run-1", list(clf.feature_names_in_), metrics=churn_metrics)
+    save("uplift_arms", arms, "run-1", list(X.columns))
+    model_registry.publish("run-1")
+    yield rfm, {"segment_scaler": scaler, "segment_model": kmeans, "bgnbd": bgf, "gamma_gamma": ggf,
+                "clv_gbm": clv_model, "churn_gbm": clf, "uplift_arms": arms}
+    model_registry.configure({})
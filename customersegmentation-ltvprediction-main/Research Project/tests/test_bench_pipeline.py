@@ -0,0 +1,53 @@
+from benchmarks import bench_pipeline
+from benchmarks.bench_pipeline import compare, run_size
+from src import instrumentation
+
+
+def test_compare_flags_slowdowns_above_threshold_and_noise_floor():
+    baseline = [{"rows": 1000, "stage": "rfm", "status": "ok", "wall_seconds": 1.0, "tracemalloc_peak_mb": 10.0},
+                {"rows": 1000, "stage": "ltv", "status": "ok", "wall_seconds": 0.01},
+                {"rows": 1000, "stage": "nbo", "status": "ok", "wall_seconds": 1.0}]
+    results = [{"rows": 1000, "stage": "rfm", "status": "ok", "wall_seconds": 1.2, "tracemalloc_peak_mb": 20.0},
+               {"rows": 1000, "stage": "ltv", "status": "ok", "wall_seconds": 0.03},  # 3x, but within noise
+               {"rows": 1000, "stage": "nbo", "status": "failed", "error": "KeyError", "wall_seconds": 0.0},
+               {"rows": 10000, "stage": "rfm", "status": "ok", "wall_seconds": 9.0}]  # not in the baseline
+    regressions = compare(results, baseline, threshold=0.25, memory_threshold=0.5)
+    assert len(regressions) == 2
+    assert regressions[0].startswith("rfm @ 1,000 rows: tracemalloc_peak_mb")
+    assert regressions[1].startswith("nbo @ 1,000 rows: failed")
+
+
+def test_heap_peak_excludes_memory_left_by_earlier_stages(monkeypatch):
+    def hold(ctx, config):
+        ctx["held"] = bytearray(20_000_000)
+        return []
+
+    def small(ctx, config):
+        return bytearray(1_000_000)
+    monkeypatch.setattr(bench_pipeline, "STAGES", [("hold", hold), ("small", small)])
+    instrumentation.configure({"tracemalloc": True})
+    try:
+        held, small_record = run_size(200, {})
+    finally:
+        instrumentation.configure({})
+    assert held["tracemalloc_peak_mb"] >= 20
+    assert small_record["tracemalloc_peak_mb"] < 5
+
+
+def test_failed_stages_are_recorded_with_their_error(monkeypatch, capsys):
+    def broken(ctx, config):
+        raise KeyError("scores")
+
+    def after(ctx, config):
+        return ctx["scores"]
+    monkeypatch.setattr(bench_pipeline, "STAGES", [("broken", broken), ("after", after)])
+    records = run_size(200, {})
+    assert [(r["stage"], r["status"], r["error"]) for r in records] == [
+        ("broken", "failed", "KeyError: 'scores'"), ("after", "failed", "KeyError: 'scores'")]
+    assert "broken" in capsys.readouterr().out
+
+    def no_rows(rows_in):
+        raise TypeError("unsized input")
+    monkeypatch.setattr(bench_pipeline, "STAGES", [("broken", broken)])
+    monkeypatch.setattr(bench_pipeline, "profile_stage", lambda name, rows_in: no_rows(rows_in))
+    assert run_size(200, {})[0]["error"] == "TypeError: unsized input"
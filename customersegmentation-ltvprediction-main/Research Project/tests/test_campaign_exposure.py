@@ -0,0 +1,31 @@
+import pandas as pd
+from src.campaign_exposure import build_treatment_response
+
+def test_build_treatment_response_windows_and_last_touch():
+    transactions = pd.DataFrame({
+        'City': ['a', 'a', 'a', 'b', 'c', 'c'],
+        'Order Date': pd.to_datetime(['2023-01-05', '2023-01-20', '2023-03-01',
+                                      '2023-02-15', '2023-01-03', '2023-03-01']),
+        'Sales': [10.0, 20.0, 40.0, 5.0, 7.0, 9.0],
+    })
+    exposures = pd.DataFrame({
+        'customer_id': ['a', 'a', 'b', 'zz'],
+        'exposure_date': pd.to_datetime(['2023-01-01', '2023-01-15', '2023-01-01', '2023-01-01']),
+    })
+    result = build_treatment_response(exposures, transactions, customers=pd.Index(['a', 'b', 'c']),
+                                      response_window_days=30)
+
+    assert list(result['treatment_group']) == ['Treatment', 'Treatment', 'Control']
+    assert list(result['exposures']) == [2, 1, 0]
+    # a: 01-05 (first exposure) and 01-20 (second exposure) count once each; 03-01 is outside
+    assert result.loc['a', 'response_revenue'] == 30.0
+    # b: order on 02-15 falls outside its 30-day window
+    assert result.loc['b', 'response'] == 0
+    # c: control window starts at the first exposure day (01-01)
+    assert result.loc['c', 'response'] == 1
+    assert result.loc['c', 'response_revenue'] == 7.0
+
+    # columns are found by name, whatever their order
+    reordered = transactions.assign(Profit=-1.0)[['Profit', 'Sales', 'Order Date', 'City']]
+    pd.testing.assert_frame_equal(build_treatment_response(exposures, reordered, customers=pd.Index(['a', 'b', 'c']),
+                                                           response_window_days=30), result)
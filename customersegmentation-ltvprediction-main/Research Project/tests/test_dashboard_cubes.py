@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.dashboard_cubes import (
+    build_cubes,
+    customers_at_threshold,
+    leading_cluster,
+    view_histogram,
+    view_stats,
+    view_top,
+)
+
+
+def _scores(n=500, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "customer_id": [f"c{i}" for i in range(n)],
+        "frequency": rng.poisson(3, n).astype(float), "recency": rng.uniform(0, 500, n),
+        "monetary_value": rng.gamma(2, 100, n), "cluster": rng.integers(0, 3, n),
+        "CLV": rng.gamma(2, 200, n), "CLV_ML": rng.gamma(2, 210, n), "churn_probability": rng.uniform(0, 1, n),
+    })
+
+
+def test_cubes_match_the_full_table():
+    scores = _scores()
+    cubes = build_cubes(scores, {"top_n": 5})
+    cluster_1 = scores[scores["cluster"] == 1]
+
+    stats = view_stats(cubes, "1")
+    assert stats["customers"] == len(cluster_1)
+    assert stats["avg_clv"] == pytest.approx(cluster_1["CLV"].mean())
+    assert stats["clv_median"] == pytest.approx(cluster_1["CLV"].median())
+    assert view_stats(cubes)["high_risk_share"] == pytest.approx((scores["churn_probability"] > 0.6).mean())
+
+    assert view_histogram(cubes, "CLV")["count"].sum() == len(scores)
+    assert view_histogram(cubes, "churn_probability", "1")["count"].sum() == len(cluster_1)
+    assert set(view_histogram(cubes, "CLV", by_cluster=True)["cluster"]) == {0, 1, 2}
+
+    for threshold in (0.0, 0.35, 0.6, 1.0):
+        assert customers_at_threshold(cubes, threshold, "1") == (cluster_1["churn_probability"] >= threshold).sum()
+
+    top = view_top(cubes, "churn", "1")
+    assert list(top["customer_id"]) == list(cluster_1.nlargest(5, "churn_probability")["customer_id"])
+    assert view_top(cubes, "clv").iloc[0]["CLV"] == scores["CLV"].max()
+
+
+def test_cube_size_does_not_grow_with_customers():
+    small, large = build_cubes(_scores(200)), build_cubes(_scores(20_000))
+    for name in small:
+        assert len(large[name]) == len(small[name])
+
+
+def test_without_churn_scores():
+    cubes = build_cubes(_scores().drop(columns=["churn_probability"]))
+    assert "avg_churn_probability" not in view_stats(cubes)
+    assert cubes["cube_churn_thresholds"].empty
+    assert view_histogram(cubes, "churn_probability").empty
+
+
+def test_leading_cluster_skips_clusters_without_clv():
+    scores = _scores()
+    scores.loc[scores["cluster"] == 2, "CLV"] = np.nan
+    cubes = build_cubes(scores)
+    assert leading_cluster(cubes, ["2"]) is None
+    means = scores.groupby("cluster")["CLV"].mean()
+    assert leading_cluster(cubes, ["0", "1", "2"])["view"] == str(means.idxmax())
+    assert view_top(cubes, "clv", "2").empty and not view_top(cubes, "churn", "2").empty
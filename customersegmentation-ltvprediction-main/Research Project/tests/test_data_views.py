@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src import data_views, results_store
+from src.data_views import downsample, export_selection, query_page, scatter_points, selection_filters
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(results_store, "STORE_DIR", tmp_path / "store")
+    monkeypatch.setattr(data_views, "RESULTS_DIR", tmp_path)
+    rng = np.random.default_rng(0)
+    n = 1_000
+    scores = pd.DataFrame({
+        "customer_id": [f"c{i}" for i in range(n)], "cluster": rng.integers(0, 4, n),
+        "CLV": rng.gamma(2, 200, n), "churn_probability": rng.uniform(0, 1, n),
+    })
+    run_id = results_store.start_run()
+    results_store.write_artifact("scores", scores, run_id=run_id)
+    results_store.publish_run(run_id)
+    return scores
+
+
+def test_pages_are_sorted_filtered_slices(store):
+    expected = store[(store["cluster"] == 2) & (store["churn_probability"] >= 0.5)]
+    expected = expected.sort_values("churn_probability", ascending=False, kind="stable")
+    filters = selection_filters(cluster=2, churn_probability=(">=", 0.5))
+
+    page, total = query_page("scores", page=1, page_size=20, sort_by="churn_probability",
+                             columns=["customer_id", "churn_probability"], filters=filters)
+    assert total == len(expected)
+    assert list(page.columns) == ["customer_id", "churn_probability"]
+    assert list(page["customer_id"]) == list(expected["customer_id"].iloc[20:40])
+
+    assert query_page("missing")[1] == 0
+
+
+def test_export_writes_the_full_selection(store, tmp_path):
+    filters = selection_filters(cluster=1)
+    for fmt in ("csv", "parquet"):
+        path = export_selection("scores", fmt, sort_by="CLV", filters=filters, export_dir=tmp_path / "exports")
+        exported = pd.read_csv(path) if fmt == "csv" else pd.read_parquet(path)
+        assert len(exported) == (store["cluster"] == 1).sum()
+        assert exported["CLV"].is_monotonic_decreasing
+
+
+def test_downsample_keeps_clusters_and_outliers():
+    rng = np.random.default_rng(1)
+    n = 20_000
+    df = pd.DataFrame({"x": rng.normal(size=n), "y": rng.normal(size=n),
+                       "cluster": np.r_[np.zeros(n - 2, int), [1, 2]]})
+    df.loc[123, "x"] = 1e6
+
+    points = downsample(df, budget=1_000, outlier_columns=["x", "y"])
+    assert len(points) <= 1_010
+    assert {0, 1, 2} <= set(points["cluster"])
+    assert 123 in points.index
+    assert points["y"].max() == df["y"].max()
+
+
+def test_scatter_points_reports_the_total(store):
+    points, total = scatter_points("scores", ["CLV", "churn_probability", "cluster"], budget=100,
+                                   outlier_columns=["CLV"])
+    assert total == len(store) and len(points) <= 110
@@ -0,0 +1,19 @@
+import pandas as pd
+from src.forecasting import forecast_panel, wide_to_long
+
+def test_forecast_panel_long_and_wide():
+    df = pd.DataFrame({'customer_id': ['A', 'B', 'C'], 'CLV': [1000.0, 0.0, 250.4]})
+    long = forecast_panel(df, days=3, base_date=pd.Timestamp('2024-01-01'))
+
+    # B has no positive CLV and is skipped
+    assert len(long) == 6
+    assert list(long['customer_id'].astype(str).unique()) == ['A', 'C']
+    assert list(long['date'].astype(str)[:3]) == ['2024-01-01', '2024-01-02', '2024-01-03']
+    assert list(long['historical_clv'][:3]) == [1000, 1001, 1002]
+    assert list(long['forecast_clv'][:3]) == [1050, 1051, 1052]
+
+    wide = forecast_panel(df, days=3, base_date=pd.Timestamp('2024-01-01'), layout='wide')
+    assert wide.shape == (2, 7)
+    back = wide_to_long(wide)
+    assert back['forecast_clv'].tolist() == long['forecast_clv'].tolist()
+    assert back['historical_clv'].tolist() == long['historical_clv'].tolist()
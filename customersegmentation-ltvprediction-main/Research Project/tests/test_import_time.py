@@ -0,0 +1,15 @@
+from benchmarks.bench_import_time import import_statements, measure
+
+
+def test_entry_points_do_not_load_stage_dependencies():
+    # Stage modules are imported when their stage runs, not when main/dashboard start
+    for target in ("main", "dashboard"):
+        result = measure(target)
+        assert result["heavy"] == [], f"{target} loads {result['heavy']} at import"
+        assert result["import_seconds"] > 0
+
+
+def test_import_statements_of_a_script_skip_its_body():
+    code = import_statements("main")
+    assert "import yaml" in code and "def " not in code
+    assert import_statements("src.job_runner") == "import src.job_runner"
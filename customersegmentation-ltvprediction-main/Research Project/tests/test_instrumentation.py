@@ -0,0 +1,42 @@
+import pandas as pd
+import pytest
+
+from src import instrumentation
+from src.instrumentation import format_stage_table, profile_stage, stage_records
+
+
+@pytest.fixture(autouse=True)
+def _fresh(tmp_path):
+    instrumentation.configure({"profile_dir": str(tmp_path)})
+    instrumentation.reset()
+    yield
+    instrumentation.configure({})
+    instrumentation.reset()
+
+
+def test_profile_stage_records_measurements():
+    frame = pd.DataFrame({"x": range(10)})
+    with profile_stage("rfm", rows_in=frame) as stage:
+        stage["rows_out"] = frame.head(3)
+    (record,) = stage_records()
+    assert record["stage"] == "rfm" and record["status"] == "ok"
+    assert record["rows_in"] == 10 and record["rows_out"] == 3
+    assert record["wall_seconds"] >= 0 and record["cpu_seconds"] >= 0
+    assert "rfm" in format_stage_table([record])
+
+
+def test_failed_stage_is_recorded_and_reraised():
+    with pytest.raises(ValueError):
+        with profile_stage("nbo"):
+            raise ValueError("boom")
+    (record,) = stage_records()
+    assert record["status"] == "failed" and "boom" in record["error"]
+
+
+def test_cprofile_and_tracemalloc(tmp_path):
+    instrumentation.configure({"cprofile": True, "tracemalloc": True, "profile_dir": str(tmp_path)})
+    with profile_stage("plots", run_id="r1"):
+        [0] * 100_000
+    (record,) = stage_records()
+    assert (tmp_path / "r1" / "plots.prof").exists()
+    assert record["tracemalloc_peak_mb"] > 0
@@ -0,0 +1,50 @@
+import sys
+import time
+
+import pytest
+
+from src import job_runner
+
+
+@pytest.fixture(autouse=True)
+def _jobs_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(job_runner, "JOBS_DIR", tmp_path)
+
+
+def _wait(job_id, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        status = job_runner.job_status(job_id)
+        if status["state"] not in ("starting", "running"):
+            return status
+        time.sleep(0.1)
+    raise AssertionError("job did not finish")
+
+
+def test_one_job_per_dataset_with_progress(tmp_path):
+    script = (
+        "import time; from src.job_runner import progress_reporter; report = progress_reporter();"
+        "report({'event': 'run_started', 'stages': ['ingest', 'rfm']});"
+        "report({'event': 'stage_started', 'stage': 'ingest'}); time.sleep(1.5);"
+        "report({'event': 'stage_finished', 'stage': 'ingest', 'status': 'ok'});"
+        "report({'event': 'run_published', 'run_id': 'r1'})"
+    )
+    job = job_runner.start_job("retail", command=[sys.executable, "-c", script])
+    with pytest.raises(RuntimeError, match="already in progress"):
+        job_runner.start_job("retail", command=[sys.executable, "-c", "pass"])
+
+    status = _wait(job["job_id"])
+    assert status["state"] == "succeeded"
+    assert (status["stages_done"], status["stages_total"], status["run_id"]) == (1, 2, "r1")
+    assert job_runner.running_job("retail") is None
+    assert job_runner.latest_job("retail")["job_id"] == job["job_id"]
+
+    # the lock is released: a failing job can start and is reported as failed
+    failed = job_runner.start_job("retail", command=[sys.executable, "-c", "raise SystemExit(3)"])
+    assert _wait(failed["job_id"])["returncode"] == 3
+
+
+def test_stale_lock_is_replaced(tmp_path):
+    (tmp_path / "retail.lock").write_text('{"job_id": "old", "pid": 999999999, "started": "2024-01-01T00:00:00"}')
+    job = job_runner.start_job("retail", command=[sys.executable, "-c", "pass"])
+    assert _wait(job["job_id"])["state"] == "succeeded"
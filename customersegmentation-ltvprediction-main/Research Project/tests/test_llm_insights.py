@@ -0,0 +1,99 @@
+import asyncio
+import http.client
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+import pytest
+
+from src import llm_insights, llm_mock_server
+
+
+@pytest.fixture
+def server():
+    state, stats = dict(llm_insights._state), dict(llm_insights._stats)
+    server, url = llm_mock_server.start(latency=0.2)
+    llm_insights.configure({"base_url": url, "model": "mock-1", "cache_ttl": 60, "cache_entries": 2})
+    llm_insights._stats.update(requests=0, cache_hits=0, coalesced=0)
+    yield server
+    server.shutdown()
+    llm_insights.configure(state)
+    llm_insights._stats.update(stats)
+
+
+@pytest.fixture
+def df():
+    return pd.DataFrame({"customer_id": ["a", "b"], "CLV": [100.0, 300.0], "cluster": [0, 1],
+                         "churn_probability": [0.9, 0.1]})
+
+
+def test_answers_are_cached_per_question_and_snapshot(server, df):
+    answer = llm_insights.get_llm_insight("Which city is best?", df)
+    assert answer == "[mock mock-1] Question: Which city is best?"
+    assert llm_insights.get_llm_insight("  which city is BEST ", df) == answer
+    assert server.stats["requests"] == 1
+
+    llm_insights.get_llm_insight("Which city is best?", df.assign(CLV=[1.0, 2.0]))  # new snapshot
+    assert server.stats["requests"] == 2
+
+
+def test_identical_in_flight_questions_share_one_request(server, df):
+    answers = asyncio.run(llm_insights.ask_many(["churn?", "Churn", "clusters?"], df))
+    assert answers[0] == answers[1]
+    assert server.stats["requests"] == 2
+    assert llm_insights.stats()["coalesced"] == 1
+
+
+def test_connections_are_reused_and_cache_is_bounded(server, df):
+    for i in range(4):
+        llm_insights.get_llm_insight(f"question {i}", df)
+    assert server.stats["connections"] == 1
+    llm_insights.get_llm_insight("question 0", df)  # evicted (LRU of 2)
+    assert server.stats["requests"] == 5
+
+
+def test_streaming_and_errors(server, df):
+    streamed = "".join(llm_insights.stream_llm_response("stream me", df)).strip()
+    assert streamed == "[mock mock-1] Question: stream me"
+    assert llm_insights.get_llm_insight("stream me", df) == streamed  # cached by the stream
+    assert server.stats["requests"] == 1
+
+    llm_insights.configure({"base_url": "http://127.0.0.1:9/v1", "timeout": 1})
+    assert llm_insights.get_llm_insight("anything", df).startswith("LLM error")
+
+
+class _ProxyErrorHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        page = b"<html><body>502 Bad Gateway</body></html>"
+        self.send_response(502)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", str(len(page)))
+        self.end_headers()
+        self.wfile.write(page)
+
+
+def test_non_json_error_pages_and_failed_connections(server, df, monkeypatch):
+    proxy = ThreadingHTTPServer(("127.0.0.1", 0), _ProxyErrorHandler)
+    threading.Thread(target=proxy.serve_forever, daemon=True).start()
+    try:
+        llm_insights.configure({"base_url": f"http://127.0.0.1:{proxy.server_address[1]}/v1"})
+        with pytest.raises(RuntimeError, match="HTTP 502"):
+            llm_insights._complete(llm_insights._payload("anything", llm_insights.data_snapshot(df)))
+    finally:
+        proxy.shutdown()
+        proxy.server_close()
+
+    closed = []
+
+    class Connection(http.client.HTTPConnection):
+        def close(self):
+            closed.append(self)
+            super().close()
+    monkeypatch.setattr(llm_insights, "_connect", lambda: Connection("127.0.0.1", 9, timeout=1))
+    with pytest.raises(ConnectionRefusedError):
+        llm_insights._complete(llm_insights._payload("anything", llm_insights.data_snapshot(df)))
+    assert len(closed) == 1 and llm_insights._pool.empty()
@@ -0,0 +1,86 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.local_insights import (
+    answer_query,
+    build_insight_index,
+    generate_insight,
+    latency_stats,
+    load_insight_index,
+    route_query,
+    save_insight_index,
+    stream_insight,
+)
+
+
+@pytest.fixture
+def scores():
+    rng = np.random.default_rng(0)
+    n = 200
+    return pd.DataFrame({
+        "customer_id": [f"c{i}" for i in range(n)], "cluster": rng.integers(0, 3, n),
+        "CLV": rng.gamma(2, 200, n), "churn_probability": rng.uniform(0, 1, n),
+    })
+
+
+@pytest.mark.parametrize("query, intent, params", [
+    ("Top 5 in cluster 2", "top", {"n": 5, "cluster": "2"}),
+    ("who is the best city?", "top", {}),
+    ("top 3 churn risk", "top_risk", {"n": 3}),
+    ("churn risk in segment 1", "risk", {"cluster": "1"}),
+    ("forecast for the next 30 days", "forecast", {}),
+    ("how many clusters are there", "cluster", {}),
+    ("stop", "summary", {}),
+])
+def test_route_query(query, intent, params):
+    assert route_query(query) == (intent, params)
+
+
+def test_answers_come_from_the_index(scores, tmp_path):
+    path = save_insight_index(build_insight_index(scores), tmp_path / "index.json")
+    index = load_insight_index(path)
+
+    expected = scores[scores["cluster"] == 2].nlargest(5, "CLV")["customer_id"]
+    answer = answer_query("top 5 in cluster 2", index)["answer"]
+    assert all(f"**{c}**" in answer for c in expected)
+
+    high_risk = (scores["churn_probability"] > 0.7).mean() * 100
+    assert f"{high_risk:.1f}%" in generate_insight("churn?", scores)
+    assert "no cluster 9" in answer_query("cluster 9", index)["answer"]
+    assert "No forecast" in answer_query("forecast", index)["answer"]
+    assert latency_stats()["count"] >= 3
+
+
+def test_cluster_without_clv_is_indexed_as_valid_json(scores, tmp_path):
+    scores.loc[scores["cluster"] == 1, "CLV"] = np.nan
+    path = save_insight_index(build_insight_index(scores), tmp_path / "index.json")
+    assert "NaN" not in path.read_text()
+    index = load_insight_index(path)
+    assert index["clusters"]["1"]["avg_clv"] is None and index["clusters"]["1"]["top_clv"] == []
+    assert all(row["CLV"] is not None for row in index["top_clv"])
+    assert None in [row["CLV"] for row in index["top_risk"]]
+
+    best = scores.groupby("cluster")["CLV"].mean().idxmax()
+    assert f"Cluster {best} leads" in answer_query("how many clusters are there", index)["answer"]
+    assert "avg CLV n/a" in answer_query("cluster 1", index)["answer"]
+    assert answer_query("top 3 in cluster 1", index)["answer"] == "No customers to rank."
+
+
+def test_forecast_summary(scores):
+    dates = pd.date_range("2024-01-01", periods=3)
+    panel = pd.DataFrame({"customer_id": np.repeat(["a", "b"], 3), "date": np.tile(dates, 2),
+                          "expected_revenue": [1.0, 2.0, 3.0, 5.0, 6.0, 9.0]})
+    forecast = build_insight_index(scores, forecast=panel)["forecast"]
+    assert forecast["total"] == 12.0 and forecast["top"][0]["customer_id"] == "b"
+
+    panel.loc[5, "expected_revenue"] = np.inf
+    forecast = build_insight_index(scores, forecast=panel)["forecast"]
+    assert (forecast["total"], forecast["non_finite"], forecast["top"][0]["customer_id"]) == (3.0, 1, "a")
+
+
+def test_stream_insight_chunks():
+    text = "Top city is **X**. Churn is low!  Done"
+    words = list(stream_insight(text))
+    assert "".join(words) == text and words[0] == "Top "
+    assert list(stream_insight(text, chunk="sentence")) == ["Top city is **X**. ", "Churn is low!  ", "Done"]
@@ -0,0 +1,39 @@
+import numpy as np
+import pandas as pd
+from lifetimes import BetaGeoFitter, GammaGammaFitter
+from lifetimes.generate_data import beta_geometric_nbd_model
+from src.ltv_trajectory import METRICS, closed_form_clv, compute_ltv_trajectories
+
+def test_trajectories_match_lifetimes():
+    np.random.seed(0)
+    rfm = beta_geometric_nbd_model(T=200, r=0.5, alpha=30, a=0.8, b=2.5, size=300)[['frequency', 'recency', 'T']]
+    rfm['expected_avg_profit'] = 50.0
+    bgf = BetaGeoFitter(penalizer_coef=0.001).fit(rfm['frequency'], rfm['recency'], rfm['T'])
+
+    traj = compute_ltv_trajectories(rfm, bgf, days=60, step=10, chunk_size=128)
+    assert traj.dtype == np.float32
+    assert traj.shape == (len(METRICS), 300, 7)
+
+    expected = bgf.conditional_expected_number_of_purchases_up_to_time(30, rfm['frequency'], rfm['recency'], rfm['T'])
+    np.testing.assert_allclose(traj[0, :, 3], expected, rtol=1e-4, atol=1e-6)
+    alive = bgf.conditional_probability_alive(rfm['frequency'], rfm['recency'], rfm['T'])
+    np.testing.assert_allclose(traj[1, :, 0], alive, rtol=1e-4, atol=1e-6)
+    np.testing.assert_allclose(traj[2], traj[0] * 50.0, rtol=1e-5)
+    # cumulative purchases grow with the horizon; P(alive) without purchases decays
+    assert (np.diff(traj[0], axis=1) >= 0).all()
+    assert (np.diff(traj[1], axis=1) <= 1e-7).all()
+
+def test_closed_form_clv_matches_lifetimes():
+    np.random.seed(1)
+    rfm = beta_geometric_nbd_model(T=200, r=0.5, alpha=30, a=0.8, b=2.5, size=300)[['frequency', 'recency', 'T']]
+    rfm = rfm[rfm['frequency'] > 0]
+    rfm['monetary_value'] = np.random.gamma(4, 25, len(rfm))
+    bgf = BetaGeoFitter(penalizer_coef=0.001).fit(rfm['frequency'], rfm['recency'], rfm['T'])
+    ggf = GammaGammaFitter().fit(rfm['frequency'], rfm['monetary_value'])
+
+    args = rfm['frequency'], rfm['recency'], rfm['T'], rfm['monetary_value']
+    expected = ggf.customer_lifetime_value(bgf, *args, time=6, discount_rate=0.02)
+    np.testing.assert_allclose(closed_form_clv(ggf, bgf, *args, time=6, discount_rate=0.02), expected, rtol=1e-6)
+    one = rfm.iloc[:1]
+    np.testing.assert_allclose(closed_form_clv(ggf, bgf, one['frequency'], one['recency'], one['T'],
+                                               one['monetary_value'], time=6, discount_rate=0.02), expected.iloc[:1])
@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src import model_registry
+from src.score import score_file, score_frame, load_scoring_models
+from src.segmentation import assign_segments
+
+
+@pytest.fixture(autouse=True)
+def _registry(tmp_path):
+    model_registry.configure({"dir": str(tmp_path / "models"), "keep_versions": 1})
+    yield
+    model_registry.configure({})
+
+
+def test_save_publish_load_and_prune():
+    data = pd.DataFrame({"x": [1.0, 2.0]})
+    for version in ["run-1", "run-2", "run-3"]:
+        model_registry.save_model("scaler", {"mean": version}, version, ["x"], {"k": 1}, data, {"r2": 0.5})
+    with pytest.raises(FileNotFoundError):
+        model_registry.load_models()  # nothing published yet
+    model_registry.publish("run-1")
+    model, entry = model_registry.load_model("scaler")
+    assert model == {"mean": "run-1"} and entry["features"] == ["x"] and entry["metrics"] == {"r2": 0.5}
+    assert entry["data_fingerprint"] == model_registry.fingerprint(data.copy())
+    assert entry["data_fingerprint"] != model_registry.fingerprint(data + 1)
+    with pytest.raises(KeyError):
+        model_registry.load_model("churn_gbm")
+
+    assert model_registry.prune() == ["run-2"]  # LATEST survives
+    assert model_registry.list_versions() == ["run-1", "run-3"]
+    assert model_registry.load_models("run-3")["scaler"][0] == {"mean": "run-3"}
+
+
+def test_score_file_streams_registered_models_without_refitting(published_models, tmp_path):
+    rfm, fitted = published_models
+    inputs = rfm[['recency', 'frequency', 'monetary_value', 'T', 'profit_adjusted']]
+    inputs.rename_axis('customer_id').reset_index().to_csv(tmp_path / "customers.csv", index=False)
+    stats = score_file(tmp_path / "customers.csv", tmp_path / "scored.parquet", chunksize=70)
+    assert stats == {**stats, "version": "run-1", "rows": len(rfm), "chunks": 5}
+
+    scored = pd.read_parquet(tmp_path / "scored.parquet").set_index('customer_id')
+    expected = score_frame(inputs, load_scoring_models())
+    assert (scored['cluster'] == assign_segments(inputs, fitted['segment_scaler'], fitted['segment_model'])).all()
+    for column in ['cluster', 'prob_alive', 'CLV', 'CLV_ML', 'churn_probability', 'uplift']:
+        np.testing.assert_allclose(scored[column], expected.loc[scored.index, column])
+    np.testing.assert_allclose(scored['CLV'], rfm.loc[scored.index, 'CLV'])
+
+    with pytest.raises(ValueError, match="profit_adjusted"):
+        score_frame(inputs.drop(columns='profit_adjusted'), load_scoring_models())
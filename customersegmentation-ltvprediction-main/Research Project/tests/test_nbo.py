@@ -0,0 +1,26 @@
+import numpy as np
+import pandas as pd
+from src.nbo import compile_catalog, customer_features, score_offers, top_k_offers
+
+CATALOG = [
+    {"name": "Premium", "clv_weight": 1.0},
+    {"name": "Win-back", "churn_weight": 1.0},
+    {"name": "Basic", "base": 0.2, "cluster_affinity": {1: 5.0}},
+]
+
+def test_score_matrix_and_top_k():
+    df = pd.DataFrame({
+        'CLV': [1000.0, 10.0, 10.0],
+        'recency': [0, 300, 30],
+        'churn_probability': [0.1, 0.9, 0.0],
+        'cluster': [0, 0, 1],
+    })
+    features = customer_features(df, clv_scale=1000.0)
+    weights, base, affinity, values = compile_catalog(CATALOG, df['cluster'].to_numpy())
+    scores = score_offers(features, np.searchsorted(values, df['cluster'].to_numpy()), weights, base, affinity)
+    assert scores.shape == (3, 3)
+
+    idx, top = top_k_offers(scores, 2)
+    assert idx.shape == (3, 2)
+    assert list(idx[:, 0]) == [0, 1, 2]
+    assert (top[:, 0] >= top[:, 1]).all()
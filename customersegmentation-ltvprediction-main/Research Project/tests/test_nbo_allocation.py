@@ -0,0 +1,28 @@
+import numpy as np
+from src.nbo_allocation import allocate_offers
+
+def _instance(n=60, offers=4, k=3, seed=0):
+    rng = np.random.default_rng(seed)
+    scores = rng.random((n, offers))
+    cand_offer = np.argsort(-scores, axis=1)[:, :k]
+    cand_score = np.take_along_axis(scores, cand_offer, axis=1)
+    costs = np.array([4.0, 1.0, 2.0, 3.0])
+    capacities = np.array([10, np.inf, 15, 12])
+    return cand_offer, cand_score, costs, capacities
+
+def test_allocation_respects_constraints_and_bounds():
+    cand_offer, cand_score, costs, capacities = _instance()
+    budget = 60.0
+    greedy, g_stats = allocate_offers(cand_offer, cand_score, costs, capacities, budget, method="greedy")
+    exact, e_stats = allocate_offers(cand_offer, cand_score, costs, capacities, budget, method="exact")
+
+    for assigned, stats in ((greedy, g_stats), (exact, e_stats)):
+        hit = assigned >= 0
+        assert (np.bincount(assigned[hit], minlength=4) <= capacities).all()
+        assert costs[assigned[hit]].sum() <= budget + 1e-9
+        # every assignment comes from the customer's own candidates
+        assert (cand_offer[hit] == assigned[hit, None]).any(axis=1).all()
+
+    assert g_stats["objective"] <= e_stats["objective"] + 1e-6
+    assert e_stats["objective"] <= g_stats["upper_bound"] + 1e-6
+    assert 0.0 <= g_stats["optimality_gap"] < 0.1
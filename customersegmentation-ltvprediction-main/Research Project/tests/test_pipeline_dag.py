@@ -0,0 +1,85 @@
+import threading
+import time
+
+import pytest
+
+from src import instrumentation
+from src.pipeline_dag import critical_path, dependencies, run_dag, stage
+
+
+@pytest.fixture(autouse=True)
+def _fresh():
+    instrumentation.configure({})
+    instrumentation.reset()
+
+
+def test_runs_in_dependency_order_and_passes_outputs():
+    stages = [
+        stage("double", lambda base: base * 2, inputs=["base"], outputs=["doubled"]),
+        stage("split", lambda doubled: (doubled + 1, doubled - 1), inputs=["doubled"], outputs=["up", "down"]),
+        stage("total", lambda up, down: up + down, inputs=["up", "down"], outputs=["total"]),
+    ]
+    run = run_dag(stages, context={"base": 5})
+    assert run["outputs"]["total"] == 20
+    assert run["status"] == {"double": "ok", "split": "ok", "total": "ok"}
+    assert run["critical_path"] == ["double", "split", "total"]
+
+
+def test_independent_stages_overlap():
+    barrier = threading.Barrier(2, timeout=5)  # only passes if both run at once
+    stages = [stage(name, barrier.wait, outputs=[name]) for name in ("a", "b")]
+    assert run_dag(stages, max_workers=2)["status"] == {"a": "ok", "b": "ok"}
+
+
+def test_resource_lock_serializes_stages():
+    active, peak = [0], [0]
+    lock = threading.Lock()
+
+    def plot():
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(0.05)
+        with lock:
+            active[0] -= 1
+
+    stages = [stage(f"plot{i}", plot, resources=["matplotlib"]) for i in range(3)]
+    run_dag(stages, max_workers=3)
+    assert peak[0] == 1
+
+
+def test_isolated_failure_skips_dependents_only():
+    def boom():
+        raise ValueError("no uplift")
+
+    stages = [
+        stage("uplift", boom, outputs=["uplift_df"], isolated=True),
+        stage("targeting", lambda uplift_df: 1, inputs=["uplift_df"], outputs=["targets"], isolated=True),
+        stage("report", lambda uplift_df: uplift_df, optional=["uplift_df"], outputs=["report"]),
+    ]
+    run = run_dag(stages)
+    assert run["status"] == {"uplift": "failed", "targeting": "skipped", "report": "ok"}
+    assert run["outputs"]["report"] is None and "no uplift" in run["errors"]["uplift"]
+
+
+def test_required_failure_aborts_run():
+    def boom():
+        raise RuntimeError("bad data")
+
+    with pytest.raises(RuntimeError, match="bad data"):
+        run_dag([stage("ingest", boom, outputs=["data"]),
+                 stage("rfm", lambda data: data, inputs=["data"], outputs=["rfm"])])
+
+
+def test_invalid_graphs_are_rejected():
+    with pytest.raises(ValueError, match="nobody produces"):
+        dependencies([stage("rfm", lambda data: data, inputs=["data"])])
+    with pytest.raises(ValueError, match="cycle"):
+        dependencies([stage("a", lambda y: y, inputs=["y"], outputs=["x"]),
+                      stage("b", lambda x: x, inputs=["x"], outputs=["y"])])
+
+
+def test_critical_path_takes_longest_chain():
+    deps = {"ingest": [], "plots": ["ingest"], "uplift": ["ingest"], "targeting": ["uplift"]}
+    durations = {"ingest": 1.0, "plots": 2.5, "uplift": 2.0, "targeting": 1.0}
+    assert critical_path(deps, durations) == (["ingest", "uplift", "targeting"], 4.0)
@@ -0,0 +1,33 @@
+import pandas as pd
+from src import results_store
+
+def test_runs_latest_pointer_projection_and_filters(tmp_path, monkeypatch):
+    monkeypatch.setattr(results_store, "STORE_DIR", tmp_path)
+
+    first = results_store.start_run("20240101T000000000000Z-aaaaaa")
+    results_store.write_artifact("scores", pd.DataFrame({"customer_id": ["A", "B", "C"],
+                                                         "cluster": [0, 1, 1], "CLV": [10.0, 20.0, 30.0]}))
+    results_store.write_artifact("segments", pd.DataFrame({"cluster": [0, 1]}))
+    results_store.publish_run(first)
+
+    second = results_store.start_run("20240102T000000000000Z-bbbbbb")
+    results_store.write_artifact("scores", pd.DataFrame({"customer_id": ["A"], "cluster": [0], "CLV": [99.0]}))
+    # not published yet: readers still see the first run
+    assert results_store.read_artifact("scores")["CLV"].tolist() == [10.0, 20.0, 30.0]
+
+    results_store.publish_run(second)
+    assert results_store.latest_run_id() == second
+    assert results_store.read_artifact("scores")["CLV"].tolist() == [99.0]
+    # the second run did not write segments, so the newest run that did is used
+    assert results_store.read_artifact("segments")["cluster"].tolist() == [0, 1]
+
+    subset = results_store.read_artifact("scores", columns=["customer_id"], filters=[("cluster", "==", 1)],
+                                         run_id=first)
+    assert list(subset.columns) == ["customer_id"]
+    assert subset["customer_id"].tolist() == ["B", "C"]
+
+    history = results_store.read_artifact_history("scores", columns=["CLV"])
+    assert history.groupby("run_id").size().to_dict() == {first: 3, second: 1}
+
+    assert results_store.prune_runs(keep=1) == [first]
+    assert results_store.list_runs() == [second]
@@ -0,0 +1,29 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+from src.run_history import append_run, metric_series, query_runs
+
+def test_migration_append_and_time_range(tmp_path):
+    db = tmp_path / "runs.db"
+    (tmp_path / "runs.json").write_text(json.dumps([
+        {"run_timestamp": "2025-01-01T10:00:00", "avg_clv": 100.0},
+        {"run_timestamp": "2025-02-01T10:00:00", "avg_clv": 110.0},
+    ]))
+    append_run({"run_timestamp": "2025-03-01T10:00:00", "avg_clv": 120.0, "run_id": "r3"}, path=db)
+
+    runs = query_runs(path=db)
+    assert [r["avg_clv"] for r in runs] == [100.0, 110.0, 120.0]
+    # the legacy file is imported only once
+    assert len(query_runs(path=db)) == 3
+
+    window = query_runs(start="2025-01-15", end="2025-03-01", path=db)
+    assert [r["run_timestamp"] for r in window] == ["2025-02-01T10:00:00"]
+    assert [r["avg_clv"] for r in query_runs(limit=1, path=db)] == [120.0]
+    assert metric_series("avg_clv", start="2025-02-01", path=db) == [
+        ("2025-02-01T10:00:00", 110.0), ("2025-03-01T10:00:00", 120.0)]
+
+def test_concurrent_writers(tmp_path):
+    db = tmp_path / "runs.db"
+    entries = [{"run_timestamp": f"2025-01-01T00:00:{i:02d}", "avg_clv": float(i)} for i in range(40)]
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(lambda e: append_run(e, path=db), entries))
+    assert sorted(r["avg_clv"] for r in query_runs(path=db)) == [float(i) for i in range(40)]
@@ -0,0 +1,30 @@
+import numpy as np
+import pandas as pd
+from src.sales_forecast import build_sales_series, fit_exponential_smoothing, forecast_exponential_smoothing
+
+def test_build_sales_series():
+    tx = pd.DataFrame({
+        'City': ['A', 'A', 'B', 'A'],
+        'Order Date': pd.to_datetime(['2024-01-05', '2024-01-20', '2024-02-10', '2024-03-01']),
+        'Sales': [10.0, 5.0, 7.0, 3.0],
+    })
+    series, cities, periods = build_sales_series(tx, freq='M')
+    assert list(cities) == ['A', 'B']
+    assert [str(p) for p in periods] == ['2024-01', '2024-02', '2024-03']
+    np.testing.assert_allclose(series, [[15, 0, 3], [0, 7, 0]])
+    # columns are found by name, whatever their order
+    reordered, _, _ = build_sales_series(tx.assign(Profit=-1.0)[['Profit', 'Sales', 'Order Date', 'City']], freq='M')
+    np.testing.assert_allclose(reordered, series)
+
+def test_exponential_smoothing_recovers_trend_with_intervals():
+    t = np.arange(40, dtype=float)
+    series = np.vstack([100 + 5 * t, np.full(40, 50.0)])
+    fit = fit_exponential_smoothing(series)
+    point, lower, upper = forecast_exponential_smoothing(fit, horizon=4, interval=0.9)
+
+    np.testing.assert_allclose(point[0], 100 + 5 * np.arange(40, 44), rtol=0.02)
+    np.testing.assert_allclose(point[1], 50.0, rtol=1e-6)
+    assert fit['beta'][0] > 0
+    assert (lower <= point).all() and (point <= upper).all()
+    # interval widens with the horizon
+    assert (np.diff(upper[0] - lower[0]) >= 0).all()
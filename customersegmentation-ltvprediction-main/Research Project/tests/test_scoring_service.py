@@ -0,0 +1,76 @@
+import http.client
+import json
+import threading
+from concurrent.futures import Future
+from urllib.parse import urlsplit
+
+import numpy as np
+import pytest
+
+from src import scoring_service
+from src.score import load_scoring_models, score_frame
+
+
+@pytest.fixture
+def service(published_models):
+    rfm, _ = published_models
+    server, url = scoring_service.start(settings={"max_wait_ms": 50.0, "cache_entries": 1000})
+    customers = rfm[['recency', 'frequency', 'monetary_value', 'T', 'profit_adjusted']]
+    yield server, url, customers
+    scoring_service.stop(server)
+
+
+def _request(url, method, path, body=None):
+    parts = urlsplit(url)
+    connection = http.client.HTTPConnection(parts.hostname, parts.port)
+    connection.request(method, path, json.dumps(body) if body is not None else None)
+    response = connection.getresponse()
+    return response.status, json.loads(response.read())
+
+
+def test_concurrent_requests_are_batched_cached_and_match_batch_scoring(service):
+    server, url, customers = service
+    records = customers.rename_axis('customer_id').reset_index().to_dict('records')[:200]
+    responses = [None] * 20
+    def post(i):
+        responses[i] = _request(url, "POST", "/score", {"customers": records[i * 10:(i + 1) * 10]})
+    threads = [threading.Thread(target=post, args=(i,)) for i in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert all(status == 200 for status, _ in responses)
+    scores = [row for _, body in responses for row in body['scores']]
+    expected = score_frame(customers, load_scoring_models()).loc[[r['customer_id'] for r in scores]]
+    for column in ['cluster', 'prob_alive', 'CLV', 'churn_probability']:
+        np.testing.assert_allclose([r[column] for r in scores], expected[column])
+
+    status, body = _request(url, "POST", "/score", records[0])  # a single customer object, cached
+    assert status == 200 and body['scores'][0]['customer_id'] == records[0]['customer_id']
+    metrics = _request(url, "GET", "/metrics")[1]
+    assert metrics['batches'] < 20 and metrics['customers'] == len(records) + 1 and metrics['cache_hits'] >= 1
+    assert metrics['cache_size'] <= len(records)
+    assert metrics['latency_ms']['p50'] <= metrics['latency_ms']['p99']
+
+    status, body = _request(url, "POST", "/score", {"customers": [{"recency": 3.0, "frequency": 1.0}]})
+    assert status == 400 and 'monetary_value' in body['error']
+    assert _request(url, "GET", "/metrics")[1]['errors'] == 1
+
+
+def test_bad_customers_are_rejected_and_fail_only_their_own_request(service):
+    server, url, customers = service
+    good, bad = customers.rename_axis('customer_id').reset_index().to_dict('records')[:2]
+    status, body = _request(url, "POST", "/score", {**bad, "recency": float("nan")})
+    assert status == 400 and "non-finite" in body['error'] and "recency" in body['error']
+    status, body = _request(url, "POST", "/score", {**bad, "frequency": -1.0})
+    assert status == 400 and "negative" in body['error'] and "frequency" in body['error']
+
+    # a customer that slips past validation fails its own request, not the whole micro-batch
+    good_future, bad_future = Future(), Future()
+    scoring_service._score_batch(server, [([good], good_future), ([{**bad, "recency": float("nan")}], bad_future)])
+    assert good_future.result(timeout=5)[0]['CLV'] == pytest.approx(
+        score_frame(customers.iloc[:1], load_scoring_models())['CLV'].iloc[0])
+    with pytest.raises(ValueError):
+        bad_future.result(timeout=5)
+    assert _request(url, "POST", "/score", good)[0] == 200
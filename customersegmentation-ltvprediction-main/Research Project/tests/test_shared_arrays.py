@@ -0,0 +1,57 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.segmentation import fit_auto_gmm_segmentation
+from src.shared_arrays import attached, published, run_attached
+
+
+def _column_sums(views, column):
+    return float(views['X'][:, column].sum()), int(views['y'].sum())
+
+
+@pytest.mark.parametrize('backend', ['shared_memory', 'memmap'])
+def test_published_arrays_are_shared_read_only_and_removed(backend, tmp_path):
+    X = np.arange(12, dtype=np.float64).reshape(4, 3)
+    y = np.array([1, 0, 1, 1], dtype=np.int8)
+    with published({'X': X, 'y': y, 'empty': np.empty(0)}, backend=backend, directory=tmp_path) as specs:
+        with attached(specs) as views:
+            np.testing.assert_array_equal(views['X'], X)
+            assert views['y'].dtype == np.int8 and views['empty'].shape == (0,)
+            with pytest.raises(ValueError):
+                views['X'][0, 0] = -1.0
+        with ProcessPoolExecutor(max_workers=2) as pool:
+            sums = list(pool.map(run_attached, repeat(_column_sums), repeat(specs), range(3)))
+        assert sums == [(18.0, 3), (22.0, 3), (26.0, 3)]
+        locations = [location for _, location, _, _ in specs.values()]
+    for location in locations:
+        if backend == 'memmap':
+            assert not os.path.exists(location)
+        else:
+            with pytest.raises(FileNotFoundError):
+                shared_memory.SharedMemory(name=location)
+
+
+def test_published_arrays_are_removed_on_error(tmp_path):
+    with pytest.raises(RuntimeError):
+        with published({'X': np.ones(5)}, backend='memmap', directory=tmp_path):
+            raise RuntimeError('worker failed')
+    assert list(tmp_path.iterdir()) == []
+    with pytest.raises(ValueError):
+        with published({'X': np.ones(5)}, backend='pickle'):
+            pass
+
+
+def test_parallel_gmm_sweep_matches_serial():
+    rng = np.random.default_rng(0)
+    rfm = pd.DataFrame({'recency': rng.gamma(2, 50, 300), 'frequency': rng.poisson(3, 300).astype(float),
+                        'monetary_value': rng.lognormal(5, 1, 300)})
+    _, serial = fit_auto_gmm_segmentation(rfm, max_components=4)
+    _, parallel = fit_auto_gmm_segmentation(rfm, max_components=4, n_jobs=2)
+    assert serial.n_components == parallel.n_components
+    np.testing.assert_allclose(serial.means_, parallel.means_)
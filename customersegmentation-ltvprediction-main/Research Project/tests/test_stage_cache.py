@@ -0,0 +1,105 @@
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+from src import instrumentation, results_store, stage_cache
+from src.pipeline_dag import run_dag, stage
+
+
+@pytest.fixture(autouse=True)
+def _isolated(tmp_path, monkeypatch):
+    monkeypatch.setattr(results_store, "STORE_DIR", tmp_path / "store")
+    stage_cache.configure({"enabled": True, "dir": str(tmp_path / "cache")})
+    instrumentation.configure({})
+    instrumentation.reset()
+    yield
+    stage_cache.configure({})
+
+
+def test_hash_value_tracks_content():
+    frame = pd.DataFrame({"CLV": [1.0, 2.0]}, index=["A", "B"])
+    assert stage_cache.hash_value(frame) == stage_cache.hash_value(frame.copy())
+    assert stage_cache.hash_value(frame) != stage_cache.hash_value(frame.assign(CLV=[1.0, 2.5]))
+    assert stage_cache.hash_value(frame) != stage_cache.hash_value(frame.rename(columns={"CLV": "LTV"}))
+    assert stage_cache.hash_value({"a": 1, "b": [2]}) == stage_cache.hash_value({"b": [2], "a": 1})
+    key = stage_cache.stage_key("ltv", {"rfm": "x"}, {"penalizer": 0.001})
+    assert key != stage_cache.stage_key("ltv", {"rfm": "x"}, {"penalizer": 0.01})
+
+
+def test_code_version_of_module_name_does_not_import(tmp_path, monkeypatch):
+    module = tmp_path / "lazy_stage_module.py"
+    module.write_text("def run():\n    return 1\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    version = stage_cache.code_version("lazy_stage_module")
+    assert "lazy_stage_module" not in sys.modules
+    assert version == stage_cache.code_version("lazy_stage_module")
+    module.write_text("def run():\n    return 2\n")
+    assert version != stage_cache.code_version("lazy_stage_module")
+
+
+def test_stage_key_follows_modules_the_stage_module_imports(tmp_path, monkeypatch):
+    package = tmp_path / "stagepkg"
+    package.mkdir()
+    (package / "__init__.py").write_text("")
+    (package / "stage.py").write_text("from stagepkg.allocation import allocate\n\ndef run():\n    return allocate()\n")
+    (package / "allocation.py").write_text("from stagepkg import weights\n\ndef allocate():\n    return 1\n")
+    (package / "weights.py").write_text("SCALE = 1\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    key = stage_cache.stage_key("nbo", {"scores": "x"}, code=["stagepkg.stage"])
+    (package / "allocation.py").write_text("from stagepkg import weights\n\ndef allocate():\n    return 2\n")
+    edited = stage_cache.stage_key("nbo", {"scores": "x"}, code=["stagepkg.stage"])
+    assert edited != key
+    (package / "weights.py").write_text("SCALE = 2\n")
+    assert stage_cache.stage_key("nbo", {"scores": "x"}, code=["stagepkg.stage"]) != edited
+    assert "stagepkg.stage" not in sys.modules and "stagepkg.allocation" not in sys.modules
+
+
+def test_rerun_reuses_unchanged_stages_only():
+    calls = []
+
+    def clean(raw):
+        calls.append("clean")
+        return raw.dropna()
+
+    def score(clean_data, factor):
+        calls.append("score")
+        results_store.write_artifact("scores", clean_data * factor)
+        return clean_data * factor
+
+    def build(factor):
+        return [
+            stage("clean", clean, inputs=["raw"], outputs=["clean_data"], cache={}),
+            stage("score", lambda clean_data: score(clean_data, factor), inputs=["clean_data"],
+                  outputs=["scores"], cache={"config": {"factor": factor}}),
+        ]
+
+    raw = pd.DataFrame({"x": [1.0, None, 3.0]})
+    first = results_store.start_run("20240101T000000000000Z-aaaaaa")
+    run_dag(build(2), context={"raw": raw}, run_id=first)
+    second = results_store.start_run("20240102T000000000000Z-bbbbbb")
+    run = run_dag(build(2), context={"raw": raw}, run_id=second)
+    assert run["status"] == {"clean": "cached", "score": "cached"}
+    assert calls == ["clean", "score"]
+    # the cached stage's artifact is carried into the new run
+    assert results_store.read_artifact("scores", run_id=second)["x"].tolist() == [2.0, 6.0]
+
+    run = run_dag(build(3), context={"raw": raw}, run_id=results_store.start_run())
+    assert run["status"] == {"clean": "cached", "score": "ok"}
+    assert run["outputs"]["scores"]["x"].tolist() == [3.0, 9.0]
+
+
+def test_lru_eviction_and_purge():
+    for i, stage_name in enumerate(["old", "mid", "new"]):
+        path = stage_cache.store(f"{i:064x}", stage_name, {"v": "x" * 10_000}, {"v": str(i)})
+        os.utime(path / stage_cache.META_FILE, (1_000 + i, 1_000 + i))
+    assert stage_cache.lookup(f"{0:064x}")["outputs"] == {"v": "x" * 10_000}  # touch: now most recent
+
+    size = stage_cache.list_entries()[0]["size_bytes"]
+    removed = stage_cache.evict(max_bytes=2 * size)
+    assert removed == [f"{1:064x}"]
+    assert [m["stage"] for m in stage_cache.list_entries()] == ["old", "new"]
+
+    stage_cache.main(["--dir", str(stage_cache._state["cache_dir"]), "purge", "--stage", "new"])
+    assert [m["stage"] for m in stage_cache.list_entries()] == ["old"]
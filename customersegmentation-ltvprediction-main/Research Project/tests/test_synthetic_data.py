@@ -0,0 +1,28 @@
+import pandas as pd
+
+from src.data_preprocessing import calculate_rfm, clean_raw_data
+from src.synthetic_data import COLUMNS, generate_transactions
+
+
+def test_generate_transactions_schema_and_cleaning():
+    raw = generate_transactions(2000, customers=100, seed=1)
+    assert list(raw.columns) == COLUMNS
+    assert len(raw) == 2000 and raw["City"].nunique() == 100
+    assert pd.api.types.is_datetime64_any_dtype(raw["Order Date"])
+    assert (raw["Ship Date"] >= raw["Order Date"]).all()
+    assert raw["Order Date"].between("2010-01-01", "2013-12-31").all()
+    assert (raw["Profit"] < 0).any() and (raw["Sales"] > 0).all()
+    assert raw.groupby("State")["Region"].nunique().eq(1).all()
+
+    transactions = clean_raw_data(raw)
+    assert list(transactions.columns) == ["City", "Order Date", "Sales", "Profit"]
+    rfm = calculate_rfm(transactions)
+    assert len(rfm) == 100 and (rfm["frequency"] > 0).any()
+
+
+def test_generate_transactions_seed_and_seasonality():
+    pd.testing.assert_frame_equal(generate_transactions(500, seed=3), generate_transactions(500, seed=3))
+    months = generate_transactions(50000, seasonality=0.8, seed=0)["Order Date"].dt.month.value_counts()
+    assert months[[10, 11]].sum() > 2 * months[[3, 4]].sum()
+    flat = generate_transactions(50000, seasonality=0.0, seed=0)["Order Date"].dt.month.value_counts()
+    assert flat[[10, 11]].sum() < months[[10, 11]].sum()
@@ -0,0 +1,25 @@
+import numpy as np
+import pandas as pd
+from src.targeting import optimize_campaign_targets, top_k_indices
+
+def test_top_k_indices_methods_agree():
+    values = np.random.default_rng(0).normal(size=10_000)
+    expected = np.argsort(-values)[:25]
+    assert np.array_equal(top_k_indices(values, 25, method="partition"), expected)
+    assert np.array_equal(top_k_indices(values, 25, method="bucket"), expected)
+
+def test_optimize_campaign_targets_respects_budget_and_quotas():
+    df = pd.DataFrame({
+        'customer_id': list('abcdef'),
+        'cluster': [0, 0, 0, 1, 1, 1],
+        'uplift': [0.5, 0.4, 0.3, 0.2, 0.1, -0.2],
+        'CLV': [100, 100, 100, 100, 100, 100],
+    })
+    selected, roi_curve = optimize_campaign_targets(df, budget=40, cost_per_contact=10)
+    # 4 contacts affordable; 'e' (value 10) does not beat its cost and 'f' is negative
+    assert list(selected['customer_id']) == ['a', 'b', 'c', 'd']
+    assert roi_curve['budget'].iloc[-1] == 40
+    assert roi_curve['expected_incremental_value'].iloc[-1] == 140
+
+    selected, _ = optimize_campaign_targets(df, budget=40, cost_per_contact=10, cluster_quotas={0: 1})
+    assert list(selected['customer_id']) == ['a', 'd']
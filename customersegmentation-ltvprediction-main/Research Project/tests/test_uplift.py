@@ -0,0 +1,16 @@
+import numpy as np
+from src.uplift import cross_fit_uplift
+
+def test_cross_fit_uplift_parallel_matches_serial():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(120, 3))
+    treated = rng.random(120) < 0.5
+    y = ((X[:, 0] > 0) & treated | (rng.random(120) < 0.2)).astype(int)
+
+    serial, imp_serial = cross_fit_uplift(X, y, treated, n_folds=3, n_jobs=1)
+    parallel, imp_parallel = cross_fit_uplift(X, y, treated, n_folds=3, n_jobs=2)
+
+    assert serial.shape == (120,)
+    assert np.all(np.abs(serial) <= 1)
+    assert np.allclose(serial, parallel)
+    assert np.allclose(imp_serial, imp_parallel)
@@ -0,0 +1,38 @@
+import numpy as np
+import pandas as pd
+
+from src.visualization import figure_input, render_figures
+
+
+def _rfm(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "frequency": rng.poisson(3, n), "recency": rng.uniform(0, 500, n), "T": rng.uniform(0, 800, n),
+        "monetary_value": rng.gamma(2, 100, n), "cluster": np.r_[np.zeros(n - 3, int), [1, 2, 3]],
+        "CLV": rng.gamma(2, 200, n),
+    })
+
+
+def test_large_inputs_are_reduced():
+    rfm = _rfm(5_000)
+    data, kwargs = figure_input(rfm, "clv_distribution.png", max_rows=1_000)
+    assert len(data) == 1_000 and kwargs["total_rows"] == 5_000
+    data, _ = figure_input(rfm, "cluster_scatter.png", max_rows=1_000)
+    assert set(data["cluster"]) == {0, 1, 2, 3}  # tiny clusters survive the sample
+    data, kwargs = figure_input(rfm, "cluster_scatter.png", max_rows=1_000, scatter="hexbin")
+    assert len(data) == 5_000 and kwargs["hexbin"]
+    data, _ = figure_input(rfm, "elbow_plot.png", elbow_max_rows=500)
+    assert len(data) == 500
+    data, _ = figure_input(rfm, "clv_by_cluster.png")
+    assert len(data) == 4
+
+
+def test_unchanged_figures_are_not_redrawn(tmp_path):
+    rfm = _rfm(300)
+    config = {"n_jobs": 1}
+    assert set(render_figures(rfm, tmp_path, config).values()) == {"rendered"}
+    assert set(render_figures(rfm, tmp_path, config).values()) == {"unchanged"}
+
+    status = render_figures(rfm.assign(CLV=rfm["CLV"] * 2), tmp_path, config)
+    assert status["clv_distribution.png"] == "rendered"
+    assert status["rfm_distributions.png"] == "unchanged"